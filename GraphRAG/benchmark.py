@@ -0,0 +1,624 @@
+"""
+GraphRAG Benchmark
+Replays a labelled query set through Neo4jGraphRAGEngine.query and GraphRAGChatbot.chat
+against recorded Neo4j results and a local OpenAI-compatible LLM stand-in
+
+Workflow:
+    1. python benchmark.py make-queries --out queries.jsonl            (live Neo4j)
+    2. python benchmark.py record --queries queries.jsonl --fixture bench_fixture
+       (live Neo4j + vLLM; stores every Cypher result and LLM completion)
+    3. python benchmark.py run --queries queries.jsonl --fixture bench_fixture \\
+           --llm-latency-ms 800 --save-baseline baseline.json
+    4. python benchmark.py run ... --compare baseline.json             (exit 1 on regression)
+
+Steps 3 and 4 need neither Neo4j nor the vLLM server.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import unicodedata
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+import config
+from neo4j_connector import Neo4jConnector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# NEO4J STAND-INS
+# ============================================
+
+def _query_key(query: str, parameters: Optional[Dict]) -> str:
+    """Fixture key: whitespace-normalized Cypher + parameters"""
+    text = " ".join(query.split())
+    params = json.dumps(parameters or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{text}\n{params}".encode("utf-8")).hexdigest()
+
+
+class _Row(tuple):
+    """Replayed row for as_tuples streams (tuple with keys(), like neo4j.Record)"""
+
+    def __new__(cls, row: Dict):
+        obj = super().__new__(cls, row.values())
+        obj._keys = list(row.keys())
+        return obj
+
+    def keys(self) -> List[str]:
+        return self._keys
+
+
+class RecordingConnector(Neo4jConnector):
+    """
+    Live Neo4j connector that also stores every read result for replay
+
+    Rows are stored as record.data() dicts (JSON-serializable).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded: Dict[str, Dict] = {}
+        self._record_lock = threading.Lock()
+
+    def _store(self, query: str, parameters: Optional[Dict], rows: List[Dict]):
+        with self._record_lock:
+            self.recorded[_query_key(query, parameters)] = {
+                "query": " ".join(query.split())[:120],
+                "rows": rows,
+            }
+
+    def execute_query(self, query: str, parameters: Dict = None, write: bool = False) -> List[Dict]:
+        rows = super().execute_query(query, parameters, write=write)
+        if not write:
+            self._store(query, parameters, rows)
+        return rows
+
+    def stream_query(
+        self,
+        query: str,
+        parameters: Dict = None,
+        as_tuples: bool = False
+    ) -> Iterator[Union[Dict, Tuple]]:
+        # Always pull dicts from the server so the fixture is JSON-serializable
+        rows = list(super().stream_query(query, parameters, as_tuples=False))
+        self._store(query, parameters, rows)
+        for row in rows:
+            yield _Row(row) if as_tuples else row
+
+    def save(self, path: Path):
+        """Write the recorded results as JSON lines"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for key, entry in self.recorded.items():
+                f.write(json.dumps({"key": key, **entry}, ensure_ascii=False, default=str) + "\n")
+        logger.info(f"✅ Saved {len(self.recorded)} Neo4j results to {path}")
+
+
+class ReplayConnector(Neo4jConnector):
+    """
+    Neo4j stand-in that serves recorded results with a fixed per-call latency
+
+    Queries that were not recorded return no rows and are counted in misses.
+    """
+
+    def __init__(self, fixture_path: Path, latency_ms: float = 0.0):
+        """
+        Initialize ReplayConnector (no driver, no network)
+
+        Args:
+            fixture_path: neo4j.jsonl written by RecordingConnector.save
+            latency_ms: Simulated round-trip time per query
+        """
+        self.uri = f"replay:{fixture_path}"
+        self.user = self.password = None
+        self.database = config.NEO4J_DATABASE
+        self.driver = None
+
+        self.latency = latency_ms / 1000.0
+        self.results: Dict[str, List[Dict]] = {}
+        self.calls = 0
+        self.misses = 0
+        self._count_lock = threading.Lock()
+
+        with open(fixture_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.results[entry["key"]] = entry["rows"]
+        logger.info(f"✅ Loaded {len(self.results)} recorded Neo4j results from {fixture_path}")
+
+    def close(self):
+        pass
+
+    def _replay(self, query: str, parameters: Optional[Dict]) -> List[Dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        rows = self.results.get(_query_key(query, parameters))
+        with self._count_lock:
+            self.calls += 1
+            if rows is None:
+                self.misses += 1
+        if rows is None:
+            logger.debug(f"Fixture miss: {' '.join(query.split())[:80]}")
+            return []
+        return rows
+
+    def execute_query(self, query: str, parameters: Dict = None, write: bool = False) -> List[Dict]:
+        if write:
+            return []
+        return [dict(row) for row in self._replay(query, parameters)]
+
+    def stream_query(
+        self,
+        query: str,
+        parameters: Dict = None,
+        as_tuples: bool = False
+    ) -> Iterator[Union[Dict, Tuple]]:
+        for row in self._replay(query, parameters):
+            yield _Row(row) if as_tuples else dict(row)
+
+    def profile_query(self, query: str, parameters: Dict = None, write: bool = False) -> Dict:
+        return {"db_hits": 0, "rows": 0, "plan": {}}
+
+
+# ============================================
+# LLM STAND-IN
+# ============================================
+
+class FakeLLMServer:
+    """
+    Local OpenAI-compatible /chat/completions endpoint
+
+    Answers from recorded completions (keyed by model, messages, max_tokens)
+    after a configurable delay. With an upstream URL it forwards misses to the
+    real server and records the answers (record mode). Remaining misses get
+    the fallback content.
+    """
+
+    def __init__(
+        self,
+        responses_path: Optional[Path] = None,
+        latency_ms: float = 0.0,
+        upstream: Optional[str] = None,
+        api_key: str = "EMPTY",
+        fallback: str = "{}"
+    ):
+        """
+        Initialize FakeLLMServer
+
+        Args:
+            responses_path: llm.jsonl with recorded completions (optional)
+            latency_ms: Simulated time per completion
+            upstream: Real OpenAI-compatible base URL to record from
+            api_key: API key for the upstream server
+            fallback: Content returned for unrecorded requests
+        """
+        self.latency = latency_ms / 1000.0
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.api_key = api_key
+        self.fallback = fallback
+        self.responses: Dict[str, str] = {}
+        self.requests = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+        if responses_path and Path(responses_path).exists():
+            with open(responses_path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.responses[entry["key"]] = entry["content"]
+            logger.info(f"✅ Loaded {len(self.responses)} recorded LLM completions from {responses_path}")
+
+    @staticmethod
+    def _request_key(body: Dict) -> str:
+        payload = {k: body.get(k) for k in ("model", "messages", "max_tokens")}
+        return hashlib.sha1(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def complete(self, body: Dict) -> str:
+        """Completion content for one request body"""
+        key = self._request_key(body)
+        with self._lock:
+            self.requests += 1
+            content = self.responses.get(key)
+
+        if content is None and self.upstream:
+            content = self._forward(body)
+            with self._lock:
+                self.responses[key] = content
+        elif content is None:
+            with self._lock:
+                self.misses += 1
+            content = self.fallback
+
+        if self.latency:
+            time.sleep(self.latency)
+        return content
+
+    def _forward(self, body: Dict) -> str:
+        request = urllib.request.Request(
+            f"{self.upstream}/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"}
+        )
+        with urllib.request.urlopen(request, timeout=getattr(config, 'VLLM_TIMEOUT', 120)) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        return data["choices"][0]["message"]["content"]
+
+    def start(self) -> str:
+        """
+        Serve on a free localhost port in a background thread
+
+        Returns:
+            Base URL for OpenAI clients (…/v1)
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length).decode("utf-8"))
+                content = fake.complete(body)
+                payload = json.dumps({
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def save(self, path: Path):
+        """Write the known completions as JSON lines"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for key, content in self.responses.items():
+                f.write(json.dumps({"key": key, "content": content}, ensure_ascii=False) + "\n")
+        logger.info(f"✅ Saved {len(self.responses)} LLM completions to {path}")
+
+
+# ============================================
+# QUERY SET
+# ============================================
+
+def _strip_diacritics(text: str) -> str:
+    text = text.replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").lower().split())
+
+
+def make_query_set(connector, n: int = 100, seed: int = 0) -> List[Dict]:
+    """
+    Labelled queries built from the FAQ questions in the graph
+
+    Each sampled question yields three queries: the question itself,
+    the question without diacritics and a lowercased form without "?".
+
+    Args:
+        connector: Neo4jConnector
+        n: Number of FAQ questions to sample
+        seed: Sampling seed
+
+    Returns:
+        [{"query", "expected_faq_id", "expected_question", "variant"}]
+    """
+    from query_registry import QueryRegistry
+    from cypher_queries import ENGINE_QUERIES
+
+    registry = QueryRegistry(connector, ENGINE_QUERIES)
+    faqs = [(faq_id, q) for faq_id, q in registry.stream("all_faq_questions", as_tuples=True) if q]
+    faqs.sort()
+    random.Random(seed).shuffle(faqs)
+
+    queries = []
+    for faq_id, question in faqs[:n]:
+        for variant, text in (
+            ("exact", question),
+            ("no_diacritics", _strip_diacritics(question)),
+            ("lowercase", question.lower().rstrip("?").strip()),
+        ):
+            queries.append({
+                "query": text,
+                "expected_faq_id": faq_id,
+                "expected_question": question,
+                "variant": variant,
+            })
+    return queries
+
+
+def load_queries(path: Path) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ============================================
+# RUN
+# ============================================
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    arr = np.array(values, dtype=np.float64)
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def _is_correct(expected: Dict, faq_id: Optional[str], question: Optional[str]) -> bool:
+    if expected.get("expected_faq_id") and faq_id:
+        return faq_id == expected["expected_faq_id"]
+    return _normalize(question) == _normalize(expected.get("expected_question"))
+
+
+def run_target(target: str, engine, chatbot, queries: List[Dict], connector, warm: bool = False) -> Dict:
+    """
+    Replay the query set through engine.query or chatbot.chat
+
+    Args:
+        target: "engine" or "chat"
+        engine: Neo4jGraphRAGEngine
+        chatbot: GraphRAGChatbot (for target "chat")
+        queries: Labelled queries
+        connector: The engine's connector (for fixture miss counts)
+        warm: Keep the result cache between queries
+
+    Returns:
+        Report section for the target
+    """
+    latencies, correct = [], 0
+    stages: Dict[str, List[float]] = {}
+    cypher_calls, llm_calls = [], []
+    misses_before = getattr(connector, "misses", 0)
+
+    for item in queries:
+        if not warm:
+            engine.clear_cache()
+
+        start = time.perf_counter()
+        if target == "engine":
+            result = engine.query(item["query"])
+            trace = result.get("trace")
+        else:
+            chatbot.clear_history()
+            chatbot.last_rag_result = None
+            chatbot.chat(item["query"])
+            result = chatbot.last_rag_result or {}
+            trace = chatbot.last_trace
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if _is_correct(item, result.get("faq_id"), result.get("question")):
+            correct += 1
+
+        if trace:
+            per_query: Dict[str, float] = {}
+            for span in trace["spans"]:
+                per_query[span["name"]] = per_query.get(span["name"], 0.0) + span["duration_ms"]
+            for name, duration in per_query.items():
+                stages.setdefault(name, []).append(duration)
+            cypher_calls.append(trace["counters"].get("cypher_calls", 0))
+            llm_calls.append(trace["counters"].get("llm_calls", 0))
+
+    return {
+        "queries": len(queries),
+        "accuracy_at_1": round(correct / len(queries), 4) if queries else 0.0,
+        "latency_ms": _percentiles(latencies),
+        "stages_ms": {name: {"count": len(v), **_percentiles(v)} for name, v in sorted(stages.items())},
+        "cypher_calls_per_query": _percentiles(cypher_calls),
+        "llm_calls_per_query": _percentiles(llm_calls),
+        "fixture_misses": getattr(connector, "misses", 0) - misses_before,
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, tolerance: float = 0.10, floor_ms: float = 1.0) -> List[str]:
+    """
+    Regressions of a report against a baseline
+
+    Latency and call counts regress when they grow by more than tolerance
+    (and, for latencies, by more than floor_ms); accuracy@1 regresses when it
+    drops by more than one percentage point.
+
+    Returns:
+        Human-readable regression lines (empty = no regression)
+    """
+    regressions = []
+
+    def check(label: str, new: float, old: float, is_ms: bool):
+        if new > old * (1 + tolerance) and (not is_ms or new - old > floor_ms):
+            change = (new - old) / old * 100 if old else float("inf")
+            regressions.append(f"{label}: {old:.2f} → {new:.2f} (+{change:.0f}%)")
+
+    for target, section in report["targets"].items():
+        base = baseline.get("targets", {}).get(target)
+        if not base:
+            continue
+        if section["accuracy_at_1"] < base["accuracy_at_1"] - 0.01:
+            regressions.append(f"{target} accuracy@1: {base['accuracy_at_1']:.2%} → {section['accuracy_at_1']:.2%}")
+        for p in ("p50", "p95", "p99"):
+            check(f"{target} latency {p}", section["latency_ms"][p], base["latency_ms"][p], True)
+        for name, stats in section["stages_ms"].items():
+            if name in base["stages_ms"]:
+                check(f"{target} stage {name} p95", stats["p95"], base["stages_ms"][name]["p95"], True)
+        for metric in ("cypher_calls_per_query", "llm_calls_per_query"):
+            check(f"{target} {metric} mean", section[metric]["mean"], base[metric]["mean"], False)
+    return regressions
+
+
+def print_report(report: Dict):
+    for target, section in report["targets"].items():
+        print(f"\n{'=' * 70}\n{target.upper()}  ({section['queries']} queries)\n{'=' * 70}")
+        lat = section["latency_ms"]
+        print(f"accuracy@1: {section['accuracy_at_1']:.2%}   "
+              f"latency p50={lat['p50']:.1f} p95={lat['p95']:.1f} p99={lat['p99']:.1f} ms")
+        print(f"cypher calls/query: {section['cypher_calls_per_query']['mean']:.2f}   "
+              f"llm calls/query: {section['llm_calls_per_query']['mean']:.2f}   "
+              f"fixture misses: {section['fixture_misses']}")
+        print(f"\n{'stage':<35} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, stats in section["stages_ms"].items():
+            print(f"{name:<35} {stats['count']:>6} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}")
+
+
+def _configure(llm_base_url: str, args):
+    """Settings that make runs reproducible (set before the engine is built)"""
+    config.LLM_PROVIDER = "vllm"
+    config.VLLM_API_BASE = llm_base_url
+    config.ENABLE_MEM0 = False
+    config.QUERY_PROFILE_SAMPLE_RATE = 0.0
+    config.TRACING_ENABLED = True
+    config.TRACE_SAMPLE_RATE = 1.0
+    config.TRACE_FILE = args.trace_file
+    config.DISK_CACHE_ENABLED = args.disk_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GraphRAG benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    make = sub.add_parser("make-queries", help="Build a labelled query set from the live graph")
+    make.add_argument("--out", type=Path, required=True)
+    make.add_argument("--n", type=int, default=100)
+    make.add_argument("--seed", type=int, default=0)
+
+    for name in ("record", "run"):
+        p = sub.add_parser(name)
+        p.add_argument("--queries", type=Path, required=True)
+        p.add_argument("--fixture", type=Path, required=True, help="Directory with neo4j.jsonl / llm.jsonl")
+        p.add_argument("--target", choices=["engine", "chat", "both"], default="both")
+        p.add_argument("--warmup", type=int, default=3, help="Untimed queries before measuring")
+        p.add_argument("--warm", action="store_true", help="Keep the result cache between queries")
+        p.add_argument("--disk-cache", action="store_true", help="Keep the SQLite disk cache enabled")
+        p.add_argument("--trace-file", type=Path, default=None, help="Also export traces as JSON lines")
+        p.add_argument("--llm-latency-ms", type=float, default=0.0)
+        p.add_argument("--neo4j-latency-ms", type=float, default=0.0)
+        p.add_argument("--save-baseline", type=Path)
+        p.add_argument("--compare", type=Path)
+        p.add_argument("--tolerance", type=float, default=0.10)
+
+    args = parser.parse_args()
+
+    if args.command == "make-queries":
+        connector = Neo4jConnector()
+        try:
+            queries = make_query_set(connector, args.n, args.seed)
+        finally:
+            connector.close()
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for item in queries:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(queries)} queries to {args.out}")
+        return 0
+
+    recording = args.command == "record"
+    if recording:
+        connector = RecordingConnector()
+        llm = FakeLLMServer(upstream=config.VLLM_API_BASE, api_key=config.VLLM_API_KEY)
+    else:
+        connector = ReplayConnector(args.fixture / "neo4j.jsonl", latency_ms=args.neo4j_latency_ms)
+        llm = FakeLLMServer(args.fixture / "llm.jsonl", latency_ms=args.llm_latency_ms)
+
+    _configure(llm.start(), args)
+
+    from neo4j_rag_engine import Neo4jGraphRAGEngine
+    from chatbot import GraphRAGChatbot
+
+    queries = load_queries(args.queries)
+    targets = ["engine", "chat"] if args.target == "both" else [args.target]
+
+    engine = Neo4jGraphRAGEngine(connector=connector)
+    chatbot = GraphRAGChatbot(user_id="benchmark", rag_engine=engine) if "chat" in targets else None
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "queries_file": str(args.queries),
+            "fixture": str(args.fixture),
+            "llm_latency_ms": args.llm_latency_ms,
+            "neo4j_latency_ms": args.neo4j_latency_ms,
+            "warm": args.warm,
+            "disk_cache": args.disk_cache,
+        },
+        "targets": {},
+    }
+
+    try:
+        for item in queries[:args.warmup]:
+            engine.query(item["query"])
+
+        for target in targets:
+            llm_requests_before = llm.requests
+            section = run_target(target, engine, chatbot, queries, connector, warm=args.warm)
+            section["llm_requests"] = llm.requests - llm_requests_before
+            report["targets"][target] = section
+    finally:
+        engine.close()
+        llm.stop()
+
+    if recording:
+        connector.save(args.fixture / "neo4j.jsonl")
+        llm.save(args.fixture / "llm.jsonl")
+
+    print_report(report)
+
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ No regressions vs {args.compare}")
+
+    if not recording and any(s["fixture_misses"] for s in report["targets"].values()):
+        logger.warning("⚠️ Some Cypher queries were not in the fixture - re-record after query changes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,11 +5,14 @@ NOW WITH MEM0 INTELLIGENT MEMORY + FOLLOW-UP DETECTION!
 """
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 from neo4j_rag_engine import Neo4jGraphRAGEngine
 from conversation_context_manager import ConversationContextManager
+from prerendered_answers import format_answer_for_readability
+from normalized_query import NormalizedQuery, normalize_query
 import config
+import tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,16 +30,17 @@ except ImportError as e:
 class GraphRAGChatbot:
     """Chatbot that uses GraphRAG + LLM + Mem0 for intelligent conversation with context tracking"""
 
-    def __init__(self, user_id: str = "default"):
+    def __init__(self, user_id: str = "default", rag_engine: Optional[Neo4jGraphRAGEngine] = None):
         """Initialize chatbot with GraphRAG engine, LLM, and Mem0
 
         Args:
             user_id: User identifier for Mem0 memory scoping
+            rag_engine: Existing engine to use (default: a new Neo4jGraphRAGEngine)
         """
         self.user_id = user_id
 
         # Initialize GraphRAG engine
-        self.rag_engine = Neo4jGraphRAGEngine()
+        self.rag_engine = rag_engine or Neo4jGraphRAGEngine()
 
         # Initialize Conversation Context Manager (legacy backup)
         self.context_manager = ConversationContextManager(max_history=5)
@@ -66,6 +70,9 @@ class GraphRAGChatbot:
         # Last RAG result for context (NEW!)
         self.last_rag_result = None
 
+        # Trace of the last chat turn (None if the turn was not sampled)
+        self.last_trace = None
+
     def _initialize_llm(self):
         """Initialize LLM based on configuration"""
         try:
@@ -112,11 +119,11 @@ class GraphRAGChatbot:
             logger.error(f"vLLM initialization failed: {e}")
             raise
 
-    def _is_chitchat(self, message: str) -> bool:
+    def _is_chitchat(self, message: Union[str, NormalizedQuery]) -> bool:
         """Check if message is chitchat/greeting (not FAQ-related)"""
         import re
 
-        message_lower = message.lower().strip()
+        message_lower = normalize_query(message).stripped
 
         # CRITICAL FIX: Use word boundaries to prevent false positives
         # Example: "tên bạn là gì?" should match, but "Họ tên bạn không trùng" should NOT
@@ -189,6 +196,18 @@ class GraphRAGChatbot:
         return "Tôi là VNPT Assistant. Bạn có câu hỏi gì về dịch vụ VNPT Money không?"
 
     def chat(self, user_message: str, user_id: str = None) -> str:
+        """
+        Process user message - runs _chat inside a (sampled) trace; the
+        finished trace is kept in self.last_trace
+
+        See _chat for arguments and return value.
+        """
+        with tracing.trace("chatbot.chat", user_id=user_id or self.user_id) as span:
+            response = self._chat(user_message, user_id)
+        self.last_trace = span.trace.to_dict() if span.trace is not None else None
+        return response
+
+    def _chat(self, user_message: str, user_id: str = None) -> str:
         """
         Process user message and return response WITH MEM0 INTELLIGENT CONTEXT
 
@@ -204,24 +223,35 @@ class GraphRAGChatbot:
         user_id = user_id or self.user_id
         logger.info(f"User: {user_message}")
 
+        # Normalized once, shared by the chitchat check, exact match and follow-up detection
+        normalized = normalize_query(user_message)
+
         # Step 0: Handle chitchat/greetings first
-        if self._is_chitchat(user_message):
+        if self._is_chitchat(normalized):
             response = self._handle_chitchat(user_message)
+            tracing.annotate(response_path="chitchat")
             logger.info(f"Assistant (chitchat): {response}")
             return response
 
+        # Step 0.5: Exact FAQ question match - pre-rendered answer, skips memory search,
+        # follow-up detection and the retrieval pipeline
+        prerendered_result = self.rag_engine.answer_exact_match(normalized)
+
         # Step 1: MEM0 - Search for relevant memories (NEW!)
         follow_up_context = None
         memories = []
 
-        if self.memory_manager:
+        if self.memory_manager and prerendered_result is None:
             logger.info("🧠 Searching Mem0 for relevant context...")
-            memory_result = self.memory_manager.get_context_for_query(
-                query=user_message,
-                user_id=user_id,
-                min_score=getattr(config, 'MEM0_MIN_RELEVANCE_SCORE', 0.5),
-                limit=getattr(config, 'MEM0_SEARCH_LIMIT', 5)
-            )
+            with tracing.span("mem0_search") as span:
+                memory_result = self.memory_manager.get_context_for_query(
+                    query=user_message,
+                    user_id=user_id,
+                    min_score=getattr(config, 'MEM0_MIN_RELEVANCE_SCORE', 0.5),
+                    limit=getattr(config, 'MEM0_SEARCH_LIMIT', 5)
+                )
+                span.set(memories=len(memory_result.get("memories", [])),
+                         top_score=memory_result.get("top_score", 0))
 
             memories = memory_result.get("memories", [])
             has_context = memory_result.get("has_context", False)
@@ -241,13 +271,16 @@ class GraphRAGChatbot:
                         "answer": self.last_rag_result.get("answer", "")[:500]
                     }
 
-                detection_result = self.follow_up_detector.detect(
-                    query=user_message,
-                    memories=memories,
-                    previous_qa=previous_qa,
-                    memory_score_threshold=getattr(config, 'MEM0_FOLLOW_UP_THRESHOLD', 0.7),
-                    use_llm=getattr(config, 'FOLLOW_UP_USE_LLM', True)
-                )
+                with tracing.span("follow_up_detection") as span:
+                    detection_result = self.follow_up_detector.detect(
+                        query=normalized,
+                        memories=memories,
+                        previous_qa=previous_qa,
+                        memory_score_threshold=getattr(config, 'MEM0_FOLLOW_UP_THRESHOLD', 0.7),
+                        use_llm=getattr(config, 'FOLLOW_UP_USE_LLM', True)
+                    )
+                    span.set(is_follow_up=detection_result.is_follow_up,
+                             method=detection_result.detection_method)
 
                 logger.info(f"   Detection: is_follow_up={detection_result.is_follow_up}, "
                            f"confidence={detection_result.confidence:.2f}, "
@@ -279,16 +312,19 @@ class GraphRAGChatbot:
         enhanced_query = user_message
         continuation_context = None
 
-        if not follow_up_context:
+        if not follow_up_context and prerendered_result is None:
             # Use legacy context manager
             enhanced_query, continuation_context = self.context_manager.enhance_query_with_context(user_message)
 
         # Step 4: Retrieve relevant context from GraphRAG
-        rag_result = self.rag_engine.query(
-            enhanced_query,
-            continuation_context=continuation_context,
-            follow_up_context=follow_up_context  # NEW parameter!
-        )
+        if prerendered_result is not None:
+            rag_result = prerendered_result
+        else:
+            rag_result = self.rag_engine.query(
+                enhanced_query,
+                continuation_context=continuation_context,
+                follow_up_context=follow_up_context  # NEW parameter!
+            )
 
         # Step 5: Generate response based on intent and extraction result
         intent = rag_result.get("intent", "GENERAL")
@@ -298,10 +334,17 @@ class GraphRAGChatbot:
 
         # Log intent and extraction info
         logger.info(f"Intent: {intent}, Has extraction: {extraction_info is not None}, Has steps: {has_steps}")
+        tracing.annotate(intent=intent, status=rag_result.get("status"), faq_id=rag_result.get("faq_id"),
+                         prerendered=bool(rag_result.get("prerendered")))
 
         if rag_result.get("status") == "success":
+            if rag_result.get("prerendered"):
+                # Exact FAQ match - answer was formatted when the graph was loaded
+                logger.info("Using pre-rendered answer (exact FAQ match)")
+                response = rag_result.get("rendered_answer") or rag_result.get("answer", "")
+
             # Check if LLM extraction was successful
-            if extraction_info and extraction_info.get("confidence", 0) > 0.5:
+            elif extraction_info and extraction_info.get("confidence", 0) > 0.5:
                 # Use extracted answer directly (already focused on intent)
                 response = rag_result.get("answer", "")
                 logger.info(f"Using LLM-extracted answer (intent: {intent})")
@@ -359,14 +402,15 @@ class GraphRAGChatbot:
                     "confidence": rag_result.get("confidence", 0)
                 }
 
-                self.memory_manager.add(
-                    messages=[
-                        {"role": "user", "content": user_message},
-                        {"role": "assistant", "content": response[:1000]}  # Truncate long responses
-                    ],
-                    user_id=user_id,
-                    metadata=memory_metadata
-                )
+                with tracing.span("mem0_save"):
+                    self.memory_manager.add(
+                        messages=[
+                            {"role": "user", "content": user_message},
+                            {"role": "assistant", "content": response[:1000]}  # Truncate long responses
+                        ],
+                        user_id=user_id,
+                        metadata=memory_metadata
+                    )
                 logger.info(f"💾 Saved to Mem0 memory (faq_id={memory_metadata['faq_id']}, topic={memory_metadata['topic']})")
             except Exception as e:
                 logger.warning(f"Failed to save to Mem0: {e}")
@@ -764,15 +808,16 @@ FORMAT:
 """
 
             # Call OpenAI API
-            response = self.llm_client.chat.completions.create(
-                model=config.LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=config.LLM_TEMPERATURE,
-                max_tokens=config.LLM_MAX_TOKENS
-            )
+            with tracing.llm_call("response", config.LLM_MODEL):
+                response = self.llm_client.chat.completions.create(
+                    model=config.LLM_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=config.LLM_TEMPERATURE,
+                    max_tokens=config.LLM_MAX_TOKENS
+                )
 
             answer = response.choices[0].message.content.strip()
 
@@ -810,15 +855,16 @@ FORMAT:
 """
 
             # Call vLLM server (OpenAI-compatible)
-            response = self.llm_client.chat.completions.create(
-                model=config.VLLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=config.LLM_TEMPERATURE,
-                max_tokens=config.LLM_MAX_TOKENS
-            )
+            with tracing.llm_call("response", config.VLLM_MODEL):
+                response = self.llm_client.chat.completions.create(
+                    model=config.VLLM_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=config.LLM_TEMPERATURE,
+                    max_tokens=config.LLM_MAX_TOKENS
+                )
 
             answer = response.choices[0].message.content.strip()
 
@@ -864,54 +910,7 @@ FORMAT:
         - Break long lines with comma-separated actions
         - Add spacing between steps
         """
-        import re
-
-        lines = answer.split('\n')
-        formatted_lines = []
-
-        for line in lines:
-            # Check if this is a step line (Bước X: ...)
-            step_match = re.match(r'(Bước\s+\d+:\s*)(.+)', line)
-
-            if step_match:
-                step_label = step_match.group(1)  # "Bước 1: "
-                step_content = step_match.group(2)  # The actual content
-
-                # If content has multiple comma-separated clauses and is long (>80 chars)
-                # OR has 3+ commas (lots of actions)
-                comma_count = step_content.count(',')
-
-                if comma_count >= 2 or (comma_count >= 1 and len(step_content) > 80):
-                    # Split by comma
-                    parts = [p.strip() for p in step_content.split(',')]
-
-                    # First part goes on same line as "Bước X:"
-                    formatted_lines.append(f"{step_label}{parts[0]}")
-
-                    # Rest go on separate lines
-                    for part in parts[1:]:
-                        if part:  # Skip empty parts
-                            # Capitalize if starts with lowercase
-                            formatted_part = part[0].upper() + part[1:] if part and part[0].islower() else part
-                            formatted_lines.append(formatted_part)
-
-                    # Add blank line after step for spacing
-                    formatted_lines.append('')
-                else:
-                    # Step is short enough, keep as is
-                    formatted_lines.append(line)
-                    # Add blank line after step for spacing
-                    if len(step_content) > 0:
-                        formatted_lines.append('')
-            else:
-                # Not a step line, keep as is
-                formatted_lines.append(line)
-
-        # Remove trailing blank lines
-        while formatted_lines and not formatted_lines[-1].strip():
-            formatted_lines.pop()
-
-        return '\n'.join(formatted_lines)
+        return format_answer_for_readability(answer)
 
     def _generate_template_response(self, rag_result: Dict) -> str:
         """Generate template response without LLM"""
@@ -1017,7 +1016,9 @@ Chúng tôi luôn sẵn sàng hỗ trợ bạn!"""
             "total_conversations": len(self.conversation_history),
             "llm_enabled": self.llm is not None,
             "llm_provider": config.LLM_PROVIDER,
-            "cache_size": len(self.rag_engine.cache),
+            "cache_size": len(self.rag_engine.result_cache),
+            "cache_stats": self.rag_engine.get_cache_stats(),
+            "pruning_stats": self.rag_engine.get_pruning_stats(),
             "context_turns": context_summary.get("num_turns", 0),
             "current_topic": context_summary.get("current_topic"),
             "has_active_context": context_summary.get("has_active_context", False)
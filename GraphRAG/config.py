@@ -53,6 +53,60 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "neo4j")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "vnptmoney")  # Database name
 USE_NEO4J = True  # Set to True to use Neo4j (now default)
 
+# Neo4j Bulk Ingestion
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))  # Rows per UNWIND chunk
+NEO4J_WRITER_THREADS = int(os.getenv("NEO4J_WRITER_THREADS", "4"))  # Parallel writer sessions for batch loads
+NEO4J_MAX_TRANSACTION_RETRY_TIME = 30.0  # Seconds the driver retries a transaction on transient errors (deadlocks, leader switch)
+
+# Neo4j Full-text Search (Lucene BM25 over FAQ question + answer)
+USE_FULLTEXT_SEARCH = True  # Keyword/intent-keyword search via db.index.fulltext.queryNodes
+FAQ_FULLTEXT_INDEX = "faq_fulltext"
+# No built-in Vietnamese analyzer: "standard-no-stop-words" tokenizes on Unicode word
+# boundaries and lowercases, without the English stopword list ("an", "no", ...)
+# that would drop Vietnamese syllables such as "an toàn"
+FAQ_FULLTEXT_ANALYZER = "standard-no-stop-words"
+FULLTEXT_QUESTION_BOOST = 2.0  # Question matches weigh more than answer matches
+
+# Semantic Search Backend
+# "matrix": in-process normalized float32 embedding matrix (reloaded when the graph version changes)
+# "vector_index": Neo4j vector index via db.index.vector.queryNodes (Neo4j 5.11+), falls back to "matrix"
+SEMANTIC_SEARCH_BACKEND = os.getenv("SEMANTIC_SEARCH_BACKEND", "matrix")
+FAQ_VECTOR_INDEX = "faq_embedding"
+
+# Graph version stamp (GraphVersion marker + FAQ count) used to invalidate in-process caches
+GRAPH_VERSION_CHECK_INTERVAL = 30  # Seconds between version checks
+
+# In-process FAQ records (context, cases, process steps) reloaded when the graph version changes
+USE_FAQ_RECORD_CACHE = True
+
+# Exact-match fast path: queries matching an FAQ question at least this closely get the
+# answer pre-rendered at graph load time (no LLM, no Neo4j). Needs USE_FAQ_RECORD_CACHE.
+USE_EXACT_MATCH_FAST_PATH = True
+EXACT_MATCH_FAST_PATH_THRESHOLD = 0.95
+
+# Adaptive candidate pruning: before graph context expansion, drop candidates whose best
+# possible ranking score is below the TOP_K_RETRIEVAL-th guaranteed score of the others
+# (top results unchanged). Needs USE_FAQ_RECORD_CACHE.
+USE_ADAPTIVE_PRUNING = True
+ADAPTIVE_PRUNING_VERIFY = False  # Also expand pruned candidates and log any that would have ranked
+
+# Out-of-scope gate: before entity extraction (LLM), reject queries far from every FAQ
+# centroid (query embedding cosine). Off until the thresholds are tuned on a labelled set:
+#   python scope_gate.py report labelled.jsonl
+USE_OUT_OF_SCOPE_GATE = os.getenv("USE_OUT_OF_SCOPE_GATE", "false").lower() == "true"
+OUT_OF_SCOPE_CENTROIDS = 64  # k-means centroids of the FAQ embedding matrix
+OUT_OF_SCOPE_MIN_SIMILARITY = 0.45  # Reject below this when the query has no VNPT keyword
+OUT_OF_SCOPE_MIN_SIMILARITY_WITH_KEYWORD = 0.25  # Reject below this even with a keyword
+
+# Entity Lookup for graph search
+# Entity nodes store name_norm = toLower(name) (indexed per label); query entities are
+# resolved to entity node ids in-process so ENTITY_GRAPH_SEARCH starts from those nodes
+USE_ENTITY_ALIAS_TABLE = True
+ENTITY_LABELS = [
+    "Service", "Bank", "Error", "Action", "Feature", "Fee", "Limit", "Status",
+    "Requirement", "Topic", "TimeFrame", "Document", "AccountType", "UIElement", "ContactChannel"
+]
+
 # Graph Configuration
 MAX_GRAPH_DEPTH = 3  # Maximum depth for graph traversal
 MIN_SIMILARITY_SCORE = 0.7  # Minimum similarity for RELATED_TO edges
@@ -85,9 +139,29 @@ CHROMA_PERSIST_DIR = DATA_DIR / "chroma_db"
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 LOG_FILE = LOGS_DIR / "chatbot.log"
 
+# Tracing: per-stage spans (engine.query / chatbot.chat) attached to results and
+# appended to a JSON-lines file; only a sampled fraction of requests is traced
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))  # 1.0 = trace every request
+TRACE_FILE = LOGS_DIR / "traces.jsonl"
+
 # Performance
 CACHE_ENABLED = True
-CACHE_SIZE = 100  # Number of queries to cache
+CACHE_SIZE = 100  # Number of queries to cache (LRU)
+CACHE_TTL_SECONDS = 3600  # Cached results expire after this many seconds (None = never)
+QUERY_PROFILE_SAMPLE_RATE = float(os.getenv("QUERY_PROFILE_SAMPLE_RATE", "0.0"))  # Fraction of Cypher read calls re-run with PROFILE (0 = off)
+
+# Run exact match, semantic search and intent keyword search concurrently with entity extraction
+PARALLEL_QUERY_STAGES = True
+QUERY_STAGE_WORKERS = 4  # Thread pool shared by all requests of one engine
+
+# Persistent disk cache (SQLite WAL), shared by all worker processes
+# Tier behind the in-memory caches for engine results, LLM entity extraction and focused answers
+DISK_CACHE_ENABLED = os.getenv("DISK_CACHE_ENABLED", "true").lower() == "true"
+DISK_CACHE_PATH = DATA_DIR / "cache" / "query_cache.sqlite3"
+DISK_CACHE_MAX_BYTES = 200 * 1024 * 1024  # LRU eviction above this total value size
+DISK_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Entries expire after 7 days
+LLM_PROMPT_VERSION = "1"  # Bump after editing LLM prompts to invalidate cached LLM outputs
 
 # Entity Extraction
 ENTITY_EXTRACTION_METHOD = "hybrid"  # Options: "pattern", "llm", "hybrid"
@@ -135,6 +209,11 @@ EXTRACTION_ENABLED_INTENTS = [
     "COMPARISON"  # Extract comparison data
 ]
 
+# Intent Classification
+USE_INTENT_MODEL = False  # Try the trained TF-IDF model before the regex rules (needs scikit-learn)
+INTENT_MODEL_PATH = MODELS_DIR / "intent_model.joblib"  # Trained with: python intent_classifier.py train
+INTENT_MODEL_MIN_CONFIDENCE = 0.9  # Below this probability the regex rules decide
+
 # Response Generation
 RESPONSE_LANGUAGE = "vi"  # Vietnamese
 INCLUDE_SOURCES = True  # Include source references in response
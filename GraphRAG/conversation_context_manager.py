@@ -6,6 +6,7 @@ NOW WITH LANGCHAIN MEMORY INTEGRATION!
 
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
@@ -27,6 +28,45 @@ except ImportError as e:
 
 import config
 
+# Step list formats, in order of preference (the first one that matches is used)
+STEP_PATTERNS = [
+    # Pattern 1: "Bước 1:", "Bước 2:", etc.
+    r'Bước\s+(\d+):\s*(.+?)(?=Bước\s+\d+:|$)',
+    # Pattern 2: "**1. Title**", "**2. Title**", etc. (markdown bold)
+    r'\*\*(\d+)\.\s+(.+?)\*\*',
+    # Pattern 3: "1. Title", "2. Title", etc. (simple numbered list)
+    r'^(\d+)\.\s+(.+?)(?=^\d+\.|$)',
+]
+_COMPILED_STEP_PATTERNS = [
+    (pattern, re.compile(pattern, re.IGNORECASE | re.DOTALL | (re.MULTILINE if pattern.startswith('^') else 0)))
+    for pattern in STEP_PATTERNS
+]
+_BULLET_PREFIX = re.compile(r'^[\s•\-\*]+')
+
+
+@lru_cache(maxsize=256)
+def _parse_answer_steps(answer: str) -> Tuple[Optional[str], Tuple[Tuple[int, str, str], ...]]:
+    """
+    (pattern used, (number, text, title) per step) for an answer
+
+    The same answer text is parsed on every turn it stays in context, so
+    the result is memoized.
+    """
+    for pattern, compiled in _COMPILED_STEP_PATTERNS:
+        matches = list(compiled.finditer(answer))
+        if not matches:
+            continue
+
+        steps = []
+        for match in matches:
+            step_text = match.group(2).strip()
+            # Extract just the first line for title (before newline or bullet)
+            title = _BULLET_PREFIX.sub('', step_text.split('\n')[0]).strip()
+            steps.append((int(match.group(1)), step_text, title))
+        return pattern, tuple(steps)
+
+    return None, ()
+
 
 class ConversationContextManager:
     """
@@ -331,54 +371,24 @@ Tóm tắt (bằng tiếng Việt, 2-3 câu):"""
         """
         steps = []
 
-        # Try multiple patterns in order of preference
-        patterns = [
-            # Pattern 1: "Bước 1:", "Bước 2:", etc.
-            r'Bước\s+(\d+):\s*(.+?)(?=Bước\s+\d+:|$)',
-            # Pattern 2: "**1. Title**", "**2. Title**", etc. (markdown bold)
-            r'\*\*(\d+)\.\s+(.+?)\*\*',
-            # Pattern 3: "1. Title", "2. Title", etc. (simple numbered list)
-            r'^(\d+)\.\s+(.+?)(?=^\d+\.|$)',
-        ]
-
-        for pattern in patterns:
-            flags = re.IGNORECASE | re.DOTALL
-            if pattern.startswith(r'^'):  # Multiline pattern
-                flags |= re.MULTILINE
-
-            matches = list(re.finditer(pattern, answer, flags))
-
-            if matches:
-                for match in matches:
-                    step_num = int(match.group(1))
-                    step_text = match.group(2).strip()
-
-                    # Extract just the first line for title (before newline or bullet)
-                    lines = step_text.split('\n')
-                    if lines:
-                        # Remove leading bullets and whitespace
-                        title = re.sub(r'^[\s•\-\*]+', '', lines[0]).strip()
-                        step_text_full = step_text
-                    else:
-                        title = step_text
-                        step_text_full = step_text
-
-                    # Check if this is a completion step (result, not action)
-                    is_completion = self._is_final_completion_step(title)
+        pattern, parsed_steps = _parse_answer_steps(answer)
+        for step_num, step_text, title in parsed_steps:
+            # Check if this is a completion step (result, not action)
+            is_completion = self._is_final_completion_step(title)
 
-                    steps.append({
-                        "step_number": step_num,
-                        "step_text": step_text_full,
-                        "step_title": title,
-                        "is_completion_step": is_completion,
-                        "completed": False
-                    })
+            steps.append({
+                "step_number": step_num,
+                "step_text": step_text,
+                "step_title": title,
+                "is_completion_step": is_completion,
+                "completed": False
+            })
 
-                    if is_completion:
-                        logger.info(f"   Step {step_num} marked as COMPLETION step: {title[:50]}...")
+            if is_completion:
+                logger.info(f"   Step {step_num} marked as COMPLETION step: {title[:50]}...")
 
-                logger.info(f"Extracted {len(steps)} steps using pattern: {pattern[:30]}...")
-                break  # Use first matching pattern
+        if steps:
+            logger.info(f"Extracted {len(steps)} steps using pattern: {pattern[:30]}...")
 
         return steps
 
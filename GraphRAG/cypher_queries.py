@@ -0,0 +1,690 @@
+"""
+Named Cypher queries used by Neo4jGraphRAGEngine
+All statements are fully parameterized so Neo4j can reuse cached plans
+"""
+
+# ============================================
+# SEARCH
+# ============================================
+
+# Entity-based graph search (core GraphRAG retrieval)
+# Both entry points below share this scoring: it receives (f, r, e) rows for every
+# FAQ -[r]-> entity edge whose entity matches the query entities
+_ENTITY_GRAPH_SCORING = """
+// Count entity matches and relationship types
+WITH f,
+     count(DISTINCT e) as entity_matches,
+     collect(DISTINCT type(r)) as rel_types,
+     collect(DISTINCT labels(e)[0]) as entity_types,
+     collect(DISTINCT e.name) as matched_entities
+
+// Calculate exact match bonus (boost when entity name matches EXACTLY)
+WITH f,
+     entity_matches,
+     rel_types,
+     entity_types,
+     matched_entities,
+     // Count exact matches vs partial matches
+     size([e_name IN matched_entities WHERE e_name IN $entity_names]) as exact_matches
+
+// ENTITY-SPECIFIC FILTERING: Collect ALL 15 entity types
+// One CALL subquery per relationship type: each neighbor set is collected on its own
+// instead of building the cross product of all 15 OPTIONAL MATCHes per FAQ
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service) RETURN collect(DISTINCT s.name) as faq_services }
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank) RETURN collect(DISTINCT b.name) as faq_banks }
+CALL { WITH f OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(err:Error) RETURN collect(DISTINCT err.name) as faq_errors }
+CALL { WITH f OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action) RETURN collect(DISTINCT act.name) as faq_actions }
+CALL { WITH f OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature) RETURN collect(DISTINCT feat.name) as faq_features }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee) RETURN collect(DISTINCT fee.name) as faq_fees }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit) RETURN collect(DISTINCT lim.name) as faq_limits }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status) RETURN collect(DISTINCT stat.name) as faq_statuses }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement) RETURN collect(DISTINCT req.name) as faq_requirements }
+CALL { WITH f OPTIONAL MATCH (f)-[:ABOUT]->(topic:Topic) RETURN collect(DISTINCT topic.name) as faq_topics }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame) RETURN collect(DISTINCT tf.name) as faq_timeframes }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document) RETURN collect(DISTINCT doc.name) as faq_documents }
+CALL { WITH f OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType) RETURN collect(DISTINCT acc.name) as faq_account_types }
+CALL { WITH f OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement) RETURN collect(DISTINCT ui.name) as faq_ui_elements }
+CALL { WITH f OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel) RETURN collect(DISTINCT contact.name) as faq_contact_channels }
+
+// Calculate ALL entity match bonuses (ALL 15 types!)
+WITH f, entity_matches, rel_types, entity_types, matched_entities, exact_matches,
+     faq_services, faq_banks, faq_errors, faq_actions, faq_features,
+     faq_fees, faq_limits, faq_statuses, faq_requirements,
+     faq_topics, faq_timeframes, faq_documents, faq_account_types,
+     faq_ui_elements, faq_contact_channels,
+     // BOOST if FAQ has the EXACT Service entity from query
+     CASE
+       WHEN size($query_services) > 0 AND
+            ANY(qs IN $query_services WHERE qs IN faq_services)
+       THEN 2.0  // VERY HIGH BOOST for exact service match (beats exact match penalty)
+       WHEN size($query_services) > 0 AND size(faq_services) > 0
+       THEN -1.0  // STRONG PENALTY if FAQ has different service
+       ELSE 0.3  // SMALL BOOST if FAQ has no service (tolerant to missing data)
+     END as service_match_bonus,
+     // BOOST if FAQ has the EXACT Bank entity from query
+     CASE
+       WHEN size($query_banks) > 0 AND
+            ANY(qb IN $query_banks WHERE qb IN faq_banks)
+       THEN 1.5  // HIGH BOOST for exact bank match
+       WHEN size($query_banks) > 0 AND size(faq_banks) > 0
+       THEN -0.8  // PENALTY if FAQ has different bank
+       ELSE 0.2  // SMALL BOOST if FAQ has no bank (tolerant to missing data)
+     END as bank_match_bonus,
+     // PENALTY if FAQ has Error but query does NOT have Error
+     CASE
+       WHEN size(faq_errors) > 0 AND size($query_errors) = 0
+       THEN -2.0  // STRONG PENALTY: FAQ is about errors but query is NOT
+
+       // EXACT MATCH: Query error exactly matches FAQ error
+       WHEN size($query_errors) > 0 AND
+            ANY(qe IN $query_errors WHERE qe IN faq_errors)
+       THEN 4.0  // STRONG BOOST: Exact error match
+
+       // FUZZY MATCH: Check if main keywords of query error appear in FAQ error
+       // Split "giao dịch thất bại" → check if FAQ error contains both "giao dịch" and "thất bại"
+       WHEN size($query_errors) > 0 AND
+            ANY(qe IN $query_errors
+                WHERE ANY(fe IN faq_errors
+                          WHERE (toLower(fe) CONTAINS toLower(qe)
+                             OR toLower(qe) CONTAINS toLower(fe)
+                             // Keyword-based fuzzy matching for multi-word errors
+                             OR (toLower(fe) CONTAINS 'thất bại' AND toLower(qe) CONTAINS 'thất bại')
+                             OR (toLower(fe) CONTAINS 'chưa nhận' AND toLower(qe) CONTAINS 'chưa nhận')
+                             OR (toLower(fe) CONTAINS 'không nhận' AND toLower(qe) CONTAINS 'không nhận'))))
+       THEN 3.0  // GOOD BOOST: Partial error match (fuzzy)
+
+       ELSE 0.0
+     END as error_match_bonus,
+     // NEW: BOOST for Action match (IMPORTANT!)
+     CASE
+       WHEN size($query_actions) > 0 AND
+            ANY(qa IN $query_actions WHERE qa IN faq_actions)
+       THEN 1.8  // STRONG BOOST for action match
+       ELSE 0.0
+     END as action_match_bonus,
+     // NEW: BOOST for Fee match (IMPORTANT!)
+     CASE
+       WHEN size($query_fees) > 0 AND size(faq_fees) > 0
+       THEN 2.0  // VERY STRONG BOOST for fee-related queries
+       ELSE 0.0
+     END as fee_match_bonus,
+     // NEW: BOOST for Status match
+     CASE
+       WHEN size($query_statuses) > 0 AND
+            ANY(qs IN $query_statuses WHERE qs IN faq_statuses)
+       THEN 1.5  // STRONG BOOST for status match
+       ELSE 0.0
+     END as status_match_bonus,
+     // NEW: BOOST for Limit match
+     CASE
+       WHEN size($query_limits) > 0 AND size(faq_limits) > 0
+       THEN 1.5  // STRONG BOOST for limit-related queries
+       ELSE 0.0
+     END as limit_match_bonus,
+     // NEW: BOOST for Feature match (CRITICAL FIX!)
+     CASE
+       WHEN size($query_features) > 0 AND
+            ANY(qf IN $query_features WHERE
+                ANY(ff IN faq_features WHERE
+                    toLower(ff) CONTAINS toLower(qf) OR
+                    toLower(qf) CONTAINS toLower(ff)))
+       THEN 2.5  // VERY STRONG BOOST for feature match (e.g., "liên kết ngân hàng")
+       WHEN size($query_features) > 0 AND size(faq_features) > 0
+       THEN -0.5  // Small penalty if FAQ has different feature
+       ELSE 0.0
+     END as feature_match_bonus,
+     // NEW: BOOST for Topic match (CRITICAL FIX!)
+     CASE
+       WHEN size($query_topics) > 0 AND
+            ANY(qt IN $query_topics WHERE
+                ANY(ft IN faq_topics WHERE
+                    toLower(ft) CONTAINS toLower(qt) OR
+                    toLower(qt) CONTAINS toLower(ft)))
+       THEN 2.0  // STRONG BOOST for topic match
+       ELSE 0.0
+     END as topic_match_bonus
+
+// Calculate graph-based score with entity-specific boosting (EXPANDED!)
+WITH f,
+     entity_matches,
+     rel_types,
+     entity_types,
+     matched_entities,
+     exact_matches,
+     service_match_bonus,
+     bank_match_bonus,
+     error_match_bonus,
+     action_match_bonus,
+     fee_match_bonus,
+     status_match_bonus,
+     limit_match_bonus,
+     feature_match_bonus,
+     topic_match_bonus,
+     // Bonus for specific relationship types (REDUCED ERROR BOOST)
+     CASE
+       WHEN 'DESCRIBES_ERROR' IN rel_types THEN 1.5  // REDUCED from 3.0 (let error_match_bonus handle it)
+       WHEN 'ABOUT' IN rel_types THEN 1.5
+       WHEN 'MENTIONS_BANK' IN rel_types THEN 1.5
+       WHEN 'MENTIONS_SERVICE' IN rel_types THEN 1.5
+       WHEN 'SUGGESTS_ACTION' IN rel_types THEN 1.2
+       WHEN 'USES_FEATURE' IN rel_types THEN 1.3  // NEW: Boost for feature relationships
+       ELSE 1.0
+     END as rel_weight,
+     // Exact match bonus
+     exact_matches * 0.5 as exact_match_bonus
+
+RETURN f.id as id,
+       (entity_matches * rel_weight + exact_match_bonus + service_match_bonus + bank_match_bonus +
+        error_match_bonus + action_match_bonus + fee_match_bonus + status_match_bonus + limit_match_bonus +
+        feature_match_bonus + topic_match_bonus) as graph_score,
+       entity_matches,
+       rel_types,
+       entity_types,
+       matched_entities,
+       service_match_bonus,
+       bank_match_bonus,
+       error_match_bonus,
+       action_match_bonus,
+       fee_match_bonus,
+       status_match_bonus,
+       limit_match_bonus,
+       feature_match_bonus,
+       topic_match_bonus
+ORDER BY graph_score DESC
+LIMIT $top_k
+"""
+
+# Scan entry point: match entity names in Cypher (no index can serve these predicates)
+ENTITY_GRAPH_SEARCH = """
+// Find FAQs connected to extracted entities (EXACT match prioritized, then SMART PARTIAL)
+MATCH (f:FAQ)-[r]->(e)
+WHERE
+    // Priority 1: EXACT match (case-insensitive)
+    toLower(e.name) IN [entity IN $entity_names | toLower(entity)]
+    // Priority 2: Word boundary match to prevent false positives
+    OR ANY(entity IN $entity_names WHERE
+        size(entity) >= 3 AND (
+            // Full phrase match
+            toLower(e.name) CONTAINS ' ' + toLower(entity) + ' ' OR
+            // Starts with phrase
+            toLower(e.name) STARTS WITH toLower(entity) + ' ' OR
+            // Ends with phrase
+            toLower(e.name) ENDS WITH ' ' + toLower(entity) OR
+            // Query entity contains DB entity as full word
+            toLower(entity) CONTAINS ' ' + toLower(e.name) + ' ' OR
+            toLower(entity) STARTS WITH toLower(e.name) + ' ' OR
+            toLower(entity) ENDS WITH ' ' + toLower(e.name)
+        )
+    )
+""" + _ENTITY_GRAPH_SCORING
+
+# Indexed entry point: entities already resolved to node ids by EntityAliasTable
+# (same matching rules as ENTITY_GRAPH_SEARCH), so traversal starts from those nodes
+ENTITY_GRAPH_SEARCH_BY_IDS = """
+MATCH (e)
+WHERE elementId(e) IN $entity_ids
+MATCH (f:FAQ)-[r]->(e)
+""" + _ENTITY_GRAPH_SCORING
+
+# Every named node an FAQ points to (EntityAliasTable)
+FAQ_ENTITY_NODES = """
+MATCH (:FAQ)-->(e)
+WHERE e.name IS NOT NULL
+RETURN DISTINCT elementId(e) as id, coalesce(e.name_norm, toLower(e.name)) as name_norm
+"""
+
+# All 15 entity types linked to each FAQ in a batch (hybrid bonus recalculation)
+FAQ_ENTITY_NAMES = """
+UNWIND $faq_ids as faq_id
+MATCH (f:FAQ {id: faq_id})
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service) RETURN collect(DISTINCT s.name) as faq_services }
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank) RETURN collect(DISTINCT b.name) as faq_banks }
+CALL { WITH f OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(err:Error) RETURN collect(DISTINCT err.name) as faq_errors }
+CALL { WITH f OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action) RETURN collect(DISTINCT act.name) as faq_actions }
+CALL { WITH f OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature) RETURN collect(DISTINCT feat.name) as faq_features }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee) RETURN collect(DISTINCT fee.name) as faq_fees }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status) RETURN collect(DISTINCT stat.name) as faq_statuses }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit) RETURN collect(DISTINCT lim.name) as faq_limits }
+CALL { WITH f OPTIONAL MATCH (f)-[:ABOUT]->(topic:Topic) RETURN collect(DISTINCT topic.name) as faq_topics }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement) RETURN collect(DISTINCT req.name) as faq_requirements }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame) RETURN collect(DISTINCT tf.name) as faq_timeframes }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document) RETURN collect(DISTINCT doc.name) as faq_documents }
+CALL { WITH f OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType) RETURN collect(DISTINCT acc.name) as faq_account_types }
+CALL { WITH f OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement) RETURN collect(DISTINCT ui.name) as faq_ui_elements }
+CALL { WITH f OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel) RETURN collect(DISTINCT contact.name) as faq_contact_channels }
+RETURN faq_id,
+       faq_services,
+       faq_banks,
+       faq_errors,
+       faq_actions,
+       faq_features,
+       faq_fees,
+       faq_statuses,
+       faq_limits,
+       faq_topics,
+       faq_requirements,
+       faq_timeframes,
+       faq_documents,
+       faq_account_types,
+       faq_ui_elements,
+       faq_contact_channels
+"""
+
+# FAQ questions for a set of ids (entity result verification)
+FAQ_QUESTIONS_BY_IDS = """
+MATCH (f:FAQ)
+WHERE f.id IN $faq_ids
+RETURN f.id as id, f.question as question
+"""
+
+# Every FAQ question (exact-match scans)
+ALL_FAQ_QUESTIONS = """
+MATCH (f:FAQ)
+RETURN f.id as id, f.question as question
+"""
+
+# Every FAQ embedding (semantic search)
+FAQ_EMBEDDINGS = """
+MATCH (f:FAQ)
+WHERE f.embedding IS NOT NULL
+RETURN f.id as id, f.embedding as embedding
+"""
+
+# Top-k FAQs by cosine similarity from the vector index
+# (index score is (1 + cosine) / 2)
+VECTOR_SEARCH = """
+CALL db.index.vector.queryNodes($index_name, $top_k, $embedding)
+YIELD node, score
+RETURN node.id as id, score
+"""
+
+# Whole-query substring search (keyword search without usable keywords)
+KEYWORD_SEARCH_PHRASE = """
+MATCH (f:FAQ)
+WHERE toLower(f.question) CONTAINS toLower($query)
+   OR toLower(f.answer) CONTAINS toLower($query)
+RETURN f.id as id, 1 as match_count
+ORDER BY match_count DESC
+LIMIT $top_k
+"""
+
+# Keyword search (question matches count double)
+KEYWORD_SEARCH = """
+MATCH (f:FAQ)
+WHERE ANY(kw IN $keywords WHERE toLower(f.question) CONTAINS kw OR toLower(f.answer) CONTAINS kw)
+WITH f,
+     size([kw IN $keywords WHERE toLower(f.question) CONTAINS kw]) * 2 +
+     size([kw IN $keywords WHERE toLower(f.answer) CONTAINS kw]) as match_count
+WHERE match_count > 0
+RETURN f.id as id, match_count
+ORDER BY match_count DESC
+LIMIT $top_k
+"""
+
+# Intent keyword search for FEE / LIMIT / TIME
+INTENT_KEYWORD_SEARCH = """
+MATCH (f:FAQ)
+WHERE ANY(kw IN $keywords WHERE toLower(f.question) CONTAINS kw OR toLower(f.answer) CONTAINS kw)
+WITH f,
+     // Score based on how many keywords match in question (higher priority)
+     size([kw IN $keywords WHERE toLower(f.question) CONTAINS kw]) * 2 +
+     // Score based on how many keywords match in answer
+     size([kw IN $keywords WHERE toLower(f.answer) CONTAINS kw]) as keyword_score
+RETURN f.id as id, keyword_score
+ORDER BY keyword_score DESC
+LIMIT $top_k
+"""
+
+# BM25 search over the FAQ full-text index ($search is a Lucene query string)
+FULLTEXT_SEARCH = """
+CALL db.index.fulltext.queryNodes($index_name, $search, {limit: $top_k})
+YIELD node, score
+RETURN node.id as id, score
+"""
+
+# ============================================
+# GRAPH CONTEXT
+# ============================================
+
+# FAQ nodes with ALL entity types and enriched properties
+# (one CALL subquery per relationship type, see ENTITY_GRAPH_SEARCH)
+# Shared by the batch query below and the FAQ record cache bulk load: expects (f, node_id)
+# f is projected without its embedding (only the embedding matrix needs it)
+_FAQ_CONTEXT_COLUMNS = """
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service) RETURN collect(DISTINCT s.name) as services }
+CALL { WITH f OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank) RETURN collect(DISTINCT b.name) as banks }
+CALL { WITH f OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(e:Error) RETURN collect(DISTINCT {name: e.name, solution: e.solution}) as errors }
+CALL { WITH f OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action) RETURN collect(DISTINCT act.name) as actions }
+CALL { WITH f OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature) RETURN collect(DISTINCT feat.name) as features }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee) RETURN collect(DISTINCT fee.name) as fees }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit) RETURN collect(DISTINCT lim.name) as limits }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status) RETURN collect(DISTINCT stat.name) as statuses }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame) RETURN collect(DISTINCT tf.name) as timeframes }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement) RETURN collect(DISTINCT {name: req.name, description: req.description}) as requirements }
+CALL { WITH f OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document) RETURN collect(DISTINCT {name: doc.name, description: doc.description}) as documents }
+CALL { WITH f OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType) RETURN collect(DISTINCT acc.name) as account_types }
+CALL { WITH f OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement) RETURN collect(DISTINCT ui.name) as ui_elements }
+CALL { WITH f OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel) RETURN collect(DISTINCT {name: contact.name, phone: contact.phone, description: contact.description}) as contact_channels }
+CALL { WITH f OPTIONAL MATCH (f)-[:SIMILAR_TO]-(similar:FAQ) RETURN collect(DISTINCT {question: similar.question, id: similar.id}) as related_questions }
+CALL { WITH f OPTIONAL MATCH (f)-[:ABOUT]->(t:Topic) RETURN collect(DISTINCT t.name) as topics }
+CALL { WITH f OPTIONAL MATCH (f)-[:HAS_LINK]->(link:UsefulLink) RETURN collect(DISTINCT {name: link.name, url: link.url, description: link.description}) as useful_links }
+RETURN node_id, f {.*, embedding: null} as f,
+       services,
+       banks,
+       errors,
+       actions,
+       features,
+       fees,
+       limits,
+       statuses,
+       timeframes,
+       requirements,
+       documents,
+       account_types,
+       ui_elements,
+       contact_channels,
+       related_questions,
+       topics,
+       useful_links
+"""
+
+# FAQ context for a batch of ids
+FAQ_CONTEXT = """
+UNWIND $node_ids as node_id
+MATCH (f:FAQ {id: node_id})
+""" + _FAQ_CONTEXT_COLUMNS
+
+# Case nodes and their Steps, expects (f, case, node_id)
+_FAQ_CASE_COLUMNS = """
+OPTIONAL MATCH (case)-[:HAS_STEP]->(step:Step)
+RETURN node_id,
+       case.case_id as case_id,
+       case.name as case_name,
+       case.description as case_description,
+       case.case_type as case_type,
+       case.method as case_method,
+       case.keywords as keywords,
+       case.status_values as status_values,
+       collect({number: step.number, text: step.text}) as steps
+ORDER BY node_id, case.case_id
+"""
+
+# Case nodes and their Steps, for a batch of FAQ ids
+FAQ_CASES = """
+UNWIND $node_ids as node_id
+MATCH (f:FAQ {id: node_id})-[:HAS_CASE]->(case:Case)
+""" + _FAQ_CASE_COLUMNS
+
+# Alternative actions for a set of actions (source = the matched action)
+ALTERNATIVE_ACTIONS = """
+MATCH (a:Action)-[r:ALTERNATIVE_TO]->(alt:Action)
+WHERE a.name IN $actions
+RETURN a.name as source, alt.name as action, r.reason as reason
+"""
+
+# FAQ with its cases and steps (follow-up search within one FAQ)
+FAQ_WITH_CASES = """
+MATCH (f:FAQ {id: $faq_id})
+OPTIONAL MATCH (f)-[:HAS_CASE]->(c:Case)
+OPTIONAL MATCH (c)-[:HAS_STEP]->(s:Step)
+WITH f, c, collect(DISTINCT {step_num: s.step_number, content: s.content}) as steps
+RETURN f {.*, embedding: null} as f,
+       collect(DISTINCT {
+           case_id: c.id,
+           description: c.description,
+           condition: c.condition,
+           steps: steps
+       }) as cases
+"""
+
+# ============================================
+# PROCESS STEPS
+# ============================================
+
+# Processes an FAQ describes with their ordered step arrays (one row per process).
+# step_numbers / step_texts / step_count are materialized on the Process node at
+# graph-load time (Neo4jConnector.materialize_process_steps); processes without
+# arrays, or whose step_count no longer matches their HAS_STEP degree, fall back
+# to traversing HAS_STEP.
+PROCESS_STEPS_BY_FAQ_ID = """
+MATCH (faq:FAQ {id: $faq_id})-[:DESCRIBES_PROCESS]->(p:Process)
+WITH faq, p, COUNT { (p)-[:HAS_STEP]->(:Step) } as live_count
+WITH faq, p, live_count, p.step_numbers IS NOT NULL AND p.step_count = live_count as fresh
+RETURN faq.question as faq_question,
+       faq.answer as faq_answer,
+       p.name as process_name,
+       p.id as process_id,
+       CASE WHEN fresh THEN p.step_numbers END as step_numbers,
+       CASE WHEN fresh THEN p.step_texts END as step_texts,
+       live_count as step_count,
+       CASE WHEN NOT fresh
+            THEN [(p)-[:HAS_STEP]->(s:Step) | {number: s.number, text: s.text}]
+       END as steps
+"""
+
+# Steps by process name: ALL $required_keywords must be in the FAQ question,
+# FAQs matching more $optional_keywords (then more steps) are preferred
+STEPS_BY_PROCESS_NAME = """
+MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process {name: $process_name})
+WHERE ALL(kw IN $required_keywords WHERE toLower(faq.question) CONTAINS kw)
+MATCH (p)-[:HAS_STEP]->(all_s:Step)
+WITH faq, p, count(all_s) as total_count,
+     size([kw IN $optional_keywords WHERE toLower(faq.question) CONTAINS kw]) as optional_score
+ORDER BY optional_score DESC, total_count DESC
+LIMIT 1
+MATCH (p)-[:HAS_STEP]->(s:Step)
+WHERE CASE WHEN $only_next_step THEN s.number = $from_step ELSE s.number >= $from_step END
+RETURN faq.question as faq_question,
+       faq.answer as faq_answer,
+       p.name as process_name,
+       p.id as process_id,
+       s.number as step_num,
+       s.text as step_text,
+       total_count as total_steps_in_process
+ORDER BY s.number
+"""
+
+STEP_COUNT_BY_PROCESS_NAME = """
+MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process {name: $process_name})
+WHERE ALL(kw IN $required_keywords WHERE toLower(faq.question) CONTAINS kw)
+MATCH (p)-[:HAS_STEP]->(s:Step)
+WITH p, count(s) as step_count,
+     size([kw IN $optional_keywords WHERE toLower(faq.question) CONTAINS kw]) as optional_score
+ORDER BY optional_score DESC, step_count DESC
+LIMIT 1
+RETURN step_count as total_count
+"""
+
+# Steps of processes whose FAQ question contains any of $keywords
+STEPS_BY_QUESTION_KEYWORDS = """
+MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process)
+WHERE ANY(kw IN $keywords WHERE toLower(faq.question) CONTAINS kw)
+MATCH (p)-[:HAS_STEP]->(s:Step)
+WHERE CASE WHEN $only_next_step THEN s.number = $from_step ELSE s.number >= $from_step END
+RETURN faq.question as faq_question,
+       faq.answer as faq_answer,
+       p.name as process_name,
+       p.id as process_id,
+       s.number as step_num,
+       s.text as step_text,
+       toLower(faq.question) as faq_lower
+ORDER BY p.id, s.number
+LIMIT 50
+"""
+
+
+# ============================================
+# FAQ RECORD CACHE (bulk loads, one row per FAQ / case / process)
+# ============================================
+
+ALL_FAQ_CONTEXT = """
+MATCH (f:FAQ)
+WITH f, f.id as node_id
+""" + _FAQ_CONTEXT_COLUMNS
+
+ALL_FAQ_CASES = """
+MATCH (f:FAQ)-[:HAS_CASE]->(case:Case)
+WITH f, case, f.id as node_id
+""" + _FAQ_CASE_COLUMNS
+
+ALL_ALTERNATIVE_ACTIONS = """
+MATCH (a:Action)-[r:ALTERNATIVE_TO]->(alt:Action)
+RETURN a.name as source, alt.name as action, r.reason as reason
+"""
+
+# Same shape as FAQ_WITH_CASES, for every FAQ
+ALL_FAQ_WITH_CASES = """
+MATCH (f:FAQ)
+OPTIONAL MATCH (f)-[:HAS_CASE]->(c:Case)
+OPTIONAL MATCH (c)-[:HAS_STEP]->(s:Step)
+WITH f, c, collect(DISTINCT {step_num: s.step_number, content: s.content}) as steps
+RETURN f.id as faq_id,
+       collect(DISTINCT {
+           case_id: c.id,
+           description: c.description,
+           condition: c.condition,
+           steps: steps
+       }) as cases
+"""
+
+# Steps of every process an FAQ describes (processes without steps are skipped,
+# as in the STEPS_* queries)
+ALL_FAQ_PROCESS_STEPS = """
+MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process)
+MATCH (p)-[:HAS_STEP]->(s:Step)
+RETURN faq.id as faq_id,
+       p.name as process_name,
+       p.id as process_id,
+       collect({number: s.number, text: s.text}) as steps
+"""
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+ENGINE_QUERIES = {
+    "entity_graph_search": ENTITY_GRAPH_SEARCH,
+    "entity_graph_search_by_ids": ENTITY_GRAPH_SEARCH_BY_IDS,
+    "faq_entity_nodes": FAQ_ENTITY_NODES,
+    "faq_entity_names": FAQ_ENTITY_NAMES,
+    "faq_questions_by_ids": FAQ_QUESTIONS_BY_IDS,
+    "all_faq_questions": ALL_FAQ_QUESTIONS,
+    "faq_embeddings": FAQ_EMBEDDINGS,
+    "vector_search": VECTOR_SEARCH,
+    "keyword_search_phrase": KEYWORD_SEARCH_PHRASE,
+    "keyword_search": KEYWORD_SEARCH,
+    "intent_keyword_search": INTENT_KEYWORD_SEARCH,
+    "fulltext_search": FULLTEXT_SEARCH,
+    "faq_context": FAQ_CONTEXT,
+    "faq_cases": FAQ_CASES,
+    "alternative_actions": ALTERNATIVE_ACTIONS,
+    "faq_with_cases": FAQ_WITH_CASES,
+    "process_steps_by_faq_id": PROCESS_STEPS_BY_FAQ_ID,
+    "steps_by_process_name": STEPS_BY_PROCESS_NAME,
+    "step_count_by_process_name": STEP_COUNT_BY_PROCESS_NAME,
+    "steps_by_question_keywords": STEPS_BY_QUESTION_KEYWORDS,
+    "all_faq_context": ALL_FAQ_CONTEXT,
+    "all_faq_cases": ALL_FAQ_CASES,
+    "all_alternative_actions": ALL_ALTERNATIVE_ACTIONS,
+    "all_faq_with_cases": ALL_FAQ_WITH_CASES,
+    "all_faq_process_steps": ALL_FAQ_PROCESS_STEPS,
+}
+
+
+# ============================================
+# TESTING / BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    # db hits of the per-type CALL subqueries vs the chained OPTIONAL MATCH
+    # fan-out they replaced, on one synthetic high-degree FAQ
+    #
+    # Writes a synthetic FAQ and its entities, so it runs against a scratch database:
+    #   python cypher_queries.py --database bench [--degree 2]
+    import argparse
+    import sys
+    import config
+    from neo4j_connector import Neo4jConnector
+
+    parser = argparse.ArgumentParser(description="db hits: CALL subqueries vs OPTIONAL MATCH fan-out")
+    parser.add_argument("--database", required=True, help="Scratch Neo4j database to write the synthetic FAQ to")
+    # The fan-out materializes degree ** 15 rows per FAQ, so keep this small
+    parser.add_argument("--degree", type=int, default=2, help="Neighbors per entity type")
+    parser.add_argument("--allow-live", action="store_true",
+                        help=f"Allow running against config.NEO4J_DATABASE ({config.NEO4J_DATABASE})")
+    args = parser.parse_args()
+
+    if args.database == config.NEO4J_DATABASE and not args.allow_live:
+        print(f"❌ Refusing to write benchmark nodes to the live database '{args.database}' "
+              f"(pass --allow-live to override)")
+        sys.exit(1)
+
+    degree = args.degree
+    bench_id = "__BENCH_FANOUT_FAQ__"
+    cleanup_query = "MATCH (f:FAQ {id: $faq_id}) OPTIONAL MATCH (f)-->(e {bench: true}) DETACH DELETE f, e"
+
+    # (relationship, label, column) for the 15 entity types, in FAQ_ENTITY_NAMES order
+    entity_types = [
+        ("MENTIONS_SERVICE", "Service", "faq_services"),
+        ("MENTIONS_BANK", "Bank", "faq_banks"),
+        ("DESCRIBES_ERROR", "Error", "faq_errors"),
+        ("SUGGESTS_ACTION", "Action", "faq_actions"),
+        ("USES_FEATURE", "Feature", "faq_features"),
+        ("HAS_FEE", "Fee", "faq_fees"),
+        ("HAS_STATUS", "Status", "faq_statuses"),
+        ("HAS_LIMIT", "Limit", "faq_limits"),
+        ("ABOUT", "Topic", "faq_topics"),
+        ("REQUIRES", "Requirement", "faq_requirements"),
+        ("HAS_TIMEFRAME", "TimeFrame", "faq_timeframes"),
+        ("REQUIRES_DOCUMENT", "Document", "faq_documents"),
+        ("AFFECTS_ACCOUNT", "AccountType", "faq_account_types"),
+        ("NAVIGATES_TO", "UIElement", "faq_ui_elements"),
+        ("CONTACTS", "ContactChannel", "faq_contact_channels"),
+    ]
+
+    # Previous query shape: all OPTIONAL MATCHes chained before one collect
+    fanout_query = (
+        "UNWIND $faq_ids as faq_id\nMATCH (f:FAQ {id: faq_id})\n"
+        + "\n".join(f"OPTIONAL MATCH (f)-[:{rel}]->(n{i}:{label})"
+                    for i, (rel, label, _) in enumerate(entity_types))
+        + "\nRETURN faq_id,\n       "
+        + ",\n       ".join(f"collect(DISTINCT n{i}.name) as {column}"
+                              for i, (_, _, column) in enumerate(entity_types))
+    )
+
+    connector = Neo4jConnector(database=args.database)
+    try:
+        # Leftovers of an interrupted run
+        connector.execute_query(cleanup_query, {"faq_id": bench_id}, write=True)
+
+        for rel, label, _ in entity_types:
+            connector.execute_query(
+                f"""
+                MERGE (f:FAQ {{id: $faq_id}})
+                WITH f
+                UNWIND range(1, $degree) as i
+                CREATE (f)-[:{rel}]->(:{label} {{name: $prefix + toString(i), bench: true}})
+                """,
+                {"faq_id": bench_id, "degree": degree, "prefix": f"bench {label} "},
+                write=True
+            )
+
+        params = {"faq_ids": [bench_id]}
+        before = connector.profile_query(fanout_query, params)
+        after = connector.profile_query(FAQ_ENTITY_NAMES, params)
+        same = (
+            {k: sorted(v) for k, v in connector.execute_query(fanout_query, params)[0].items() if k != "faq_id"} ==
+            {k: sorted(v) for k, v in connector.execute_query(FAQ_ENTITY_NAMES, params)[0].items() if k != "faq_id"}
+        )
+
+        print("=" * 60)
+        print(f"Database: {args.database}")
+        print(f"Synthetic FAQ: {len(entity_types)} entity types x {degree} neighbors")
+        print(f"OPTIONAL MATCH fan-out: {before['db_hits']:>12,} db hits")
+        print(f"CALL subqueries:        {after['db_hits']:>12,} db hits")
+        print(f"Same entity lists:      {same}")
+        print("=" * 60)
+    finally:
+        connector.execute_query(cleanup_query, {"faq_id": bench_id}, write=True)
+        connector.close()
@@ -0,0 +1,289 @@
+"""
+Persistent Disk Cache
+SQLite (WAL) cache tier shared by all worker processes on one machine
+"""
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sentinel for "not in cache" (None is a valid cached value)
+MISS = object()
+
+
+class DiskCache:
+    """
+    Key/value cache in one SQLite file, safe for concurrent processes
+
+    - WAL journal: readers never block the single writer, and several
+      Streamlit worker processes can share the file
+    - Every entry carries a version string (graph version stamp, prompt
+      version, ...); a lookup with a different version is a miss and
+      removes the stale entry
+    - Entries expire after ttl seconds; when the file holds more than
+      max_bytes of values, the least recently used entries are evicted
+
+    Keys are any repr-able value, hashed with SHA-256. Values are pickled.
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        namespace   TEXT NOT NULL,
+        key         TEXT NOT NULL,
+        version     TEXT NOT NULL,
+        value       BLOB NOT NULL,
+        size        INTEGER NOT NULL,
+        created_at  REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes: int = 200 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        evict_every: int = 50
+    ):
+        """
+        Initialize DiskCache
+
+        Args:
+            path: SQLite file path (created if missing)
+            max_bytes: Total value size kept after eviction
+            ttl: Seconds an entry stays valid (None = no expiry)
+            evict_every: Run the size check every N writes from this process
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evict_every = evict_every
+
+        self._local = threading.local()
+        self._writes = 0
+        self._counter_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute(self._SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _hash(key: Any) -> str:
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, key: Any, version: str = "") -> Any:
+        """
+        Look up an entry
+
+        Args:
+            namespace: Cache namespace (e.g. "engine_result")
+            key: Entry key
+            version: Expected version; other versions are stale
+
+        Returns:
+            Cached value, or MISS
+        """
+        key_hash = self._hash(key)
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT version, value, created_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key_hash)
+            ).fetchone()
+
+            if row is None:
+                self._count_lookup(hit=False)
+                return MISS
+
+            stored_version, blob, created_at = row
+            now = time.time()
+            if stored_version != version or (self.ttl and now - created_at > self.ttl):
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key_hash))
+                self._count_lookup(hit=False)
+                return MISS
+
+            with conn:
+                conn.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key_hash)
+                )
+            value = pickle.loads(blob)
+            self._count_lookup(hit=True)
+            return value
+
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"⚠️ Disk cache read failed ({namespace}): {e}")
+            self._count_lookup(hit=False)
+            return MISS
+
+    def _count_lookup(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, namespace: str, key: Any, value: Any, version: str = ""):
+        """
+        Store an entry (replaces any existing entry for the key)
+
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+            value: Picklable value
+            version: Version the value was computed for
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            now = time.time()
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(namespace, key, version, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, self._hash(key), version, blob, len(blob), now, now)
+                )
+        except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"⚠️ Disk cache write failed ({namespace}): {e}")
+            return
+
+        with self._counter_lock:
+            self._writes += 1
+            check = self._writes % self.evict_every == 0
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least recently used ones until under max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        try:
+            conn = self._conn()
+            with conn:
+                if self.ttl:
+                    removed += conn.execute(
+                        "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+                    ).rowcount
+
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    # Walk entries oldest-access first until enough bytes are freed
+                    excess = total - self.max_bytes
+                    cutoff = None
+                    freed = 0
+                    for accessed_at, size in conn.execute(
+                        "SELECT accessed_at, size FROM entries ORDER BY accessed_at"
+                    ):
+                        freed += size
+                        cutoff = accessed_at
+                        if freed >= excess:
+                            break
+                    if cutoff is not None:
+                        removed += conn.execute(
+                            "DELETE FROM entries WHERE accessed_at <= ?", (cutoff,)
+                        ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Disk cache eviction failed: {e}")
+
+        if removed:
+            with self._counter_lock:
+                self.evictions += removed
+            logger.info(f"🔄 Disk cache evicted {removed} entries")
+        return removed
+
+    def clear(self, namespace: Optional[str] = None):
+        """Delete all entries (or one namespace)"""
+        conn = self._conn()
+        with conn:
+            if namespace is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> Dict:
+        """Counters for this process plus entry count / bytes for the whole file"""
+        try:
+            count, total = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            count, total = None, None
+        with self._counter_lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+        }
+
+
+_disk_cache: Optional[DiskCache] = None
+_disk_cache_lock = threading.Lock()
+_disk_cache_failed = False
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """
+    Process-wide DiskCache from config (None if disabled or unavailable)
+    """
+    global _disk_cache, _disk_cache_failed
+    if not getattr(config, 'DISK_CACHE_ENABLED', False) or _disk_cache_failed:
+        return None
+    if _disk_cache is not None:
+        return _disk_cache
+
+    with _disk_cache_lock:
+        if _disk_cache is None and not _disk_cache_failed:
+            try:
+                _disk_cache = DiskCache(
+                    config.DISK_CACHE_PATH,
+                    max_bytes=getattr(config, 'DISK_CACHE_MAX_BYTES', 200 * 1024 * 1024),
+                    ttl=getattr(config, 'DISK_CACHE_TTL_SECONDS', None)
+                )
+                logger.info(f"✅ Disk cache ready: {config.DISK_CACHE_PATH}")
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"⚠️ Disk cache disabled: {e}")
+                _disk_cache_failed = True
+    return _disk_cache
+
+
+def llm_cache_version(model: str) -> str:
+    """Version for cached LLM outputs: model + manual prompt version"""
+    return f"{model}:{getattr(config, 'LLM_PROMPT_VERSION', '1')}"
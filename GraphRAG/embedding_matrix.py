@@ -0,0 +1,120 @@
+"""
+In-process FAQ Embedding Matrix
+Pre-normalized float32 matrix of all FAQ embeddings for vectorized top-k search
+"""
+
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FAQEmbeddingMatrix:
+    """
+    All FAQ embeddings as one contiguous (n, dim) float32 matrix
+
+    Rows are L2-normalized at load time, so cosine similarity against a query
+    is a single matrix-vector product. The matrix is keyed by the graph
+    version stamp and reloaded when the stamp changes.
+    """
+
+    def __init__(self, queries, version_tracker):
+        """
+        Initialize FAQEmbeddingMatrix
+
+        Args:
+            queries: QueryRegistry with the "faq_embeddings" query
+            version_tracker: GraphVersionTracker
+        """
+        self.queries = queries
+        self.version_tracker = version_tracker
+        # (ids, matrix, version) swapped as one tuple so readers never mix loads
+        self._state: Tuple[List[str], Optional[np.ndarray], Optional[str]] = ([], None, None)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> bool:
+        """
+        Load (or reload) the matrix if the graph version changed
+
+        Returns:
+            True if a matrix is available
+        """
+        version = self.version_tracker.current()
+        if self._loaded and version == self._state[2]:
+            return self._state[1] is not None
+
+        with self._lock:
+            if not (self._loaded and version == self._state[2]):
+                self._load(version)
+                self._loaded = True
+
+        return self._state[1] is not None
+
+    def _load(self, version: Optional[str]):
+        columns = self.queries.fetch_columns("faq_embeddings", vector_columns=["embedding"])
+        ids = columns.get("id", [])
+        matrix = columns.get("embedding")
+
+        if not ids or matrix is None or matrix.size == 0:
+            logger.warning("No FAQ embeddings found for embedding matrix")
+            self._state = ([], None, version)
+            return
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.ascontiguousarray(matrix / np.where(norms == 0, 1.0, norms), dtype=np.float32)
+
+        self._state = (list(ids), matrix, version)
+        logger.info(f"✅ Loaded FAQ embedding matrix {matrix.shape} (graph version {version})")
+
+    def top_k(self, query_embedding, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Top-k FAQs by cosine similarity
+
+        Args:
+            query_embedding: Query vector (any float sequence)
+            top_k: Number of results
+
+        Returns:
+            List of (faq_id, cosine) sorted by similarity
+        """
+        if not self.ensure_fresh():
+            return []
+
+        ids, matrix, _ = self._state
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        scores = matrix @ (query / norm)
+
+        k = min(top_k, len(ids))
+        if k <= 0:
+            return []
+        if k < len(ids):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-scores[top])]
+
+        return [(ids[i], float(scores[i])) for i in top]
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        """Normalized (n, dim) matrix of the current load (None if no embeddings)"""
+        return self._state[1]
+
+    @property
+    def version(self) -> Optional[str]:
+        """Graph version of the current load"""
+        return self._state[2]
+
+    @property
+    def size(self) -> int:
+        """Number of FAQs in the matrix"""
+        return len(self._state[0])
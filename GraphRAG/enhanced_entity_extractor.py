@@ -6,7 +6,11 @@ Cải tiến từ SimpleEntityExtractor
 
 import re
 import logging
+from functools import lru_cache
 from typing import Dict, List, Tuple
+
+from normalized_query import normalize_query
+from pattern_matcher import CompiledPatternSet
 # from simple_entity_extractor import SimpleEntityExtractor  # NOT NEEDED - using LLM extractor
 
 # Setup logger
@@ -355,6 +359,31 @@ class EnhancedEntityExtractor:
             ("mở khóa", "ví"): ("Topic", "Mở khóa tài khoản"),
         }
 
+        # All pattern lists + contextual rule keywords compiled into one matcher
+        # (one scan per query instead of one re.search per pattern)
+        self.pattern_set = CompiledPatternSet(
+            {
+                "Error": self.error_patterns_regex,
+                "Topic": self.topic_patterns_regex,
+                "Action": self.action_patterns_regex,
+                "Status": self.status_patterns_regex,
+                "Fee": self.fee_patterns_regex,
+                "Limit": self.limit_patterns_regex,
+                "Requirement": self.requirement_patterns_regex,
+                "Feature": self.feature_patterns_regex,
+                "UIElement": self.ui_element_patterns_regex,
+                "TimeFrame": self.timeframe_patterns_regex,
+                "Document": self.document_patterns_regex,
+                "AccountType": self.account_type_patterns_regex,
+                "ContactChannel": self.contact_channel_patterns_regex,
+                "Service": self.service_patterns_regex,
+                "Bank": self.bank_patterns_regex,
+            },
+            keywords=[keyword for pair in self.contextual_rules for keyword in pair]
+        )
+        # Regex extraction and contextual rules scan the same query text
+        self._scan = lru_cache(maxsize=256)(self.pattern_set.scan)
+
     def extract_with_confidence(self, query: str) -> Tuple[Dict[str, List[str]], float]:
         """
         HYBRID extraction with strategy selection:
@@ -464,118 +493,16 @@ class EnhancedEntityExtractor:
         return entities, confidence
 
     def _extract_with_regex(self, query: str) -> Dict[str, List[str]]:
-        """Extract entities using regex patterns (EXPANDED for all entity types)"""
-        entities = {
-            "Error": [],
-            "Topic": [],
-            "Action": [],
-            "Status": [],
-            "Fee": [],
-            "Limit": [],
-            "Requirement": [],
-            "Feature": [],
-            "UIElement": [],
-            "TimeFrame": [],
-            "Document": [],
-            "AccountType": [],
-            "ContactChannel": [],
-            "Service": [],
-            "Bank": []
-        }
-
-        query_lower = query.lower()
-
-        # Check error regex patterns
-        for pattern, error_name in self.error_patterns_regex:
-            if re.search(pattern, query_lower):
-                if error_name not in entities["Error"]:
-                    entities["Error"].append(error_name)
-
-        # Check topic regex patterns
-        for pattern, topic_name in self.topic_patterns_regex:
-            if re.search(pattern, query_lower):
-                if topic_name not in entities["Topic"]:
-                    entities["Topic"].append(topic_name)
-
-        # Check action regex patterns (NEW!)
-        for pattern, action_name in self.action_patterns_regex:
-            if re.search(pattern, query_lower):
-                if action_name not in entities["Action"]:
-                    entities["Action"].append(action_name)
-
-        # Check status regex patterns (NEW!)
-        for pattern, status_name in self.status_patterns_regex:
-            if re.search(pattern, query_lower):
-                if status_name not in entities["Status"]:
-                    entities["Status"].append(status_name)
-
-        # Check fee regex patterns (NEW! - IMPORTANT)
-        for pattern, fee_name in self.fee_patterns_regex:
-            if re.search(pattern, query_lower):
-                if fee_name not in entities["Fee"]:
-                    entities["Fee"].append(fee_name)
-
-        # Check limit regex patterns (NEW!)
-        for pattern, limit_name in self.limit_patterns_regex:
-            if re.search(pattern, query_lower):
-                if limit_name not in entities["Limit"]:
-                    entities["Limit"].append(limit_name)
-
-        # Check requirement regex patterns (NEW! - PRIORITY 1)
-        for pattern, requirement_name in self.requirement_patterns_regex:
-            if re.search(pattern, query_lower):
-                if requirement_name not in entities["Requirement"]:
-                    entities["Requirement"].append(requirement_name)
-
-        # Check feature regex patterns (NEW! - PRIORITY 1)
-        for pattern, feature_name in self.feature_patterns_regex:
-            if re.search(pattern, query_lower):
-                if feature_name not in entities["Feature"]:
-                    entities["Feature"].append(feature_name)
-
-        # Check UI element regex patterns (NEW! - PRIORITY 1 - CRITICAL!)
-        for pattern, ui_name in self.ui_element_patterns_regex:
-            if re.search(pattern, query_lower):
-                if ui_name not in entities["UIElement"]:
-                    entities["UIElement"].append(ui_name)
-
-        # Check timeframe regex patterns (NEW! - PRIORITY 2)
-        for pattern, timeframe_name in self.timeframe_patterns_regex:
-            if re.search(pattern, query_lower):
-                if timeframe_name not in entities["TimeFrame"]:
-                    entities["TimeFrame"].append(timeframe_name)
-
-        # Check document regex patterns (NEW! - PRIORITY 2)
-        for pattern, document_name in self.document_patterns_regex:
-            if re.search(pattern, query_lower):
-                if document_name not in entities["Document"]:
-                    entities["Document"].append(document_name)
-
-        # Check account type regex patterns (NEW! - PRIORITY 2)
-        for pattern, account_type_name in self.account_type_patterns_regex:
-            if re.search(pattern, query_lower):
-                if account_type_name not in entities["AccountType"]:
-                    entities["AccountType"].append(account_type_name)
-
-        # Check contact channel regex patterns (NEW! - PRIORITY 3)
-        for pattern, channel_name in self.contact_channel_patterns_regex:
-            if re.search(pattern, query_lower):
-                if channel_name not in entities["ContactChannel"]:
-                    entities["ContactChannel"].append(channel_name)
-
-        # Check service regex patterns (IMPROVED!)
-        for pattern, service_name in self.service_patterns_regex:
-            if re.search(pattern, query_lower):
-                if service_name not in entities["Service"]:
-                    entities["Service"].append(service_name)
-
-        # Check bank regex patterns (IMPROVED!)
-        for pattern, bank_name in self.bank_patterns_regex:
-            if re.search(pattern, query_lower):
-                if bank_name not in entities["Bank"]:
-                    entities["Bank"].append(bank_name)
+        """
+        Extract entities using regex patterns (EXPANDED for all entity types)
 
-        return entities
+        Error, Topic, Action, Status, Fee, Limit, Requirement, Feature,
+        UIElement, TimeFrame, Document, AccountType, ContactChannel, Service
+        and Bank patterns are matched in one compiled scan; labels keep
+        pattern order, duplicates removed.
+        """
+        labels, _ = self._scan(normalize_query(query).lower)
+        return {entity_type: list(values) for entity_type, values in labels.items()}
 
     def _merge_entities(
         self,
@@ -601,10 +528,10 @@ class EnhancedEntityExtractor:
         entities: Dict[str, List[str]]
     ) -> Dict[str, List[str]]:
         """Apply contextual rules to improve extraction"""
-        query_lower = query.lower()
+        _, keywords = self._scan(normalize_query(query).lower)
 
         for (keyword1, keyword2), (entity_type, entity_value) in self.contextual_rules.items():
-            if keyword1 in query_lower and keyword2 in query_lower:
+            if keyword1 in keywords and keyword2 in keywords:
                 if entity_type not in entities:
                     entities[entity_type] = []
                 if entity_value not in entities[entity_type]:
@@ -618,7 +545,7 @@ class EnhancedEntityExtractor:
         entities: Dict[str, List[str]]
     ) -> Dict[str, List[str]]:
         """Validate and auto-correct entities"""
-        query_lower = query.lower()
+        query_lower = normalize_query(query).lower
 
         # Rule: Nếu có "mở khóa" → xóa "Khóa tài khoản" (vì "mở khóa" ưu tiên hơn "khóa")
         if "mở khóa" in query_lower and "Mở khóa tài khoản" in entities.get("Topic", []):
@@ -731,7 +658,7 @@ class EnhancedEntityExtractor:
         """
         import config
 
-        query_lower = query.lower()
+        query_lower = normalize_query(query).lower
 
         # Trigger 1: Low confidence
         if confidence < config.LLM_FALLBACK_THRESHOLD:
@@ -760,7 +687,7 @@ class EnhancedEntityExtractor:
             "bao nhiêu", "là gì", "tại sao", "khi nào",
             "ở đâu", "ai", "có", "phải", "được"
         ]
-        query_lower = query.lower()
+        query_lower = normalize_query(query).lower
         return any(kw in query_lower for kw in question_keywords)
 
     def _has_answer_entities(self, entities: Dict) -> bool:
@@ -771,7 +698,7 @@ class EnhancedEntityExtractor:
 
     def _is_ambiguous(self, query: str, entities: Dict) -> bool:
         """Check if query/entities are ambiguous"""
-        query_lower = query.lower()
+        query_lower = normalize_query(query).lower
 
         # "hủy" without specific action
         if "hủy" in query_lower and not entities.get("Action"):
@@ -787,7 +714,7 @@ class EnhancedEntityExtractor:
 
     def _missing_critical_entities(self, query: str, entities: Dict) -> bool:
         """Check if critical entities are missing"""
-        query_lower = query.lower()
+        query_lower = normalize_query(query).lower
 
         # Query mentions fee but Fee not extracted
         fee_keywords = ["phí", "bao nhiêu", "tốn", "chi phí", "mất tiền"]
@@ -954,9 +881,15 @@ class EnhancedEntityExtractor:
         - Validate factual entities (Bank, Document) against known patterns
         - Keep semantic entities (Topic, Action) as-is (LLM can infer these)
         """
+        import string
+
         validated = {}
 
-        query_lower = query.lower()
+        normalized = normalize_query(query)
+        query_lower = normalized.lower
+        # Query word forms, computed once for all values
+        query_token_set = set(normalized.tokens)
+        query_words = [w.strip(string.punctuation) for w in normalized.tokens]
 
         for entity_type, values in entities.items():
             validated[entity_type] = []
@@ -967,8 +900,7 @@ class EnhancedEntityExtractor:
                     # For these, LLM inference is acceptable
                     # But still check if it's too far from query
                     value_words = set(value.lower().split())
-                    query_words = set(query_lower.split())
-                    overlap = len(value_words & query_words)
+                    overlap = len(value_words & query_token_set)
 
                     # Accept if at least 30% overlap or very short (1-2 words)
                     if overlap > 0 or len(value_words) <= 2:
@@ -988,10 +920,8 @@ class EnhancedEntityExtractor:
                 else:
                     # Check if at least one word appears
                     # CRITICAL FIX: Clean punctuation from words before matching
-                    import string
                     value_words = [w.strip(string.punctuation) for w in value.lower().split()]
                     # Also check if query words appear in entity value (for cases like "vinaphone" in "Vinaphone: 18001091")
-                    query_words = [w.strip(string.punctuation) for w in query_lower.split()]
 
                     # Match if any word from value appears in query OR any word from query appears in value
                     word_match = any(word in query_lower for word in value_words if word) or \
@@ -1025,6 +955,48 @@ if __name__ == "__main__":
         "Tài khoản không hợp lệ",
     ]
 
+    if len(sys.argv) > 1 and sys.argv[1] == "--regression":
+        # Regression corpus: compiled pattern scan must equal one re.search per pattern
+        # Usage: python enhanced_entity_extractor.py --regression [queries.jsonl|queries.txt ...]
+        import json
+        import time
+
+        corpus = list(test_queries)
+        for path in sys.argv[2:]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        corpus.append(json.loads(line)["query"] if line.startswith("{") else line)
+
+        # Whitespace / punctuation variants exercise the collapsed-text and \b handling
+        variants = []
+        for query in corpus:
+            variants.extend([query, f"  {query}\t", query.replace(" ", "  "), query.replace(" ", "\n", 1),
+                             query.replace(" ", "_", 1), f'"{query}"'])
+        texts = list(dict.fromkeys(normalize_query(v).lower for v in variants))
+
+        mismatches = 0
+        for text in texts:
+            if extractor.pattern_set.scan(text) != extractor.pattern_set.reference_scan(text):
+                mismatches += 1
+                print(f"❌ MISMATCH: {text!r}")
+                print(f"   compiled:  {extractor.pattern_set.scan(text)}")
+                print(f"   reference: {extractor.pattern_set.reference_scan(text)}")
+
+        start = time.perf_counter()
+        for text in texts:
+            extractor.pattern_set.scan(text)
+        compiled_us = (time.perf_counter() - start) / len(texts) * 1e6
+        start = time.perf_counter()
+        for text in texts:
+            extractor.pattern_set.reference_scan(text)
+        reference_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+        print(f"{len(texts)} texts, {mismatches} mismatches")
+        print(f"compiled scan: {compiled_us:.1f} µs/query, per-pattern re.search: {reference_us:.1f} µs/query")
+        sys.exit(1 if mismatches else 0)
+
     print("=" * 80)
     print("ENHANCED ENTITY EXTRACTOR TEST")
     print("=" * 80)
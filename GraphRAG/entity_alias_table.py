@@ -0,0 +1,127 @@
+"""
+Entity Alias Table
+In-process map from normalized entity names to Neo4j entity node ids for graph search
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EntityAliasTable:
+    """
+    Resolves query entity strings to the entity nodes ENTITY_GRAPH_SEARCH would match
+
+    Matching rules are the same as the Cypher WHERE clause it replaces:
+    1. Exact, case-insensitive name match (dict lookup on name_norm)
+    2. For query entities of 3+ characters, word-boundary phrase match in
+       either direction ("liên kết" ↔ "liên kết ngân hàng")
+
+    The table holds every named node an FAQ points to, is rebuilt when the
+    graph version changes, and memoizes resolved entities per version in a
+    bounded table.
+    """
+
+    def __init__(self, queries, version_tracker=None, max_resolved: int = 4096):
+        """
+        Initialize EntityAliasTable
+
+        Args:
+            queries: QueryRegistry with the "faq_entity_nodes" query
+            version_tracker: GraphVersionTracker (optional)
+            max_resolved: Query entities memoized per graph version
+        """
+        self.queries = queries
+        self.version_tracker = version_tracker
+        self.max_resolved = max_resolved
+        self._version: Optional[str] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        # name_norm -> node ids (one name can exist under several labels)
+        self._by_name: Dict[str, Tuple[str, ...]] = {}
+        # query entity -> resolved node ids, cleared on rebuild or when full
+        self._resolved: Dict[str, Tuple[str, ...]] = {}
+
+    def ensure_fresh(self):
+        """Rebuild the table from Neo4j if the graph version changed"""
+        version = self.version_tracker.current() if self.version_tracker else None
+        if self._loaded and version == self._version:
+            return
+
+        with self._lock:
+            if self._loaded and version == self._version:
+                return
+
+            by_name: Dict[str, List[str]] = {}
+            for node_id, name_norm in self.queries.stream("faq_entity_nodes", as_tuples=True):
+                by_name.setdefault(name_norm, []).append(node_id)
+
+            self._by_name = {name: tuple(ids) for name, ids in by_name.items()}
+            self._resolved = {}
+            self._version = version
+            self._loaded = True
+            logger.info(f"✅ Built entity alias table: {len(self._by_name)} names (graph version {version})")
+
+    def resolve(self, entity_names: List[str]) -> List[str]:
+        """
+        Resolve query entities to entity node ids
+
+        Args:
+            entity_names: Entity strings extracted from the query
+
+        Returns:
+            Distinct node ids in first-match order
+        """
+        self.ensure_fresh()
+        by_name, resolved = self._by_name, self._resolved
+
+        node_ids: Dict[str, None] = {}
+        for entity in entity_names:
+            ids = resolved.get(entity)
+            if ids is None:
+                if len(resolved) >= self.max_resolved:
+                    resolved.clear()
+                ids = self._match(entity, by_name)
+                resolved[entity] = ids
+            node_ids.update(dict.fromkeys(ids))
+
+        return list(node_ids)
+
+    @staticmethod
+    def _match(entity: str, by_name: Dict[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+        """Node ids whose name matches one query entity"""
+        query = entity.lower()
+        ids = list(by_name.get(query, ()))
+
+        # Word-boundary matching only for entities of 3+ characters
+        if len(entity) >= 3:
+            for name, name_ids in by_name.items():
+                if name == query:
+                    continue
+                if len(name) > len(query):
+                    # DB entity contains query entity as a phrase
+                    matched = (
+                        f" {query} " in name or
+                        name.startswith(query + " ") or
+                        name.endswith(" " + query)
+                    )
+                else:
+                    # Query entity contains DB entity as a phrase
+                    matched = (
+                        f" {name} " in query or
+                        query.startswith(name + " ") or
+                        query.endswith(" " + name)
+                    )
+                if matched:
+                    ids.extend(name_ids)
+
+        return tuple(ids)
+
+    @property
+    def size(self) -> int:
+        """Number of distinct normalized names"""
+        return len(self._by_name)
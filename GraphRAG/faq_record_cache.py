@@ -0,0 +1,307 @@
+"""
+FAQ Record Cache
+Graph-version-stamped in-process copy of FAQ context, cases and process steps
+"""
+
+import copy
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from process_steps import ProcessSteps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FAQRecordCache:
+    """
+    Compact per-FAQ records loaded from Neo4j in one bulk pass
+
+    FAQ question, answer, linked entities, cases and process steps only
+    change when the graph is reloaded, so the engine reads them from memory
+    and reloads when the graph version stamp changes.
+
+    Each record holds:
+        context:    FAQ_CONTEXT row (f + all entity lists)
+        cases:      FAQ_CASES rows, ordered by case_id
+        with_cases: FAQ_WITH_CASES "cases" list (follow-up search)
+        processes:  [{process_name, process_id, steps: [{number, text}]}]
+        steps:      ProcessSteps over all processes (step continuation)
+
+    Lookups return deep copies, so callers can modify them freely.
+    """
+
+    def __init__(self, queries, version_tracker):
+        """
+        Initialize FAQRecordCache
+
+        Args:
+            queries: QueryRegistry with the "all_faq_*" bulk queries
+            version_tracker: GraphVersionTracker
+        """
+        self.queries = queries
+        self.version_tracker = version_tracker
+        # (records, alternative action rows, version) swapped as one tuple
+        self._state: Tuple[Dict[str, Dict], List[Dict], Optional[str]] = ({}, [], None)
+        self._loaded = False
+        self._failed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> bool:
+        """
+        Load (or reload) the records if the graph version changed
+
+        Returns:
+            True if records are available (False if loading failed)
+        """
+        version = self.version_tracker.current()
+        if self._loaded and version == self._state[2]:
+            return True
+
+        # Don't retry a failed load on every request
+        if time.monotonic() - self._failed_at < self.version_tracker.check_interval:
+            return False
+
+        with self._lock:
+            if not (self._loaded and version == self._state[2]):
+                try:
+                    self._load(version)
+                    self._loaded = True
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load FAQ record cache: {e}")
+                    self._failed_at = time.monotonic()
+                    return False
+
+        return True
+
+    def _load(self, version: Optional[str]):
+        start = time.perf_counter()
+        records: Dict[str, Dict] = {}
+
+        for row in self.queries.stream("all_faq_context"):
+            faq_id = row.pop("node_id")
+            records[faq_id] = {"context": row, "cases": [], "with_cases": [], "processes": []}
+
+        for row in self.queries.stream("all_faq_cases"):
+            record = records.get(row.pop("node_id"))
+            if record is not None:
+                record["cases"].append(row)
+
+        for row in self.queries.stream("all_faq_with_cases"):
+            record = records.get(row["faq_id"])
+            if record is not None:
+                record["with_cases"] = row["cases"]
+
+        for row in self.queries.stream("all_faq_process_steps"):
+            record = records.get(row.pop("faq_id"))
+            if record is not None:
+                record["processes"].append(row)
+
+        for record in records.values():
+            faq = record["context"]["f"]
+            record["steps"] = ProcessSteps(faq.get("question"), faq.get("answer"), record["processes"])
+
+        alternatives = self.queries.run("all_alternative_actions")
+
+        self._state = (records, alternatives, version)
+        logger.info(f"✅ Loaded FAQ record cache: {len(records)} FAQs in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms (graph version {version})")
+
+    # ============================================
+    # GRAPH CONTEXT
+    # ============================================
+
+    def context_batch(self, node_ids: List[str]):
+        """
+        Graph context for many FAQs (same shapes as the FAQ_CONTEXT / FAQ_CASES batch)
+
+        Args:
+            node_ids: Distinct FAQ ids
+
+        Returns:
+            ({faq_id: context row}, {faq_id: [case rows]},
+             {faq_id: [alternative actions]}, [ids not in the cache])
+        """
+        records, alt_rows, _ = self._state
+        contexts, cases, alternatives, missing = {}, {}, {}, []
+
+        for faq_id in node_ids:
+            record = records.get(faq_id)
+            if record is None:
+                missing.append(faq_id)
+                continue
+
+            contexts[faq_id] = copy.deepcopy(record["context"])
+            if record["cases"]:
+                cases[faq_id] = copy.deepcopy(record["cases"])
+
+            faq_actions = set(record["context"].get("actions", []))
+            if faq_actions:
+                alternatives[faq_id] = [
+                    {"action": r["action"], "reason": r.get("reason", "")}
+                    for r in alt_rows if r["source"] in faq_actions
+                ]
+
+        return contexts, cases, alternatives, missing
+
+    def questions(self, faq_ids: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        FAQ questions by id
+
+        Returns:
+            ({faq_id: question}, [ids not in the cache])
+        """
+        records = self._state[0]
+        found, missing = {}, []
+        for faq_id in faq_ids:
+            record = records.get(faq_id)
+            if record is None:
+                missing.append(faq_id)
+            else:
+                found[faq_id] = record["context"]["f"].get("question")
+        return found, missing
+
+    def question_topics(self, faq_ids: List[str]) -> Tuple[Dict[str, Tuple[str, Tuple[str, ...]]], List[str]]:
+        """
+        (question, topics) by id, as _rank_results candidates carry them
+
+        Returns:
+            ({faq_id: (question, topics)}, [ids not in the cache])
+        """
+        records = self._state[0]
+        found, missing = {}, []
+        for faq_id in faq_ids:
+            record = records.get(faq_id)
+            if record is None:
+                missing.append(faq_id)
+                continue
+            context = record["context"]
+            found[faq_id] = (
+                context["f"].get("question", ""),
+                tuple(t for t in context.get("topics", []) if t)
+            )
+        return found, missing
+
+    def ranking_texts(self) -> List[Tuple[str, str, Tuple[str, ...]]]:
+        """(question, answer, topics) of every FAQ, as _rank_results candidates carry them"""
+        texts = []
+        for record in self._state[0].values():
+            context = record["context"]
+            faq = context["f"]
+            texts.append((
+                faq.get("question", ""),
+                faq.get("answer", ""),
+                tuple(t for t in context.get("topics", []) if t)
+            ))
+        return texts
+
+    def faq_with_cases(self, faq_id: str) -> Optional[List[Dict]]:
+        """FAQ_WITH_CASES rows for one FAQ, or None if the FAQ is not cached"""
+        record = self._state[0].get(faq_id)
+        if record is None:
+            return None
+        return [{"f": copy.deepcopy(record["context"]["f"]), "cases": copy.deepcopy(record["with_cases"])}]
+
+    # ============================================
+    # PROCESS STEPS (same rows as the STEPS_* queries)
+    # ============================================
+
+    def process_steps(self, faq_id: str) -> Optional[ProcessSteps]:
+        """Ordered step arrays of one FAQ's processes, or None if the FAQ is not cached"""
+        record = self._state[0].get(faq_id)
+        return record["steps"] if record is not None else None
+
+    def run_step_query(self, name: str, params: Dict) -> Optional[List[Dict]]:
+        """
+        Answer a process-step query from memory
+
+        Args:
+            name: One of the steps_by_process_name / steps_by_question_keywords
+                (or step_count_*) query names
+            params: The query parameters
+
+        Returns:
+            Result rows, or None if the query must go to Neo4j
+        """
+        records = self._state[0]
+
+        if name in ("steps_by_process_name", "step_count_by_process_name"):
+            required = params["required_keywords"]
+            optional = params["optional_keywords"]
+            candidates = []
+            for record in records.values():
+                question_lower = (record["context"]["f"].get("question") or "").lower()
+                if not all(kw in question_lower for kw in required):
+                    continue
+                optional_score = sum(1 for kw in optional if kw in question_lower)
+                for process in record["processes"]:
+                    if process["process_name"] == params["process_name"]:
+                        candidates.append((optional_score, len(process["steps"]), record, process))
+            if not candidates:
+                return []
+            # ORDER BY optional_score DESC, total DESC LIMIT 1
+            _, total, record, process = max(candidates, key=lambda c: (c[0], c[1]))
+            if name == "step_count_by_process_name":
+                return [{"total_count": total}]
+            return self._step_rows([(record, process)], params, order_by_process=False)
+
+        if name == "steps_by_question_keywords":
+            pairs = []
+            for record in records.values():
+                question_lower = (record["context"]["f"].get("question") or "").lower()
+                if any(kw in question_lower for kw in params["keywords"]):
+                    pairs.extend((record, process) for process in record["processes"])
+            return self._step_rows(pairs, params, order_by_process=True)[:50]
+
+        return None
+
+    @staticmethod
+    def _step_rows(pairs, params: Dict, order_by_process: bool) -> List[Dict]:
+        """Rows for the steps of (record, process) pairs starting at params["from_step"]"""
+        from_step = params["from_step"]
+        only_next_step = params["only_next_step"]
+
+        rows = []
+        for record, process in pairs:
+            faq = record["context"]["f"]
+            for step in process["steps"]:
+                number = step.get("number")
+                if number is None:
+                    continue
+                if (number != from_step) if only_next_step else (number < from_step):
+                    continue
+                row = {
+                    "faq_question": faq.get("question"),
+                    "faq_answer": faq.get("answer"),
+                    "process_name": process["process_name"],
+                    "process_id": process["process_id"],
+                    "step_num": number,
+                    "step_text": step.get("text"),
+                }
+                if order_by_process:
+                    row["faq_lower"] = (faq.get("question") or "").lower()
+                else:
+                    row["total_steps_in_process"] = len(process["steps"])
+                rows.append(row)
+
+        if order_by_process:
+            rows.sort(key=lambda r: (str(r["process_id"]), r["step_num"]))
+        else:
+            rows.sort(key=lambda r: r["step_num"])
+        return rows
+
+    def faq_ids(self) -> List[str]:
+        """Ids of all cached FAQs"""
+        return list(self._state[0])
+
+    @property
+    def version(self) -> Optional[str]:
+        """Graph version the records were loaded for"""
+        return self._state[2]
+
+    @property
+    def size(self) -> int:
+        """Number of cached FAQs"""
+        return len(self._state[0])
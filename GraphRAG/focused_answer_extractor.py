@@ -19,6 +19,8 @@ from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+import tracing
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -314,17 +316,30 @@ Chỉ trả lời phần liên quan, không liệt kê thêm thông tin không 
             # Tăng max_tokens cho TROUBLESHOOT/HOW_TO vì cần giữ nhiều thông tin
             max_tokens = 1000 if needs_full_info else 500
 
-            response = self.llm_client.chat.completions.create(
-                model=self._llm_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,  # Low temperature for focused extraction
-                max_tokens=max_tokens
-            )
+            # Disk cache (shared across processes, keyed by the full prompt)
+            from disk_cache import get_disk_cache, llm_cache_version, MISS
+            disk_cache = get_disk_cache()
+            cache_key = (max_tokens, system_prompt, user_prompt)
+            cache_version = llm_cache_version(self._llm_model)
+            result_text = MISS
+            if disk_cache is not None:
+                result_text = disk_cache.get("focused_answer", cache_key, cache_version)
+
+            if result_text is MISS:
+                with tracing.llm_call("focused_answer", self._llm_model, max_tokens=max_tokens):
+                    response = self.llm_client.chat.completions.create(
+                        model=self._llm_model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.1,  # Low temperature for focused extraction
+                        max_tokens=max_tokens
+                    )
 
-            result_text = response.choices[0].message.content.strip()
+                result_text = response.choices[0].message.content.strip()
+                if disk_cache is not None:
+                    disk_cache.put("focused_answer", cache_key, result_text, cache_version)
 
             # Check for failure response
             if "KHÔNG_TÌM_THẤY" in result_text:
@@ -6,13 +6,15 @@ Phát hiện câu hỏi follow-up vs câu hỏi mới hoàn toàn
 import logging
 import json
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 import config
+import tracing
+from normalized_query import NormalizedQuery, normalize_query
 
 # Try to import OpenAI
 try:
@@ -126,7 +128,7 @@ class FollowUpDetector:
         }
 
     def detect(self,
-               query: str,
+               query: Union[str, NormalizedQuery],
                memories: List[Dict] = None,
                previous_qa: Dict = None,
                memory_score_threshold: float = 0.7,
@@ -135,7 +137,7 @@ class FollowUpDetector:
         Detect if query is a follow-up question
 
         Args:
-            query: Current user query
+            query: Current user query (or its NormalizedQuery)
             memories: List of memories from Mem0 search
             previous_qa: Previous Q&A pair (optional, for context)
             memory_score_threshold: Threshold for memory-based detection
@@ -144,7 +146,8 @@ class FollowUpDetector:
         Returns:
             FollowUpResult with detection details
         """
-        query_lower = query.lower().strip()
+        normalized = normalize_query(query)
+        query_lower = normalized.stripped
 
         # Layer 1: Rule-based quick check
         rule_result = self._check_rules(query_lower)
@@ -160,7 +163,7 @@ class FollowUpDetector:
 
         # Layer 3: LLM-based detection (for uncertain cases)
         if use_llm and self.llm_client and memories:
-            llm_result = self._detect_with_llm(query, memories, previous_qa)
+            llm_result = self._detect_with_llm(normalized.raw, memories, previous_qa)
             if llm_result:
                 return llm_result
 
@@ -299,15 +302,16 @@ Trả lời bằng JSON:
 
 Chỉ trả về JSON, không có text khác."""
 
-            response = self.llm_client.chat.completions.create(
-                model=self.llm_model,
-                messages=[
-                    {"role": "system", "content": "Bạn là AI phân tích hội thoại, trả lời bằng JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=300
-            )
+            with tracing.llm_call("follow_up_detection", self.llm_model):
+                response = self.llm_client.chat.completions.create(
+                    model=self.llm_model,
+                    messages=[
+                        {"role": "system", "content": "Bạn là AI phân tích hội thoại, trả lời bằng JSON."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1,
+                    max_tokens=300
+                )
 
             result_text = response.choices[0].message.content.strip()
 
@@ -0,0 +1,91 @@
+"""
+Graph Version Tracker
+Cheap, throttled check of the Neo4j graph version stamp for in-process caches
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class GraphVersionTracker:
+    """
+    Tracks the graph version stamp (see Neo4jConnector.get_graph_version)
+
+    The stamp is re-read from Neo4j at most once per check interval, so caches
+    can call current() on every request. Listeners registered with
+    on_change() are called once whenever a new stamp is observed.
+    """
+
+    def __init__(self, connector, check_interval: float = None):
+        """
+        Initialize GraphVersionTracker
+
+        Args:
+            connector: Neo4jConnector instance
+            check_interval: Seconds between version checks (default from config)
+        """
+        self.connector = connector
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else getattr(config, 'GRAPH_VERSION_CHECK_INTERVAL', 30)
+        )
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def current(self, force: bool = False) -> Optional[str]:
+        """
+        Get the graph version stamp (re-checked at most every check_interval)
+
+        Args:
+            force: Re-read from Neo4j regardless of the interval
+
+        Returns:
+            Version stamp, or the last known stamp if Neo4j could not be read
+        """
+        now = time.monotonic()
+        if not force and self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+
+        with self._lock:
+            if not force and self._version is not None and now - self._checked_at < self.check_interval:
+                return self._version
+
+            try:
+                version = self.connector.get_graph_version()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read graph version: {e}")
+                self._checked_at = now
+                return self._version
+
+            changed = version != self._version
+            previous = self._version
+            self._version = version
+            self._checked_at = now
+
+        if changed:
+            if previous is not None:
+                logger.info(f"🔄 Graph version changed: {previous} → {version}")
+            for listener in list(self._listeners):
+                try:
+                    listener(version)
+                except Exception as e:
+                    logger.warning(f"⚠️ Graph version listener failed: {e}")
+
+        return version
+
+    def on_change(self, listener: Callable[[str], None]):
+        """Register a callback invoked with the new stamp when the version changes"""
+        self._listeners.append(listener)
+
+    def invalidate(self):
+        """Force the next current() call to re-read the version"""
+        self._checked_at = 0.0
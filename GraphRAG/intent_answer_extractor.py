@@ -13,6 +13,7 @@ import re
 from typing import Dict, List, Optional, Tuple
 from openai import OpenAI, DefaultHttpxClient
 import config
+import tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -102,15 +103,16 @@ class IntentAnswerExtractor:
 
         try:
             # Call LLM for extraction
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt(intent)},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,  # Low temperature for precise extraction
-                max_tokens=1000
-            )
+            with tracing.llm_call("intent_extraction", self.model, intent=intent):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": self._get_system_prompt(intent)},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1,  # Low temperature for precise extraction
+                    max_tokens=1000
+                )
 
             result_text = response.choices[0].message.content.strip()
 
@@ -15,13 +15,31 @@ INTENT DISTRIBUTION (from data analysis):
 - INFO_REQUEST: Remaining - General information queries
 """
 
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional, Union
 import re
 import logging
 
+import numpy as np
+
+from normalized_query import NormalizedQuery, normalize_query
+from pattern_matcher import CompiledPatternSet
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Optional: trained TF-IDF + logistic regression model (short-circuits the rule path)
+try:
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+# Time keywords that make TIME win over TROUBLESHOOT
+TIME_QUESTION_KEYWORDS = ["bao lâu", "khi nào", "mất bao lâu", "thời gian"]
+
 
 class IntentClassifier:
     """
@@ -39,8 +57,14 @@ class IntentClassifier:
     9. INFO_REQUEST - General info (fallback)
     """
 
-    def __init__(self):
-        """Initialize intent patterns with priority ordering"""
+    def __init__(self, model_path: Optional[str] = None, model_min_confidence: float = 0.9):
+        """
+        Initialize intent patterns with priority ordering
+
+        Args:
+            model_path: Trained intent model (see train_intent_model); None = rules only
+            model_min_confidence: Model probability needed to skip the rule path
+        """
 
         # Intent patterns ordered by specificity (most specific first)
         self.intent_patterns = {
@@ -270,44 +294,183 @@ class IntentClassifier:
             key=lambda x: x[1]["priority"]
         )
 
-    def classify(self, query: str) -> Tuple[str, float, Dict]:
+        self._compile()
+
+        self.model = None
+        self.model_min_confidence = model_min_confidence
+        if model_path:
+            self.load_model(model_path)
+
+    def _compile(self):
+        """
+        Compile patterns and keywords of all intents into one matcher and
+        the scoring into per-intent vectors
+        """
+        self._intents = list(self.intent_patterns)
+
+        # Pattern labels are their index in the intent's list; keywords are shared
+        self._matcher = CompiledPatternSet(
+            {
+                intent: [(pattern, i) for i, pattern in enumerate(spec["patterns"])]
+                for intent, spec in self.intent_patterns.items()
+            },
+            keywords=[kw.lower() for spec in self.intent_patterns.values() for kw in spec["keywords"]]
+                     + TIME_QUESTION_KEYWORDS
+        )
+
+        # keyword × intent occurrence counts: keyword hits → per-intent keyword counts
+        keyword_index = {kw: i for i, kw in enumerate(self._matcher.keywords)}
+        self._keyword_index = keyword_index
+        self._keyword_matrix = np.zeros((len(keyword_index), len(self._intents)))
+        for j, spec in enumerate(self.intent_patterns.values()):
+            for kw in spec["keywords"]:
+                self._keyword_matrix[keyword_index[kw.lower()], j] += 1
+
+        weights = np.array([spec["weight"] for spec in self.intent_patterns.values()])
+        self._weights = weights
+        self._priority_bonus = np.array([(11 - spec["priority"]) * 0.1 for spec in self.intent_patterns.values()])
+        self._max_possible = np.array([
+            len(spec["patterns"]) + len(spec["keywords"]) * 0.5 for spec in self.intent_patterns.values()
+        ]) * weights
+
+    def load_model(self, path: str) -> bool:
+        """
+        Load a trained intent model
+
+        Returns:
+            True if loaded (False if scikit-learn is missing or the file can't be read)
+        """
+        if not SKLEARN_AVAILABLE:
+            logger.warning("⚠️ scikit-learn not installed - intent model disabled, using rules only")
+            return False
+        try:
+            self.model = joblib.load(path)
+            logger.info(f"✅ Intent model loaded from {path} (classes: {list(self.model.classes_)})")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load intent model {path}: {e}")
+            return False
+
+    def _classify_with_model(self, query_lower: str) -> Optional[Tuple[str, float, Dict]]:
+        """Model prediction if its probability reaches model_min_confidence"""
+        probabilities = self.model.predict_proba([query_lower])[0]
+        best = int(np.argmax(probabilities))
+        if probabilities[best] < self.model_min_confidence:
+            return None
+        return str(self.model.classes_[best]), float(probabilities[best]), {"source": "model"}
+
+    def classify(self, query: Union[str, NormalizedQuery]) -> Tuple[str, float, Dict]:
         """
         Classify user query intent with priority-based scoring.
 
+        A loaded intent model answers first when it is confident enough;
+        otherwise all patterns and keywords are matched in one compiled scan
+        and the intents are scored together (same results as
+        classify_reference).
+
         Args:
-            query: User query string
+            query: User query string (or its NormalizedQuery)
 
         Returns:
             Tuple of (intent_name, confidence, details)
         """
-        query_lower = query.lower().strip()
+        query_lower = normalize_query(query).stripped
+
+        if self.model is not None:
+            result = self._classify_with_model(query_lower)
+            if result is not None:
+                logger.info(f"Intent classified by model: {result[0]} (confidence: {result[1]:.2%})")
+                return result
+
+        matched, keywords_found = self._matcher.scan(query_lower)
+
+        # Raw score = pattern hits + 0.5 per keyword hit, for every intent at once
+        keyword_hits = np.zeros(len(self._keyword_index))
+        keyword_hits[[self._keyword_index[kw] for kw in keywords_found]] = 1.0
+        raw = np.array([len(matched[intent]) for intent in self._intents], dtype=np.float64) \
+            + 0.5 * (keyword_hits @ self._keyword_matrix)
+
+        # Apply weight, plus priority bonus for ties (higher priority = higher bonus)
+        weighted = raw * self._weights + np.where(raw > 0, self._priority_bonus, 0.0)
+
+        # Get best intent (first one on ties, like max() over the intents in order)
+        if not (weighted > 0).any():
+            return "INFO_REQUEST", 0.3, {}
+        best = int(np.argmax(np.where(weighted > 0, weighted, -np.inf)))
+        intent_name = self._intents[best]
+
+        # ============================================
+        # SPECIAL CASE: TIME vs TROUBLESHOOT conflict
+        # When query has BOTH time keywords ("bao lâu", "khi nào") AND
+        # troubleshoot keywords ("thất bại", "không thành công"),
+        # prefer TIME because user is asking ABOUT time/duration
+        # ============================================
+        time_index = self._intents.index("TIME")
+        if intent_name == "TROUBLESHOOT" and weighted[time_index] > 0:
+            if any(kw in keywords_found for kw in TIME_QUESTION_KEYWORDS):
+                intent_name = "TIME"
+                best = time_index
+
+        # Calculate confidence
+        max_possible = self._max_possible[best]
+        confidence = float(min(weighted[best] / max_possible, 1.0)) if max_possible > 0 else 0.0
+
+        # Boost confidence for specific intents
+        if intent_name in ["FEE", "LIMIT", "TIME"]:
+            confidence = max(confidence, 0.6)  # Minimum 60% for specific intents
+
+        logger.info(f"Intent classified: {intent_name} (confidence: {confidence:.2%})")
+
+        spec = self.intent_patterns[intent_name]
+        details = {
+            "patterns": [spec["patterns"][i] for i in matched[intent_name]],
+            "keywords": [kw for kw in spec["keywords"] if kw.lower() in keywords_found],
+            "raw_score": float(raw[best]),
+            "weighted_score": float(weighted[best]),
+            "priority": spec["priority"]
+        }
+        return intent_name, confidence, details
+
+    def classify_reference(self, query: Union[str, NormalizedQuery]) -> Tuple[str, float, Dict]:
+        """
+        Rule-path classification with one re.search / substring test per
+        pattern and keyword (original implementation, kept to check and
+        benchmark classify)
+
+        Args:
+            query: User query string (or its NormalizedQuery)
+
+        Returns:
+            Tuple of (intent_name, confidence, details)
+        """
+        query_lower = normalize_query(query).stripped
 
         intent_scores = {}
         matched_patterns = {}
 
         # Check each intent
-        for intent, config in self.intent_patterns.items():
+        for intent, spec in self.intent_patterns.items():
             score = 0
             patterns_matched = []
             keywords_matched = []
 
             # Check regex patterns
-            for pattern in config["patterns"]:
+            for pattern in spec["patterns"]:
                 if re.search(pattern, query_lower):
                     score += 1
                     patterns_matched.append(pattern)
 
             # Check keywords
-            for keyword in config["keywords"]:
+            for keyword in spec["keywords"]:
                 if keyword.lower() in query_lower:
                     score += 0.5
                     keywords_matched.append(keyword)
 
             # Apply weight
-            weighted_score = score * config["weight"]
+            weighted_score = score * spec["weight"]
 
             # Add priority bonus for ties (higher priority = higher bonus)
-            priority_bonus = (11 - config["priority"]) * 0.1
+            priority_bonus = (11 - spec["priority"]) * 0.1
             weighted_score += priority_bonus if score > 0 else 0
 
             if weighted_score > 0:
@@ -317,7 +480,7 @@ class IntentClassifier:
                     "keywords": keywords_matched,
                     "raw_score": score,
                     "weighted_score": weighted_score,
-                    "priority": config["priority"]
+                    "priority": spec["priority"]
                 }
 
         # Get best intent
@@ -334,8 +497,7 @@ class IntentClassifier:
         # prefer TIME because user is asking ABOUT time/duration
         # ============================================
         if intent_name == "TROUBLESHOOT" and "TIME" in intent_scores:
-            time_keywords = ["bao lâu", "khi nào", "mất bao lâu", "thời gian"]
-            has_time_question = any(kw in query_lower for kw in time_keywords)
+            has_time_question = any(kw in query_lower for kw in TIME_QUESTION_KEYWORDS)
             if has_time_question:
                 intent_name = "TIME"
                 best_intent = ("TIME", intent_scores["TIME"])
@@ -351,8 +513,6 @@ class IntentClassifier:
         if intent_name in ["FEE", "LIMIT", "TIME"]:
             confidence = max(confidence, 0.6)  # Minimum 60% for specific intents
 
-        logger.info(f"Intent classified: {intent_name} (confidence: {confidence:.2%})")
-
         return intent_name, confidence, matched_patterns.get(intent_name, {})
 
     def classify_with_fallback(self, query: str, entities: Dict = None) -> Tuple[str, float, Dict]:
@@ -409,6 +569,45 @@ class IntentClassifier:
         return mapping.get(intent, "INFO_REQUEST")
 
 
+def train_intent_model(examples: List[Tuple[str, str]], path: str, holdout: float = 0.2):
+    """
+    Train the optional intent model: TF-IDF (word 1-2 grams) + logistic regression
+
+    Args:
+        examples: (query, intent) pairs
+        path: Output file (joblib)
+        holdout: Fraction of examples kept aside to report accuracy (0 = none)
+
+    Returns:
+        Trained pipeline
+    """
+    if not SKLEARN_AVAILABLE:
+        raise ImportError("scikit-learn is required to train the intent model")
+
+    texts = [normalize_query(query).stripped for query, _ in examples]
+    labels = [intent for _, intent in examples]
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(texts))
+    n_holdout = int(len(texts) * holdout)
+    test_idx, train_idx = order[:n_holdout], order[n_holdout:]
+
+    model = make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1),
+        LogisticRegression(max_iter=2000, C=10.0)
+    )
+    model.fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+
+    if n_holdout:
+        predicted = model.predict([texts[i] for i in test_idx])
+        accuracy = float(np.mean([p == labels[i] for p, i in zip(predicted, test_idx)]))
+        logger.info(f"Intent model holdout accuracy: {accuracy:.2%} ({n_holdout} examples)")
+
+    joblib.dump(model, path)
+    logger.info(f"✅ Intent model ({len(train_idx)} examples, {len(model.classes_)} intents) saved to {path}")
+    return model
+
+
 # ============================================
 # TESTING
 # ============================================
@@ -418,6 +617,20 @@ if __name__ == "__main__":
     if sys.platform == 'win32':
         sys.stdout.reconfigure(encoding='utf-8')
 
+    # Usage:
+    #   python intent_classifier.py                          - accuracy on the test cases below
+    #   python intent_classifier.py train labelled.jsonl OUT - train the intent model
+    #                                                          ({"query": ..., "intent": ...} per line)
+    #   python intent_classifier.py bench [queries.jsonl] [--model PATH] - throughput benchmark
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "train":
+        import json
+        with open(sys.argv[2], encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        train_intent_model([(row["query"], row["intent"]) for row in rows], sys.argv[3])
+        sys.exit(0)
+
     classifier = IntentClassifier()
 
     # Test cases based on REAL FAQ questions from dataset
@@ -462,6 +675,43 @@ if __name__ == "__main__":
         ("Cách liên kết ngân hàng?", "HOW_TO"),
     ]
 
+    if command == "bench":
+        import json
+        import time
+
+        args = sys.argv[2:]
+        model_path = None
+        if "--model" in args:
+            model_path = args[args.index("--model") + 1]
+            args = [a for a in args if a not in ("--model", model_path)]
+
+        queries = [q for q, _ in test_queries]
+        for path in args:
+            with open(path, encoding="utf-8") as f:
+                queries.extend(json.loads(line)["query"] for line in f if line.strip())
+        texts = [normalize_query(q).stripped for q in queries]
+
+        logging.getLogger(__name__).setLevel(logging.WARNING)
+        mismatches = [t for t in texts if classifier.classify(t) != classifier.classify_reference(t)]
+
+        def throughput(fn, rounds: int = 5) -> float:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for text in texts:
+                    fn(text)
+            return rounds * len(texts) / (time.perf_counter() - start)
+
+        print(f"{len(texts)} queries, {len(mismatches)} mismatches vs reference")
+        for text in mismatches[:10]:
+            print(f"  ❌ {text}")
+        print(f"reference (re.search per pattern): {throughput(classifier.classify_reference):>10,.0f} queries/s")
+        print(f"compiled:                          {throughput(classifier.classify):>10,.0f} queries/s")
+        if model_path and classifier.load_model(model_path):
+            answered = sum(classifier._classify_with_model(t) is not None for t in texts)
+            print(f"model + rules:                     {throughput(classifier.classify):>10,.0f} queries/s "
+                  f"(model answered {answered}/{len(texts)})")
+        sys.exit(1 if mismatches else 0)
+
     print("=" * 80)
     print("REFINED INTENT CLASSIFICATION TEST (Based on 803 FAQs)")
     print("=" * 80)
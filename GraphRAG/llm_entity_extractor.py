@@ -7,6 +7,8 @@ import json
 import logging
 from typing import Dict, List, Tuple, Optional
 import config
+from disk_cache import get_disk_cache, llm_cache_version, MISS
+import tracing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -119,15 +121,30 @@ class LLMEntityExtractor:
         """
         prompt = self._build_extraction_prompt(question, answer, section)
 
+        # Disk cache (shared across processes, keyed by the full prompt)
+        disk_cache = get_disk_cache()
+        cache_key = (self.provider, prompt)
+        cache_version = llm_cache_version(self.model_name)
+        if disk_cache is not None:
+            cached = disk_cache.get("llm_entities", cache_key, cache_version)
+            if cached is not MISS:
+                return cached
+
         try:
-            if self.provider == "vllm":
-                response_text = self._call_vllm(prompt)
-            elif self.provider == "openai":
-                response_text = self._call_openai(prompt)
-            else:  # gemini
-                response_text = self._call_gemini(prompt)
+            with tracing.llm_call("entity_extraction", self.model_name, provider=self.provider):
+                if self.provider == "vllm":
+                    response_text = self._call_vllm(prompt)
+                elif self.provider == "openai":
+                    response_text = self._call_openai(prompt)
+                else:  # gemini
+                    response_text = self._call_gemini(prompt)
 
             result = self._parse_llm_response(response_text)
+            if result is None:
+                # Not cached: a malformed response must not pin the prompt to "no entities"
+                return self._get_empty_result()
+            if disk_cache is not None:
+                disk_cache.put("llm_entities", cache_key, result, cache_version)
             return result
         except Exception as e:
             logger.error(f"Error in LLM extraction: {e}")
@@ -432,7 +449,7 @@ Trả về ĐÚNG format JSON sau (không thêm markdown, chỉ JSON thuần tú
 """
         return prompt
 
-    def _parse_llm_response(self, response_text: str) -> Dict:
+    def _parse_llm_response(self, response_text: str) -> Optional[Dict]:
         """
         Parse LLM response to extract entities and relationships
 
@@ -440,7 +457,8 @@ Trả về ĐÚNG format JSON sau (không thêm markdown, chỉ JSON thuần tú
             response_text: Raw response from LLM
 
         Returns:
-            Parsed entities and relationships
+            Parsed entities and relationships, or None if the response is not
+            valid JSON with the expected structure
         """
         try:
             # Remove markdown code blocks if present
@@ -460,7 +478,7 @@ Trả về ĐÚNG format JSON sau (không thêm markdown, chỉ JSON thuần tú
             # Validate structure
             if "entities" not in result or "relationships" not in result:
                 logger.warning("Invalid LLM response structure")
-                return self._get_empty_result()
+                return None
 
             # Clean and validate entities
             entities = result.get("entities", {})
@@ -493,10 +511,10 @@ Trả về ĐÚNG format JSON sau (không thêm markdown, chỉ JSON thuần tú
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response as JSON: {e}")
             logger.error(f"Response text: {response_text[:500]}")
-            return self._get_empty_result()
+            return None
         except Exception as e:
             logger.error(f"Error parsing LLM response: {e}")
-            return self._get_empty_result()
+            return None
 
     def _get_empty_result(self) -> Dict:
         """Return empty result structure"""
@@ -4,8 +4,11 @@ Handles connection, schema creation, and basic operations
 """
 
 import logging
-from typing import Dict, List, Any, Optional
-from neo4j import GraphDatabase, Driver, Session
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Union
+import numpy as np
+from neo4j import GraphDatabase, Driver, Session, READ_ACCESS
 from neo4j.exceptions import ServiceUnavailable, AuthError
 
 import config
@@ -50,7 +53,8 @@ class Neo4jConnector:
             logger.info(f"Connecting to Neo4j at {self.uri}...")
             self.driver = GraphDatabase.driver(
                 self.uri,
-                auth=(self.user, self.password)
+                auth=(self.user, self.password),
+                max_transaction_retry_time=getattr(config, 'NEO4J_MAX_TRANSACTION_RETRY_TIME', 30.0)
             )
             # Verify connection
             self.driver.verify_connectivity()
@@ -115,6 +119,156 @@ class Neo4jConnector:
             logger.error(f"Parameters: {parameters}")
             raise
 
+    def stream_query(
+        self,
+        query: str,
+        parameters: Dict = None,
+        as_tuples: bool = False
+    ) -> Iterator[Union[Dict, Tuple]]:
+        """
+        Execute a read query and yield rows lazily
+
+        Unlike execute_query, records are pulled from the server as the caller
+        iterates, so large scans never hold the full result set in memory.
+        The session stays open until the generator is exhausted or closed.
+
+        Args:
+            query: Cypher query string
+            parameters: Query parameters
+            as_tuples: Yield rows as tuples in RETURN order instead of dicts
+
+        Yields:
+            One dict (or tuple) per record
+        """
+        if parameters is None:
+            parameters = {}
+
+        try:
+            with self.driver.session(database=self.database, default_access_mode=READ_ACCESS) as session:
+                result = session.run(query, parameters)
+                if as_tuples:
+                    # Record is already a tuple subclass - no per-row conversion
+                    yield from result
+                else:
+                    for record in result:
+                        yield record.data()
+
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            logger.error(f"Query: {query}")
+            logger.error(f"Parameters: {parameters}")
+            raise
+
+    def fetch_columns(
+        self,
+        query: str,
+        parameters: Dict = None,
+        vector_columns: List[str] = None,
+        dtype=np.float32
+    ) -> Dict[str, Union[List, np.ndarray]]:
+        """
+        Execute a read query and return it column-wise
+
+        Scalar columns become Python lists. Columns named in vector_columns
+        (lists of floats, e.g. embeddings) are copied straight into a
+        contiguous 2D NumPy buffer while streaming, so no intermediate list
+        of lists is built. Rows where a vector column is null are skipped.
+
+        Args:
+            query: Cypher query string
+            parameters: Query parameters
+            vector_columns: Columns to pack into (n_rows, dim) arrays
+            dtype: NumPy dtype for vector columns
+
+        Returns:
+            Dict mapping column name to list or ndarray
+        """
+        vector_columns = vector_columns or []
+        columns: Dict[str, Union[List, np.ndarray]] = {}
+        buffers: Dict[str, np.ndarray] = {}
+        keys: List[str] = []
+        vector_idx: List[Tuple[int, str]] = []
+        scalar_idx: List[Tuple[int, str]] = []
+        n = 0
+
+        for row in self.stream_query(query, parameters, as_tuples=True):
+            if not keys:
+                keys = list(row.keys())
+                for i, key in enumerate(keys):
+                    if key in vector_columns:
+                        vector_idx.append((i, key))
+                    else:
+                        scalar_idx.append((i, key))
+                        columns[key] = []
+
+            if any(row[i] is None for i, _ in vector_idx):
+                continue
+
+            for i, key in vector_idx:
+                buf = buffers.get(key)
+                if buf is None:
+                    buf = np.empty((64, len(row[i])), dtype=dtype)
+                elif n >= buf.shape[0]:
+                    # Grow geometrically to keep appends amortized O(1)
+                    grown = np.empty((buf.shape[0] * 2, buf.shape[1]), dtype=dtype)
+                    grown[:n] = buf[:n]
+                    buf = grown
+                buf[n] = row[i]
+                buffers[key] = buf
+
+            for i, key in scalar_idx:
+                columns[key].append(row[i])
+            n += 1
+
+        for key in vector_columns:
+            buf = buffers.get(key)
+            columns[key] = buf[:n] if buf is not None else np.empty((0, 0), dtype=dtype)
+
+        return columns
+
+    def profile_query(
+        self,
+        query: str,
+        parameters: Dict = None,
+        write: bool = False
+    ) -> Dict:
+        """
+        Execute query with PROFILE and summarize the executed plan
+
+        Args:
+            query: Cypher query string (without PROFILE prefix)
+            parameters: Query parameters
+            write: True for write transactions, False for read
+
+        Returns:
+            {"db_hits": int, "rows": int, "plan": raw profile tree}
+        """
+        if parameters is None:
+            parameters = {}
+
+        def _profile(tx):
+            return tx.run("PROFILE " + query, parameters).consume().profile
+
+        with self.driver.session(database=self.database) as session:
+            if write:
+                plan = session.execute_write(_profile)
+            else:
+                plan = session.execute_read(_profile)
+
+        plan = plan or {}
+        return {
+            "db_hits": self._sum_db_hits(plan),
+            "rows": plan.get("rows", 0),
+            "plan": plan
+        }
+
+    @staticmethod
+    def _sum_db_hits(plan: Dict) -> int:
+        """Total db hits over a PROFILE plan tree"""
+        return plan.get("dbHits", 0) + sum(
+            Neo4jConnector._sum_db_hits(child) for child in plan.get("children", [])
+        )
+
     def create_schema(self):
         """
         Create indexes and constraints for better performance
@@ -141,6 +295,34 @@ class Neo4jConnector:
             "CREATE INDEX action_category IF NOT EXISTS FOR (a:Action) ON (a.category)",
         ]
 
+        # Node ids (MERGE in batch_create_nodes, relationship endpoints)
+        indexes += [
+            f"CREATE INDEX {label.lower()}_id IF NOT EXISTS FOR (n:{label}) ON (n.id)"
+            for label in ["FAQ", "Case", "Process", "Step"] + config.ENTITY_LABELS
+        ]
+
+        # Normalized entity names (exact, case-insensitive entity lookups)
+        indexes += [
+            f"CREATE INDEX {label.lower()}_name_norm IF NOT EXISTS FOR (n:{label}) ON (n.name_norm)"
+            for label in config.ENTITY_LABELS
+        ]
+
+        # Full-text index (Lucene, BM25) for keyword search over FAQ text
+        fulltext_indexes = [
+            f"CREATE FULLTEXT INDEX {config.FAQ_FULLTEXT_INDEX} IF NOT EXISTS "
+            f"FOR (f:FAQ) ON EACH [f.question, f.answer] "
+            f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{config.FAQ_FULLTEXT_ANALYZER}'}}}}",
+        ]
+
+        # Vector index (cosine) for semantic search over FAQ embeddings
+        vector_index = (
+            f"CREATE VECTOR INDEX {config.FAQ_VECTOR_INDEX} IF NOT EXISTS "
+            f"FOR (f:FAQ) ON (f.embedding) "
+            f"OPTIONS {{indexConfig: {{"
+            f"`vector.dimensions`: {config.EMBEDDING_DIMENSION}, "
+            f"`vector.similarity_function`: 'cosine'}}}}"
+        )
+
         # Execute schema creation
         for constraint in constraints:
             try:
@@ -156,8 +338,108 @@ class Neo4jConnector:
             except Exception as e:
                 logger.warning(f"⚠️ Index already exists or failed: {e}")
 
+        for index in fulltext_indexes:
+            try:
+                self.execute_query(index, write=True)
+                logger.info(f"✅ Created: {index[:50]}...")
+            except Exception as e:
+                logger.warning(f"⚠️ Full-text index already exists or failed: {e}")
+
+        self._create_vector_index(vector_index)
+
+        self.backfill_name_norm()
+        self.materialize_process_steps()
+
         logger.info("Schema creation completed")
 
+    def _create_vector_index(self, create_statement: str):
+        """
+        Create the FAQ embedding vector index
+
+        CREATE VECTOR INDEX needs Neo4j 5.13+; older 5.x servers only have the
+        db.index.vector.createNodeIndex procedure, so fall back to it.
+        """
+        try:
+            self.execute_query(create_statement, write=True)
+            logger.info(f"✅ Created: {create_statement[:50]}...")
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ CREATE VECTOR INDEX failed, trying procedure: {e}")
+
+        try:
+            existing = self.execute_query(
+                "SHOW INDEXES YIELD name WHERE name = $name RETURN name",
+                {"name": config.FAQ_VECTOR_INDEX}
+            )
+            if existing:
+                return
+            self.execute_query(
+                "CALL db.index.vector.createNodeIndex($name, 'FAQ', 'embedding', $dimensions, 'cosine')",
+                {"name": config.FAQ_VECTOR_INDEX, "dimensions": config.EMBEDDING_DIMENSION},
+                write=True
+            )
+            logger.info(f"✅ Created vector index {config.FAQ_VECTOR_INDEX} (procedure)")
+        except Exception as e:
+            logger.warning(f"⚠️ Vector index already exists or failed: {e}")
+
+    def backfill_name_norm(self) -> int:
+        """
+        Set name_norm = toLower(name) on entity nodes where it is missing or stale
+
+        New nodes get name_norm from create_node / batch_create_nodes; this
+        covers graphs loaded before the property existed.
+
+        Returns:
+            Number of nodes updated
+        """
+        updated = 0
+        for label in config.ENTITY_LABELS:
+            query = f"""
+            MATCH (n:{label})
+            WHERE n.name IS NOT NULL AND (n.name_norm IS NULL OR n.name_norm <> toLower(n.name))
+            SET n.name_norm = toLower(n.name)
+            RETURN count(n) as count
+            """
+            result = self.execute_query(query, write=True)
+            updated += result[0]["count"] if result else 0
+
+        if updated:
+            self.bump_graph_version()
+            logger.info(f"✅ Backfilled name_norm on {updated} entity nodes")
+        return updated
+
+    def materialize_process_steps(self) -> int:
+        """
+        Store each Process's ordered steps as arrays on the node
+
+        Sets step_numbers / step_texts (ordered by step number) and
+        step_count, so a step continuation reads one node instead of
+        traversing HAS_STEP. Only processes whose arrays are missing or
+        stale are written. Runs from create_schema, after Step node batches
+        and after relationship batches containing HAS_STEP.
+
+        Returns:
+            Number of processes updated
+        """
+        query = """
+        MATCH (p:Process)-[:HAS_STEP]->(s:Step)
+        WITH p, s ORDER BY s.number
+        WITH p, count(s) as step_count,
+             collect(CASE WHEN s.number IS NOT NULL THEN s.number END) as numbers,
+             collect(CASE WHEN s.number IS NOT NULL THEN coalesce(s.text, '') END) as texts
+        WHERE p.step_numbers IS NULL OR p.step_numbers <> numbers
+              OR p.step_texts <> texts OR p.step_count <> step_count
+        SET p.step_numbers = numbers, p.step_texts = texts, p.step_count = step_count
+        RETURN count(p) as count
+        """
+        result = self.execute_query(query, write=True)
+        updated = result[0]["count"] if result else 0
+
+        if updated:
+            self.bump_graph_version()
+            logger.info(f"✅ Materialized step arrays on {updated} Process nodes")
+        return updated
+
     def clear_database(self):
         """
         ⚠️ WARNING: Delete all nodes and relationships
@@ -171,8 +453,40 @@ class Neo4jConnector:
         """
 
         self.execute_query(query, write=True)
+        self.bump_graph_version()
         logger.info("✅ Database cleared")
 
+    def get_graph_version(self) -> str:
+        """
+        Get the current graph version stamp
+
+        Combines the GraphVersion marker (bumped after every bulk load) with
+        the FAQ count, so in-process caches also notice FAQs added by hand.
+
+        Returns:
+            Version stamp string
+        """
+        query = """
+        OPTIONAL MATCH (v:GraphVersion {id: 'current'})
+        RETURN v.version as version, COUNT { (f:FAQ) } as faq_count
+        """
+        result = self.execute_query(query)
+        if not result:
+            return "empty"
+        return f"{result[0]['version']}:{result[0]['faq_count']}"
+
+    def bump_graph_version(self):
+        """
+        Mark the graph as changed so in-process caches reload
+
+        Call after loading or editing FAQ data outside the batch_* methods.
+        """
+        query = """
+        MERGE (v:GraphVersion {id: 'current'})
+        SET v.version = timestamp()
+        """
+        self.execute_query(query, write=True)
+
     def get_statistics(self) -> Dict:
         """
         Get database statistics
@@ -238,12 +552,14 @@ class Neo4jConnector:
                 query = f"""
                 MERGE (n:{label} {{id: $merge_key}})
                 SET n += $properties
+                SET n.name_norm = toLower(n.name)
                 RETURN elementId(n) as node_id
                 """
             else:
                 query = f"""
                 MERGE (n:{label} {{name: $merge_key}})
                 SET n += $properties
+                SET n.name_norm = toLower(n.name)
                 RETURN elementId(n) as node_id
                 """
 
@@ -257,6 +573,7 @@ class Neo4jConnector:
             query = f"""
             CREATE (n:{label})
             SET n = $properties
+            SET n.name_norm = toLower(n.name)
             RETURN elementId(n) as node_id
             """
 
@@ -270,8 +587,10 @@ class Neo4jConnector:
 
     def create_relationship(
         self,
-        from_node_id: str,
-        to_node_id: str,
+        from_label: str,
+        from_node_id: Any,
+        to_label: str,
+        to_node_id: Any,
         rel_type: str,
         properties: Dict = None
     ):
@@ -279,29 +598,15 @@ class Neo4jConnector:
         Create relationship between nodes
 
         Args:
-            from_node_id: Source node ID (can be node ID or unique property)
-            to_node_id: Target node ID
+            from_label: Source node label
+            from_node_id: Source node id property
+            to_label: Target node label
+            to_node_id: Target node id property
             rel_type: Relationship type
             properties: Relationship properties
         """
-        if properties is None:
-            properties = {}
-
-        query = f"""
-        MATCH (from), (to)
-        WHERE elementId(from) = $from_id AND elementId(to) = $to_id
-        MERGE (from)-[r:{rel_type}]->(to)
-        SET r += $properties
-        """
-
-        self.execute_query(
-            query,
-            {
-                "from_id": from_node_id,
-                "to_id": to_node_id,
-                "properties": properties
-            },
-            write=True
+        self.create_relationship_by_property(
+            from_label, "id", from_node_id, to_label, "id", to_node_id, rel_type, properties
         )
 
     def create_relationship_by_property(
@@ -328,25 +633,16 @@ class Neo4jConnector:
             rel_type: Relationship type
             properties: Relationship properties
         """
-        if properties is None:
-            properties = {}
-
-        query = f"""
-        MATCH (from:{from_label} {{{from_property}: $from_value}})
-        MATCH (to:{to_label} {{{to_property}: $to_value}})
-        MERGE (from)-[r:{rel_type}]->(to)
-        SET r += $properties
-        """
-
-        self.execute_query(
-            query,
-            {
-                "from_value": from_value,
-                "to_value": to_value,
-                "properties": properties
-            },
-            write=True
-        )
+        self.batch_create_relationships([{
+            "from_label": from_label,
+            "from_property": from_property,
+            "from_value": from_value,
+            "to_label": to_label,
+            "to_property": to_property,
+            "to_value": to_value,
+            "rel_type": rel_type,
+            "properties": properties
+        }])
 
     def batch_create_nodes(
         self,
@@ -367,17 +663,157 @@ class Neo4jConnector:
             UNWIND $nodes as node
             MERGE (n:{label} {{id: node.id}})
             SET n += node
+            SET n.name_norm = toLower(n.name)
             """
         else:
             query = f"""
             UNWIND $nodes as node
             CREATE (n:{label})
             SET n = node
+            SET n.name_norm = toLower(n.name)
             """
 
-        self.execute_query(query, {"nodes": nodes}, write=True)
+        self._run_chunked_writes(query, "nodes", nodes)
+        self.bump_graph_version()
         logger.info(f"✅ Batch created {len(nodes)} {label} nodes")
 
+        if label == "Step":
+            self.materialize_process_steps()
+
+    def batch_create_relationships(
+        self,
+        relationships: List[Dict],
+        chunk_size: int = None,
+        max_workers: int = None
+    ) -> int:
+        """
+        Batch create relationships matched by labelled node properties
+
+        Relationships are grouped by (from label, from property, to label,
+        to property, rel type) so each group becomes one parameterized
+        UNWIND statement, then sent in chunks through parallel writer sessions.
+
+        Args:
+            relationships: List of dicts with keys from_label, from_value,
+                to_label, to_value, rel_type and optional from_property,
+                to_property (default "id") and properties
+            chunk_size: Rows per UNWIND chunk (default from config)
+            max_workers: Parallel writer sessions (default from config)
+
+        Returns:
+            Number of relationships merged
+        """
+        groups: Dict[Tuple[str, str, str, str, str], List[Dict]] = defaultdict(list)
+        for rel in relationships:
+            key = (
+                rel["from_label"],
+                rel.get("from_property", "id"),
+                rel["to_label"],
+                rel.get("to_property", "id"),
+                rel["rel_type"]
+            )
+            groups[key].append({
+                "from_value": rel["from_value"],
+                "to_value": rel["to_value"],
+                "properties": rel.get("properties") or {}
+            })
+
+        total = 0
+        for (from_label, from_property, to_label, to_property, rel_type), rows in groups.items():
+            query = f"""
+            UNWIND $rows as row
+            MATCH (from:{from_label} {{{from_property}: row.from_value}})
+            MATCH (to:{to_label} {{{to_property}: row.to_value}})
+            MERGE (from)-[r:{rel_type}]->(to)
+            SET r += row.properties
+            RETURN count(r) as count
+            """
+            count = self._run_chunked_writes(query, "rows", rows, chunk_size, max_workers)
+            total += count
+            logger.debug(
+                f"Batch created {count}/{len(rows)} "
+                f"({from_label})-[:{rel_type}]->({to_label}) relationships"
+            )
+
+        if not groups:
+            return 0
+
+        self.bump_graph_version()
+        if len(relationships) > 1:
+            logger.info(f"✅ Batch created {total}/{len(relationships)} relationships in {len(groups)} groups")
+
+        # Step arrays on Process nodes are derived from HAS_STEP
+        if any(rel_type == "HAS_STEP" for *_, rel_type in groups):
+            self.materialize_process_steps()
+
+        return total
+
+    def _run_chunked_writes(
+        self,
+        query: str,
+        param_name: str,
+        rows: List[Dict],
+        chunk_size: int = None,
+        max_workers: int = None
+    ) -> int:
+        """
+        Split rows into chunks and write them through a pool of sessions
+
+        Args:
+            query: UNWIND query taking the chunk as ${param_name}
+            param_name: Parameter name for the chunk
+            rows: Rows to write
+            chunk_size: Rows per chunk (default from config)
+            max_workers: Parallel writer sessions (default from config)
+
+        Returns:
+            Sum of "count" values returned by the query (0 if not returned)
+        """
+        chunk_size = chunk_size or getattr(config, 'NEO4J_BATCH_SIZE', 1000)
+        max_workers = max_workers or getattr(config, 'NEO4J_WRITER_THREADS', 4)
+
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        if not chunks:
+            return 0
+
+        if len(chunks) == 1 or max_workers <= 1:
+            return sum(
+                self._write_chunk(query, {param_name: chunk})
+                for chunk in chunks
+            )
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(self._write_chunk, query, {param_name: chunk})
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                total += future.result()
+
+        return total
+
+    def _write_chunk(self, query: str, parameters: Dict) -> int:
+        """
+        Write one chunk in its own session
+
+        Parallel chunks touching the same nodes can deadlock; Neo4j reports
+        that as a TransientError, and execute_write replays the transaction
+        (driver-managed retries, bounded by NEO4J_MAX_TRANSACTION_RETRY_TIME).
+
+        Args:
+            query: Cypher write query
+            parameters: Query parameters
+
+        Returns:
+            "count" value returned by the query (0 if not returned)
+        """
+        with self.driver.session(database=self.database) as session:
+            records = session.execute_write(
+                lambda tx: tx.run(query, parameters).data()
+            )
+        return sum(r.get("count", 0) for r in records)
+
 
 # ============================================
 # TESTING
@@ -8,101 +8,92 @@ ENHANCED VERSION:
 - LLM-based answer extraction instead of returning full FAQ
 """
 
+import contextvars
 import logging
 import re
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Union
 import numpy as np
+from neo4j.exceptions import ClientError
 
 from neo4j_connector import Neo4jConnector
+from query_registry import QueryRegistry
+from cypher_queries import ENGINE_QUERIES
+from graph_version import GraphVersionTracker
+from embedding_matrix import FAQEmbeddingMatrix
+from scope_gate import OutOfScopeGate, has_vnpt_keyword
+from question_index import FuzzyQuestionIndex
+from entity_alias_table import EntityAliasTable
+from faq_record_cache import FAQRecordCache
+from process_steps import ProcessSteps
+from ranking_features import (
+    RankingFeatureStore, compute_features, ranking_query, score_candidates, early_boosted_scores, candidate_bounds, prune_mask,
+)
+from prerendered_answers import PreRenderedAnswerTable, format_answer_for_readability
+from result_cache import ResultCache
+from disk_cache import get_disk_cache, MISS
+from query_context import get_query_context, query_context
+from normalized_query import (
+    NormalizedQuery, normalize_query, KEYWORD_COMPOUNDS, KEYWORD_STOPWORDS,
+    RELEVANCE_STOPWORDS, VERIFY_COMPOUNDS, VERIFY_STOPWORDS,
+)
+import tracing
 import config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# =====================================================
-# Vietnamese No-Diacritics to Diacritics Mapping
-# For handling queries without Vietnamese accents
-# =====================================================
-VIETNAMESE_NO_DIACRITICS_MAP = {
-    # Common words in VNPT Money domain
-    'nap': 'nạp', 'tien': 'tiền', 'vi': 'ví', 'vao': 'vào',
-    'rut': 'rút', 've': 'về', 'chuyen': 'chuyển', 'den': 'đến',
-    'phi': 'phí', 'bao': 'bao', 'nhieu': 'nhiêu', 'lau': 'lâu',
-    'ngan': 'ngân', 'hang': 'hàng', 'lien': 'liên', 'ket': 'kết',
-    'tai': 'tài', 'khoan': 'khoản', 'mat': 'mật', 'khau': 'khẩu',
-    'dang': 'đăng', 'ky': 'ký', 'doi': 'đổi', 'quen': 'quên',
-    'han': 'hạn', 'muc': 'mức', 'thoi': 'thời', 'gian': 'gian',
-    'giao': 'giao', 'dich': 'dịch', 'that': 'thất', 'bai': 'bại',
-    'loi': 'lỗi', 'thanh': 'thanh', 'toan': 'toán', 'hoa': 'hóa',
-    'don': 'đơn', 'dien': 'điện', 'nuoc': 'nước', 'internet': 'internet',
-    'dinh': 'định', 'danh': 'danh', 'xac': 'xác', 'thuc': 'thực',
-    'cccd': 'cccd', 'cmnd': 'cmnd', 'otp': 'otp',
-    'huong': 'hướng', 'dan': 'dẫn', 'cach': 'cách', 'lam': 'làm',
-    'sao': 'sao', 'the': 'thế', 'nao': 'nào', 'gi': 'gì',
-    've': 'vé', 'may': 'máy', 'bay': 'bay', 'tau': 'tàu',
-    'mua': 'mua', 'dat': 'đặt', 'dang': 'đăng',
-    'so': 'số', 'du': 'dư', 'toi': 'tối', 'da': 'đa', 'thieu': 'thiểu',
-    'hotline': 'hotline', 'tong': 'tổng', 'dai': 'đài',
-    'khoa': 'khóa', 'mo': 'mở', 'huy': 'hủy',
-    'voucher': 'voucher', 'ma': 'mã', 'giam': 'giảm', 'gia': 'giá',
-    'khuyen': 'khuyến', 'mai': 'mãi', 'tich': 'tích', 'diem': 'điểm',
-    'bao': 'bảo', 'mat': 'mật', 'an': 'an', 'toan': 'toàn',
-    'van': 'vân', 'tay': 'tay', 'khuon': 'khuôn', 'mat': 'mặt',
-    'sinh': 'sinh', 'trac': 'trắc', 'hoc': 'học',
-    'tra': 'tra', 'cuu': 'cứu', 'lich': 'lịch', 'su': 'sử',
-    'vnpt': 'vnpt', 'money': 'money', 'app': 'app', 'ung': 'ứng', 'dung': 'dụng',
-    'tru': 'trừ', 'cong': 'cộng', 'hoan': 'hoàn',
-    'dieu': 'điều', 'kien': 'kiện', 'yeu': 'yêu', 'cau': 'cầu',
-    'thu': 'thụ', 'huong': 'hưởng', 'nguoi': 'người', 'nhan': 'nhận',
-    'gui': 'gửi', 'nham': 'nhầm', 'hoi': 'hỏi', 'dap': 'đáp',
-    'tro': 'trợ', 'giup': 'giúp', 'ho': 'hỗ',
-}
-
-def convert_no_diacritics_to_vietnamese(text: str) -> str:
-    """
-    Convert Vietnamese text without diacritics to text with diacritics.
-    Uses word-by-word mapping for common VNPT Money domain terms.
-
-    Example: "cach nap tien vao vi" -> "cách nạp tiền vào ví"
-    """
-    if not text:
-        return text
-
-    # Check if text likely has no diacritics (no Vietnamese characters)
-    vietnamese_chars = 'àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ'
-    has_vietnamese = any(c in text.lower() for c in vietnamese_chars)
-
-    if has_vietnamese:
-        # Already has Vietnamese diacritics, return as is
-        return text
-
-    # Convert word by word
-    words = text.lower().split()
-    converted_words = []
-
-    for word in words:
-        # Clean word (remove punctuation at end)
-        clean_word = re.sub(r'[?.!,;:]$', '', word)
-        suffix = word[len(clean_word):]  # Keep punctuation
-
-        # Look up in mapping
-        if clean_word in VIETNAMESE_NO_DIACRITICS_MAP:
-            converted_words.append(VIETNAMESE_NO_DIACRITICS_MAP[clean_word] + suffix)
-        else:
-            converted_words.append(word)
-
-    return ' '.join(converted_words)
+# Config flags that change query results (part of the result cache key)
+RESULT_CACHE_CONFIG_KEYS = (
+    "ENTITY_EXTRACTION_METHOD", "USE_LLM_EXTRACTION", "USE_REGEX_FALLBACK_ON_EMPTY_RESULTS",
+    "USE_HYBRID_ENTITY_MATCHING", "USE_FULLTEXT_SEARCH", "SEMANTIC_SEARCH_BACKEND",
+)
 
 
 class Neo4jGraphRAGEngine:
     """GraphRAG Engine using Neo4j backend - ENHANCED VERSION"""
 
-    def __init__(self):
-        """Initialize GraphRAG Engine with Neo4j"""
-        self.connector = Neo4jConnector()
+    def __init__(self, connector: Optional[Neo4jConnector] = None):
+        """
+        Initialize GraphRAG Engine with Neo4j
+
+        Args:
+            connector: Neo4j connector to use (default: new Neo4jConnector from config)
+        """
+        self.connector = connector or Neo4jConnector()
+
+        # Named, parameterized Cypher with per-query stats
+        self.queries = QueryRegistry(self.connector, ENGINE_QUERIES)
+
+        # Graph version stamp for in-process caches
+        self.graph_version = GraphVersionTracker(self.connector)
+
         self.embeddings_model = None
         self._initialize_embeddings()
 
+        # In-process FAQ embedding matrix (loaded lazily, per graph version)
+        self.embedding_matrix = FAQEmbeddingMatrix(self.queries, self.graph_version)
+
+        # Pre-LLM out-of-scope check against FAQ embedding centroids (per graph version)
+        self.scope_gate = OutOfScopeGate(
+            self.embedding_matrix,
+            n_centroids=getattr(config, 'OUT_OF_SCOPE_CENTROIDS', 64),
+            min_similarity=getattr(config, 'OUT_OF_SCOPE_MIN_SIMILARITY', 0.45),
+            min_similarity_with_keyword=getattr(config, 'OUT_OF_SCOPE_MIN_SIMILARITY_WITH_KEYWORD', 0.25)
+        )
+
+        # Fuzzy question index for exact / near-exact matching (per graph version)
+        self.question_index = FuzzyQuestionIndex(self.queries, self.graph_version)
+
+        # Query entity → entity node id resolution for graph search (per graph version)
+        self.entity_aliases = EntityAliasTable(self.queries, self.graph_version)
+
+        # FAQ context / cases / steps held in memory (bulk loaded now, reloaded per graph version)
+        self.faq_records = FAQRecordCache(self.queries, self.graph_version)
+        if getattr(config, 'USE_FAQ_RECORD_CACHE', True):
+            self.faq_records.ensure_fresh()
+
         # Initialize enhanced entity extractor (with regex & confidence scoring)
         from enhanced_entity_extractor import EnhancedEntityExtractor
         self.entity_extractor = EnhancedEntityExtractor()
@@ -110,7 +101,11 @@ class Neo4jGraphRAGEngine:
 
         # Initialize intent classifier (ENHANCED)
         from intent_classifier import IntentClassifier
-        self.intent_classifier = IntentClassifier()
+        intent_model_path = getattr(config, 'INTENT_MODEL_PATH', None)
+        self.intent_classifier = IntentClassifier(
+            model_path=str(intent_model_path) if getattr(config, 'USE_INTENT_MODEL', False) and intent_model_path else None,
+            model_min_confidence=getattr(config, 'INTENT_MODEL_MIN_CONFIDENCE', 0.9)
+        )
         logger.info("Enhanced intent classifier initialized (FEE, LIMIT, TIME, HOW_TO, TROUBLESHOOT)")
 
         # Initialize intent-based answer extractor (NEW!)
@@ -128,11 +123,41 @@ class Neo4jGraphRAGEngine:
         self.step_extractor = StepExtractor(neo4j_connector=self.connector)
         logger.info("Step extractor initialized")
 
+        # FAQ-side ranking features for _rank_results (built from the FAQ record cache)
+        self.ranking_features = RankingFeatureStore(self.faq_records)
+        if getattr(config, 'USE_FAQ_RECORD_CACHE', True):
+            self.ranking_features.ensure_fresh()
+
+        # Adaptive candidate pruning counters (see _prune_candidates)
+        self._pruning_stats = {"queries": 0, "candidates": 0, "pruned": 0, "verified": 0, "mismatches": 0}
+        self._pruning_lock = threading.Lock()
+
+        # Ready-to-serve answers for exact question matches (built from the FAQ record cache)
+        self.prerendered_answers = PreRenderedAnswerTable(self.faq_records, self._render_faq_answer)
+        if getattr(config, 'USE_EXACT_MATCH_FAST_PATH', True) and getattr(config, 'USE_FAQ_RECORD_CACHE', True):
+            self.prerendered_answers.ensure_fresh()
+
         # Hybrid entity matcher disabled (PyTorch dependency removed)
         self.hybrid_matcher = None
 
-        # Query cache
-        self.cache = {}
+        # Query result cache (LRU + TTL, cleared when the graph version changes)
+        self.result_cache = ResultCache(
+            max_size=getattr(config, 'CACHE_SIZE', 100),
+            ttl=getattr(config, 'CACHE_TTL_SECONDS', None)
+        )
+        self.graph_version.on_change(lambda version: self.result_cache.clear())
+
+        # Set when the full-text index is missing; retried after the graph version changes
+        self._fulltext_unavailable = False
+        self.graph_version.on_change(lambda version: setattr(self, '_fulltext_unavailable', False))
+
+        # Worker threads for query stages that don't depend on extracted entities
+        self._stage_executor = None
+        if getattr(config, 'PARALLEL_QUERY_STAGES', True):
+            self._stage_executor = ThreadPoolExecutor(
+                max_workers=getattr(config, 'QUERY_STAGE_WORKERS', 4),
+                thread_name_prefix="query-stage"
+            )
 
     def _initialize_embeddings(self):
         """Initialize embeddings model for query encoding"""
@@ -146,10 +171,36 @@ class Neo4jGraphRAGEngine:
     def query(self, user_query: str, top_k: int = 5, continuation_context: Optional[Dict] = None,
               follow_up_context: Optional[Dict] = None) -> Dict:
         """
+        Main query method - runs the pipeline inside a request-scoped QueryContext
+        so similarity scores are computed once and shared across stages
+
+        See _query for arguments and return value.
+        """
+        with tracing.trace(
+            "engine.query",
+            top_k=top_k,
+            continuation=bool(continuation_context),
+            follow_up=bool(follow_up_context and follow_up_context.get("is_follow_up"))
+        ) as span:
+            with query_context(normalize_query(user_query)) as ctx:
+                result = self._query(ctx.normalized, top_k, continuation_context, follow_up_context)
+                logger.debug(f"Similarity memo: {ctx.ratio_hits} reused, {ctx.ratio_misses} computed")
+            span.set(status=result.get("status"), faq_id=result.get("faq_id"))
+
+        # Attach the trace (full trace only when the engine was called directly)
+        if span.trace is not None:
+            result["trace_id"] = span.trace.trace_id
+            if span.parent_id is None:
+                result["trace"] = span.trace.to_dict()
+        return result
+
+    def _query(self, normalized: NormalizedQuery, top_k: int = 5, continuation_context: Optional[Dict] = None,
+               follow_up_context: Optional[Dict] = None) -> Dict:
+        """
         Main query method - ENTITY-FIRST APPROACH with CONTEXT SUPPORT
 
         Args:
-            user_query: User's question
+            normalized: User's question, normalized once for the whole pipeline
             top_k: Number of results to return
             continuation_context: Optional conversation context for step continuation
             follow_up_context: Optional follow-up context from Mem0 (NEW!)
@@ -162,18 +213,39 @@ class Neo4jGraphRAGEngine:
         Returns:
             Query result with answers, context, and metadata
         """
+        # IMPORTANT: Stages work on the diacritics-restored text
+        # This allows queries like "cach nap tien vao vi" to work
+        user_query = normalized.text
+        if user_query != normalized.raw:
+            logger.info(f"Converted no-diacritics query: '{normalized.raw}' → '{user_query}'")
+
         # Check cache (skip if context provided)
         has_context = continuation_context or follow_up_context
-        if not has_context and config.CACHE_ENABLED and user_query in self.cache:
-            logger.info("Returning cached result")
-            return self.cache[user_query]
-
-        # IMPORTANT: Convert no-diacritics Vietnamese to diacritics
-        # This allows queries like "cach nap tien vao vi" to work
-        original_query = user_query
-        user_query = convert_no_diacritics_to_vietnamese(user_query)
-        if user_query != original_query:
-            logger.info(f"Converted no-diacritics query: '{original_query}' → '{user_query}'")
+        cache_key = None
+        if not has_context and config.CACHE_ENABLED:
+            self.graph_version.current()  # Clears the cache if the graph was reloaded
+            cache_key = self._result_cache_key(user_query, top_k)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Returning cached result")
+                tracing.annotate(cache="memory")
+                return cached
+
+            # Disk tier (shared by worker processes, valid for this graph version)
+            disk_cache = get_disk_cache()
+            if disk_cache is not None:
+                cached = disk_cache.get("engine_result", cache_key, self.graph_version.current() or "")
+                if cached is not MISS:
+                    logger.info("Returning cached result (disk)")
+                    tracing.annotate(cache="disk")
+                    self.result_cache.put(cache_key, cached)
+                    return cached
+
+        # Fast path: (near-)exact FAQ question match → pre-rendered answer, no LLM / Neo4j
+        if not has_context:
+            fast_result = self._exact_match_fast_path(user_query)
+            if fast_result is not None:
+                return fast_result
 
         logger.info(f"Processing query: {user_query}")
 
@@ -183,48 +255,72 @@ class Neo4jGraphRAGEngine:
                        f"faq_id='{follow_up_context.get('faq_id')}', "
                        f"context='{follow_up_context.get('context_needed')}'")
 
+        # Step 0.1: OUT-OF-SCOPE GATE - Reject clearly unrelated queries before any LLM call
+        if not has_context and getattr(config, 'USE_OUT_OF_SCOPE_GATE', False):
+            with tracing.span("scope_gate") as span:
+                decision = self.scope_gate.check(
+                    get_query_context(user_query).query_lower,
+                    self._encode_query(user_query) if self.embeddings_model else None
+                )
+                span.set(out_of_scope=decision.out_of_scope, keyword=decision.has_keyword,
+                         similarity=None if decision.similarity is None else round(decision.similarity, 3))
+            if decision.out_of_scope:
+                logger.warning(f"🚫 Out-of-scope gate ({decision.reason}, FAQ similarity "
+                              f"{decision.similarity:.3f}): {user_query}")
+                return self._out_of_scope_response()
+
         # Step 0: Classify intent (NEW)
-        intent, intent_confidence, intent_details = self.intent_classifier.classify(user_query)
+        with tracing.span("intent") as span:
+            intent, intent_confidence, intent_details = self.intent_classifier.classify(user_query)
+            span.set(intent=intent, confidence=round(intent_confidence, 3))
         logger.info(f"Query intent: {intent} (confidence: {intent_confidence:.2%})")
 
+        # Start the stages that don't need entities (exact match, semantic search,
+        # intent keyword search) so they run while entities are extracted below
+        is_follow_up = bool(follow_up_context and follow_up_context.get("is_follow_up"))
+        intermediate_top_k = top_k * 3 if intent == "HOW_TO" else top_k * 2
+        specific_intents = ["FEE", "LIMIT", "TIME"]
+        stages = {}
+        if not continuation_context and not is_follow_up:
+            stages = self._start_independent_stages(user_query, intent, top_k, intermediate_top_k, specific_intents)
+
         # Step 1: Extract entities from user query
-        query_entities = self._extract_query_entities(user_query)
+        with tracing.span("entities") as span:
+            query_entities = self._extract_query_entities(user_query)
+            span.set(entities=sum(len(v) for v in query_entities.values() if isinstance(v, list)),
+                     out_of_scope=bool(query_entities.get("out_of_scope", False)))
         logger.info(f"Extracted entities: {query_entities}")
 
         # Step 1.5: Check if query is out of scope
         if query_entities.get("out_of_scope", False):
             logger.warning(f"Query is out of scope: {user_query}")
-            return {
-                "status": "out_of_scope",
-                "question": "",
-                "answer": "Xin lỗi, câu hỏi của bạn không liên quan đến dịch vụ VNPT Money. Tôi chỉ có thể hỗ trợ các câu hỏi về ví điện tử VNPT Money như: nạp tiền, rút tiền, chuyển tiền, liên kết ngân hàng, thanh toán, mua vé máy bay, v.v.\n\nNếu bạn cần hỗ trợ, vui lòng liên hệ Hotline: 1900 8198",
-                "confidence": 0,
-                "related_entities": {},
-                "related_questions": [],
-                "all_results": []
-            }
+            self._cancel_stages(stages, user_query)
+            return self._out_of_scope_response()
 
         # Step 1.6: Handle step continuation queries (NEW)
         if continuation_context:
             logger.info("🔗 Processing step continuation query")
-            return self._handle_step_continuation(user_query, continuation_context, query_entities)
+            with tracing.span("step_continuation"):
+                return self._handle_step_continuation(user_query, continuation_context, query_entities)
 
         # Step 1.7: Handle follow-up queries with Mem0 context (NEW!)
         if follow_up_context and follow_up_context.get("is_follow_up"):
             logger.info("🔗 Processing follow-up query with Mem0 context")
-            return self._handle_follow_up_query(
-                user_query=user_query,
-                follow_up_context=follow_up_context,
-                query_entities=query_entities,
-                intent=intent,
-                intent_confidence=intent_confidence,
-                top_k=top_k
-            )
+            with tracing.span("follow_up_search", faq_id=follow_up_context.get("faq_id")):
+                return self._handle_follow_up_query(
+                    user_query=user_query,
+                    follow_up_context=follow_up_context,
+                    query_entities=query_entities,
+                    intent=intent,
+                    intent_confidence=intent_confidence,
+                    top_k=top_k
+                )
 
         # Step 2: Find relevant nodes (GRAPH-ONLY search) with REGEX FALLBACK
         # IMPORTANT: Retrieve MORE candidates (top_k * 3) to ensure procedural FAQs aren't filtered out early
-        intermediate_top_k = top_k * 3 if intent == "HOW_TO" else top_k * 2
-        relevant_nodes = self._find_relevant_nodes(user_query, query_entities, intermediate_top_k, intent)
+        with tracing.span("graph_search", top_k=intermediate_top_k) as span:
+            relevant_nodes = self._find_relevant_nodes(user_query, query_entities, intermediate_top_k, intent)
+            span.set(candidates=len(relevant_nodes))
 
         # Step 2.5: REGEX FALLBACK - If no nodes found with LLM entities, try adding regex entities
         if getattr(config, 'USE_REGEX_FALLBACK_ON_EMPTY_RESULTS', False):
@@ -243,9 +339,9 @@ class Neo4jGraphRAGEngine:
 
         # Step 2.6: INTENT-BASED KEYWORD SEARCH - For specific intents (FEE, LIMIT, TIME),
         # add keyword search results to improve retrieval when entity graph is not sufficient
-        specific_intents = ["FEE", "LIMIT", "TIME"]
         if intent in specific_intents:
-            keyword_results = self._intent_keyword_search(user_query, intent, top_k)
+            keyword_results = self._stage_result(stages, "intent_keyword",
+                                                 self._intent_keyword_search, user_query, intent, top_k)
             if keyword_results:
                 logger.info(f"✅ Intent keyword search found {len(keyword_results)} additional results")
                 # Merge with existing results, avoiding duplicates
@@ -257,7 +353,7 @@ class Neo4jGraphRAGEngine:
 
         # Step 2.7: ALWAYS CHECK FOR EXACT MATCH - Critical for FAQs without entity links
         # This ensures exact question matches are not missed even if entity search succeeds
-        exact_match_results = self._find_exact_match_faq(user_query)
+        exact_match_results = self._stage_result(stages, "exact_match", self._find_exact_match_faq, user_query)
         if exact_match_results:
             existing_ids = {n["node_id"] for n in relevant_nodes}
             for emr in exact_match_results:
@@ -267,11 +363,32 @@ class Neo4jGraphRAGEngine:
                     relevant_nodes.insert(0, emr)  # Insert at beginning
                     logger.info(f"🎯 EXACT MATCH INJECTION: {emr['node_id']} added to results")
 
+        # Entity search may not have needed the prefetched semantic search
+        self._cancel_stages(stages, user_query)
+
+        # Step 2.8: ADAPTIVE PRUNING - Expand only candidates that can still reach the top results
+        keep_rank = max(top_k, config.TOP_K_RETRIEVAL)
+        pruned_nodes = []
+        if getattr(config, 'USE_ADAPTIVE_PRUNING', True) and len(relevant_nodes) > keep_rank:
+            with tracing.span("pruning", candidates=len(relevant_nodes)) as span:
+                relevant_nodes, pruned_nodes = self._prune_candidates(
+                    relevant_nodes, query_entities, user_query, intent, keep_rank
+                )
+                span.set(kept=len(relevant_nodes), pruned=len(pruned_nodes))
+
         # Step 3: Traverse graph to get context (with early exact match boosting)
-        context = self._get_graph_context(relevant_nodes, query_entities, user_query, intent)
+        with tracing.span("context", candidates=len(relevant_nodes)) as span:
+            context = self._get_graph_context(relevant_nodes, query_entities, user_query, intent)
+            span.set(items=len(context))
 
         # Step 4: Rank and select best results (with intent-aware ranking)
-        results = self._rank_results(context, user_query, intent, query_entities)
+        with tracing.span("ranking", items=len(context)) as span:
+            results = self._rank_results(context, user_query, intent, query_entities)
+            span.set(status=results.get("status"),
+                     extraction=(results.get("extraction_info") or {}).get("extraction_type"))
+
+        if pruned_nodes and getattr(config, 'ADAPTIVE_PRUNING_VERIFY', False):
+            self._verify_pruning(pruned_nodes, context, keep_rank, query_entities, user_query, intent)
 
         # Step 5: Extract and attach steps if answer contains step-by-step instructions
         if results.get("status") == "success" and results.get("answer"):
@@ -280,11 +397,222 @@ class Neo4jGraphRAGEngine:
             results["has_steps"] = len(steps) > 0
 
         # Cache result
-        if config.CACHE_ENABLED:
-            self.cache[user_query] = results
+        if cache_key is not None:
+            self.result_cache.put(cache_key, results)
+            disk_cache = get_disk_cache()
+            if disk_cache is not None:
+                disk_cache.put("engine_result", cache_key, results, self.graph_version.current() or "")
 
         return results
 
+    def answer_exact_match(self, user_query: Union[str, NormalizedQuery]) -> Optional[Dict]:
+        """
+        Pre-rendered answer if the query (near-)exactly matches an FAQ question
+
+        Lets the chatbot answer such queries before memory search and follow-up
+        detection. Uses only in-process indexes (no LLM, no Neo4j round trip).
+
+        Args:
+            user_query: User's question (diacritics optional) or its NormalizedQuery
+
+        Returns:
+            Query result (same shape as a "success" result, plus "rendered_answer"),
+            or None if there is no exact match, or the match lacks a critical action
+            keyword of the query (e.g. "mở khóa" vs a "khóa" FAQ)
+        """
+        return self._exact_match_fast_path(normalize_query(user_query).text)
+
+    def _exact_match_fast_path(self, user_query: str) -> Optional[Dict]:
+        """
+        Look up the fuzzy question index and serve the pre-rendered answer on a hit
+
+        Args:
+            user_query: Query after diacritics conversion
+
+        Returns:
+            Query result, or None
+        """
+        if not (getattr(config, 'USE_EXACT_MATCH_FAST_PATH', True)
+                and getattr(config, 'USE_FAQ_RECORD_CACHE', True)):
+            return None
+
+        threshold = getattr(config, 'EXACT_MATCH_FAST_PATH_THRESHOLD', 0.95)
+        with tracing.span("fast_path") as span:
+            matches = self.question_index.find(user_query, threshold)
+            if not matches or not self.prerendered_answers.ensure_fresh():
+                span.set(hit=False)
+                return None
+
+            faq_id, question, similarity = matches[0]
+
+            # Same guard as the ranking's critical keyword penalty: "mở khóa" / "hủy liên kết"
+            # queries are near-identical to the "khóa" / "liên kết" FAQs
+            query_bits = ranking_query(get_query_context(user_query).query_lower, {}).critical_bits
+            if query_bits & ~compute_features(question, "", ()).numeric[0]:
+                logger.info(f"⚠️ Fast path skipped: critical keyword missing from FAQ question ({similarity:.0%}): "
+                           f"{question[:60]}...")
+                span.set(hit=False, critical_mismatch=True)
+                return None
+
+            result = self.prerendered_answers.get(faq_id)
+            span.set(hit=result is not None, similarity=round(similarity, 3))
+            if result is None:
+                return None
+
+        intent, _, _ = self.intent_classifier.classify(user_query)
+        result["intent"] = intent
+        result["confidence"] = similarity
+        result["exact_match_score"] = similarity
+
+        logger.info(f"⚡ EXACT MATCH FAST PATH ({similarity:.0%}): {question[:60]}...")
+        return result
+
+    def _render_faq_answer(self, faq_id: str, data: Dict, alternative_actions: List[Dict]) -> Dict:
+        """
+        Pre-render the result served for an exact match of one FAQ
+
+        Same fields as the "success" result of _rank_results for an exact match
+        (original answer, no focused extraction), plus the formatted answer.
+
+        Args:
+            faq_id: FAQ id
+            data: FAQ context row (f + entity lists)
+            alternative_actions: Alternative actions for the FAQ
+
+        Returns:
+            Result dict
+        """
+        faq = data.get("f", {})
+        answer = faq.get("answer", "") or ""
+        steps = self.step_extractor.extract_from_answer(answer) if answer else []
+
+        return {
+            "status": "success",
+            "question": faq.get("question", ""),
+            "answer": answer,
+            "rendered_answer": format_answer_for_readability(answer),
+            "original_answer": None,
+            "confidence": 1.0,
+            "intent": "GENERAL",
+            "faq_id": faq_id,
+            "related_entities": self._related_entities(data),
+            "alternative_actions": alternative_actions,
+            "related_questions": [
+                {"question": rq["question"]}
+                for rq in data.get("related_questions", [])
+                if rq.get("question")
+            ][:3],
+            "all_results": [],
+            "case_info": None,
+            "extraction_info": None,
+            "steps": steps,
+            "has_steps": len(steps) > 0,
+            "exact_match_score": 1.0,
+            "prerendered": True
+        }
+
+    @staticmethod
+    def _out_of_scope_response() -> Dict:
+        """Response for queries unrelated to VNPT Money"""
+        return {
+            "status": "out_of_scope",
+            "question": "",
+            "answer": "Xin lỗi, câu hỏi của bạn không liên quan đến dịch vụ VNPT Money. Tôi chỉ có thể hỗ trợ các câu hỏi về ví điện tử VNPT Money như: nạp tiền, rút tiền, chuyển tiền, liên kết ngân hàng, thanh toán, mua vé máy bay, v.v.\n\nNếu bạn cần hỗ trợ, vui lòng liên hệ Hotline: 1900 8198",
+            "confidence": 0,
+            "related_entities": {},
+            "related_questions": [],
+            "all_results": []
+        }
+
+    def _encode_query(self, query: str):
+        """Query embedding, encoded once per request (out-of-scope gate, semantic search)"""
+        ctx = get_query_context(query)
+        embedding = ctx.embeddings.get(query)
+        if embedding is None:
+            embedding = self.embeddings_model.encode(query)
+            ctx.embeddings[query] = embedding
+        return embedding
+
+    def _submit_stage(self, fn, *args) -> Future:
+        """Run fn(*args) on the stage pool, inside a copy of the caller's context (QueryContext, trace)"""
+        return self._stage_executor.submit(contextvars.copy_context().run, self._run_stage, fn, *args)
+
+    @staticmethod
+    def _run_stage(fn, *args):
+        with tracing.span("stage." + fn.__name__.strip("_")):
+            return fn(*args)
+
+    def _start_independent_stages(
+        self,
+        user_query: str,
+        intent: str,
+        top_k: int,
+        intermediate_top_k: int,
+        specific_intents: List[str]
+    ) -> Dict[str, Future]:
+        """
+        Start the query stages that don't depend on extracted entities
+
+        They run concurrently with (LLM) entity extraction and are joined
+        where the sequential pipeline used to call them.
+
+        Returns:
+            {stage name: Future}
+        """
+        if self._stage_executor is None:
+            return {}
+
+        stages = {"exact_match": self._submit_stage(self._find_exact_match_faq, user_query)}
+
+        if intent in specific_intents:
+            stages["intent_keyword"] = self._submit_stage(self._intent_keyword_search, user_query, intent, top_k)
+
+        # Largest semantic top_k _find_relevant_nodes asks for; smaller requests use a prefix
+        if config.ENABLE_HYBRID_MODE and self.embeddings_model:
+            semantic_top_k = intermediate_top_k * 3
+            future = self._submit_stage(self._semantic_search_uncached, user_query, semantic_top_k)
+            get_query_context(user_query).prefetch(("semantic", user_query), semantic_top_k, future)
+
+        return stages
+
+    @staticmethod
+    def _cancel_stages(stages: Dict[str, Future], user_query: str):
+        """
+        Cancel started stages that will not be joined
+
+        Stages still queued on the pool are dropped; running or finished
+        ones are left as they are.
+        """
+        for future in stages.values():
+            future.cancel()
+        get_query_context(user_query).cancel_prefetched()
+
+    @staticmethod
+    def _stage_result(stages: Dict[str, Future], name: str, fn, *args):
+        """Result of a started stage, or run fn(*args) now if it was not started"""
+        future = stages.get(name)
+        if future is not None:
+            return future.result()
+        return fn(*args)
+
+    @staticmethod
+    def _result_cache_key(user_query: str, top_k: int) -> tuple:
+        """
+        Result cache key: normalized query + top_k + result-relevant config
+
+        Args:
+            user_query: Query after diacritics conversion
+
+        Returns:
+            Hashable key
+        """
+        normalized = " ".join(normalize_query(user_query).tokens)
+        return (
+            normalized,
+            top_k,
+            tuple(getattr(config, name, None) for name in RESULT_CACHE_CONFIG_KEYS)
+        )
+
     def _extract_query_entities(self, user_query: str) -> Dict:
         """
         Extract entities from user query using Enhanced pattern-based matching
@@ -466,18 +794,7 @@ class Neo4jGraphRAGEngine:
         logger.warning("No entities found in query - checking if out of scope")
 
         # Check if query contains any VNPT Money related keywords
-        vnpt_keywords = [
-            'vnpt', 'ví', 'tiền', 'chuyển', 'nạp', 'rút', 'thanh toán', 'liên kết',
-            'ngân hàng', 'giao dịch', 'tài khoản', 'định danh', 'mật khẩu', 'otp',
-            'mobile money', 'phí', 'hạn mức', 'lỗi', 'thất bại', 'hotline', 'hỗ trợ',
-            'đăng ký', 'hủy', 'khóa', 'mở khóa', 'ứng dụng', 'app', 'pay', 'money',
-            'điện thoại', 'số dư', 'biểu phí', 'khuyến mãi', 'voucher', 'mã giảm giá'
-        ]
-
-        query_lower = query.lower()
-        has_vnpt_keyword = any(kw in query_lower for kw in vnpt_keywords)
-
-        if not has_vnpt_keyword:
+        if not has_vnpt_keyword(query.lower()):
             # Query is likely out of scope
             logger.warning(f"Query appears to be out of scope: {query}")
             return []  # Return empty to trigger no_results handling
@@ -517,47 +834,26 @@ class Neo4jGraphRAGEngine:
         if not entity_results:
             return []
 
-        query_lower = query.lower()
+        ctx = get_query_context(query)
 
         # Extract key terms from query (excluding stopwords)
-        stopwords = {'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
-                    'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
-                    'của', 'cho', 'với', 'từ', 'đến', 'trong', 'bao', 'nhiêu', 'ở', 'đâu',
-                    'mà', 'khi', 'nếu', 'thì', 'vì', 'do', 'bởi', 'nhưng', 'còn', 'vẫn'}
-
-        query_terms = set(w for w in query_lower.split() if w not in stopwords and len(w) > 1)
+        query_terms = ctx.normalized.terms(VERIFY_STOPWORDS)
 
         # Important compound terms to check - MORE SPECIFIC patterns
         # Only use MULTI-WORD patterns to avoid false positives
-        important_terms = []
-        compound_patterns = [
-            'liên kết ngân hàng', 'liên kết tài khoản', 'liên kết bank',
-            'nạp tiền vào ví', 'nạp tiền từ',
-            'rút tiền về', 'rút tiền từ ví',
-            'chuyển tiền đến', 'chuyển tiền cho', 'chuyển tiền qua',
-            'đăng ký tài khoản', 'đăng ký ví', 'tạo tài khoản',
-            'đổi mật khẩu', 'thay đổi mật khẩu', 'quên mật khẩu', 'lấy lại mật khẩu',
-            'vé máy bay', 'mua vé', 'đặt vé',
-            'thanh toán hóa đơn', 'thanh toán tiền điện', 'thanh toán tiền nước',
-            'định danh tài khoản', 'xác thực định danh',
-            'khóa tài khoản', 'mở khóa tài khoản'
-        ]
-        for term in compound_patterns:
-            if term in query_lower:
-                important_terms.append(term)
+        important_terms = ctx.normalized.compounds_in(VERIFY_COMPOUNDS)
 
         # Get FAQ questions for verification
         faq_ids = [r["node_id"] for r in entity_results[:top_k * 2]]
         if not faq_ids:
             return entity_results
 
-        cypher = """
-        MATCH (f:FAQ)
-        WHERE f.id IN $faq_ids
-        RETURN f.id as id, f.question as question
-        """
-        faq_data = self.connector.execute_query(cypher, {"faq_ids": faq_ids})
-        faq_questions = {f["id"]: f["question"] for f in faq_data}
+        faq_questions, missing_ids = {}, faq_ids
+        if self._faq_records_ready():
+            faq_questions, missing_ids = self.faq_records.questions(faq_ids)
+        if missing_ids:
+            faq_data = self.queries.run("faq_questions_by_ids", {"faq_ids": missing_ids})
+            faq_questions.update({f["id"]: f["question"] for f in faq_data})
 
         # Verify each result
         verified_results = []
@@ -574,13 +870,12 @@ class Neo4jGraphRAGEngine:
                     break
 
             # Check 2: Keyword overlap ratio
-            faq_terms = set(w for w in faq_question_lower.split() if w not in stopwords and len(w) > 1)
+            faq_terms = ctx.terms(faq_question_lower, VERIFY_STOPWORDS)
             overlap = len(query_terms & faq_terms)
             overlap_ratio = overlap / len(query_terms) if query_terms else 0
 
-            # Check 3: Similarity using SequenceMatcher
-            from difflib import SequenceMatcher
-            similarity = SequenceMatcher(None, query_lower, faq_question_lower).ratio()
+            # Check 3: Similarity using SequenceMatcher (memoized per request)
+            similarity = ctx.ratio(faq_question_lower)
 
             # Decision: Keep if compound match OR high overlap OR high similarity
             is_relevant = compound_match or overlap_ratio >= 0.3 or similarity >= 0.4
@@ -651,243 +946,37 @@ class Neo4jGraphRAGEngine:
         if banks:
             logger.info(f"  → Bank entities (will boost exact matches): {banks}")
 
-        # Cypher query to find FAQs via GRAPH TRAVERSAL with ENTITY-SPECIFIC FILTERING
-        cypher = """
-        // Find FAQs connected to extracted entities (EXACT match prioritized, then SMART PARTIAL)
-        MATCH (f:FAQ)-[r]->(e)
-        WHERE
-            // Priority 1: EXACT match (case-insensitive)
-            toLower(e.name) IN [entity IN $entity_names | toLower(entity)]
-            // Priority 2: Word boundary match to prevent false positives
-            OR ANY(entity IN $entity_names WHERE
-                size(entity) >= 3 AND (
-                    // Full phrase match
-                    toLower(e.name) CONTAINS ' ' + toLower(entity) + ' ' OR
-                    // Starts with phrase
-                    toLower(e.name) STARTS WITH toLower(entity) + ' ' OR
-                    // Ends with phrase
-                    toLower(e.name) ENDS WITH ' ' + toLower(entity) OR
-                    // Query entity contains DB entity as full word
-                    toLower(entity) CONTAINS ' ' + toLower(e.name) + ' ' OR
-                    toLower(entity) STARTS WITH toLower(e.name) + ' ' OR
-                    toLower(entity) ENDS WITH ' ' + toLower(e.name)
-                )
-            )
+        # Find FAQs via GRAPH TRAVERSAL with ENTITY-SPECIFIC FILTERING
+        # (see cypher_queries.ENTITY_GRAPH_SEARCH for the scoring rules)
+        params = {
+            "entity_names": all_entities,
+            "query_services": services,
+            "query_banks": banks,
+            "query_errors": errors,
+            "query_actions": actions,
+            "query_fees": fees,
+            "query_statuses": statuses,
+            "query_limits": limits,
+            "query_features": features,
+            "query_topics": topics,
+            "top_k": top_k
+        }
 
-        // Count entity matches and relationship types
-        WITH f,
-             count(DISTINCT e) as entity_matches,
-             collect(DISTINCT type(r)) as rel_types,
-             collect(DISTINCT labels(e)[0]) as entity_types,
-             collect(DISTINCT e.name) as matched_entities
-
-        // Calculate exact match bonus (boost when entity name matches EXACTLY)
-        WITH f,
-             entity_matches,
-             rel_types,
-             entity_types,
-             matched_entities,
-             // Count exact matches vs partial matches
-             size([e_name IN matched_entities WHERE e_name IN $entity_names]) as exact_matches
-
-        // ENTITY-SPECIFIC FILTERING: Check ALL 15 entity type matches
-        OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service)
-        OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank)
-        OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(err:Error)
-        OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action)
-        OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature)
-        OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee)
-        OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit)
-        OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status)
-        OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement)
-        OPTIONAL MATCH (f)-[:ABOUT]->(topic:Topic)
-        OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame)
-        OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document)
-        OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType)
-        OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement)
-        OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel)
-
-        WITH f, entity_matches, rel_types, entity_types, matched_entities, exact_matches,
-             collect(DISTINCT s.name) as faq_services,
-             collect(DISTINCT b.name) as faq_banks,
-             collect(DISTINCT err.name) as faq_errors,
-             collect(DISTINCT act.name) as faq_actions,
-             collect(DISTINCT feat.name) as faq_features,
-             collect(DISTINCT fee.name) as faq_fees,
-             collect(DISTINCT lim.name) as faq_limits,
-             collect(DISTINCT stat.name) as faq_statuses,
-             collect(DISTINCT req.name) as faq_requirements,
-             collect(DISTINCT topic.name) as faq_topics,
-             collect(DISTINCT tf.name) as faq_timeframes,
-             collect(DISTINCT doc.name) as faq_documents,
-             collect(DISTINCT acc.name) as faq_account_types,
-             collect(DISTINCT ui.name) as faq_ui_elements,
-             collect(DISTINCT contact.name) as faq_contact_channels
-
-        // Calculate ALL entity match bonuses (ALL 15 types!)
-        WITH f, entity_matches, rel_types, entity_types, matched_entities, exact_matches,
-             faq_services, faq_banks, faq_errors, faq_actions, faq_features,
-             faq_fees, faq_limits, faq_statuses, faq_requirements,
-             faq_topics, faq_timeframes, faq_documents, faq_account_types,
-             faq_ui_elements, faq_contact_channels,
-             // BOOST if FAQ has the EXACT Service entity from query
-             CASE
-               WHEN size($query_services) > 0 AND
-                    ANY(qs IN $query_services WHERE qs IN faq_services)
-               THEN 2.0  // VERY HIGH BOOST for exact service match (beats exact match penalty)
-               WHEN size($query_services) > 0 AND size(faq_services) > 0
-               THEN -1.0  // STRONG PENALTY if FAQ has different service
-               ELSE 0.3  // SMALL BOOST if FAQ has no service (tolerant to missing data)
-             END as service_match_bonus,
-             // BOOST if FAQ has the EXACT Bank entity from query
-             CASE
-               WHEN size($query_banks) > 0 AND
-                    ANY(qb IN $query_banks WHERE qb IN faq_banks)
-               THEN 1.5  // HIGH BOOST for exact bank match
-               WHEN size($query_banks) > 0 AND size(faq_banks) > 0
-               THEN -0.8  // PENALTY if FAQ has different bank
-               ELSE 0.2  // SMALL BOOST if FAQ has no bank (tolerant to missing data)
-             END as bank_match_bonus,
-             // PENALTY if FAQ has Error but query does NOT have Error
-             CASE
-               WHEN size(faq_errors) > 0 AND size($query_errors) = 0
-               THEN -2.0  // STRONG PENALTY: FAQ is about errors but query is NOT
-
-               // EXACT MATCH: Query error exactly matches FAQ error
-               WHEN size($query_errors) > 0 AND
-                    ANY(qe IN $query_errors WHERE qe IN faq_errors)
-               THEN 4.0  // STRONG BOOST: Exact error match
-
-               // FUZZY MATCH: Check if main keywords of query error appear in FAQ error
-               // Split "giao dịch thất bại" → check if FAQ error contains both "giao dịch" and "thất bại"
-               WHEN size($query_errors) > 0 AND
-                    ANY(qe IN $query_errors
-                        WHERE ANY(fe IN faq_errors
-                                  WHERE (toLower(fe) CONTAINS toLower(qe)
-                                     OR toLower(qe) CONTAINS toLower(fe)
-                                     // Keyword-based fuzzy matching for multi-word errors
-                                     OR (toLower(fe) CONTAINS 'thất bại' AND toLower(qe) CONTAINS 'thất bại')
-                                     OR (toLower(fe) CONTAINS 'chưa nhận' AND toLower(qe) CONTAINS 'chưa nhận')
-                                     OR (toLower(fe) CONTAINS 'không nhận' AND toLower(qe) CONTAINS 'không nhận'))))
-               THEN 3.0  // GOOD BOOST: Partial error match (fuzzy)
-
-               ELSE 0.0
-             END as error_match_bonus,
-             // NEW: BOOST for Action match (IMPORTANT!)
-             CASE
-               WHEN size($query_actions) > 0 AND
-                    ANY(qa IN $query_actions WHERE qa IN faq_actions)
-               THEN 1.8  // STRONG BOOST for action match
-               ELSE 0.0
-             END as action_match_bonus,
-             // NEW: BOOST for Fee match (IMPORTANT!)
-             CASE
-               WHEN size($query_fees) > 0 AND size(faq_fees) > 0
-               THEN 2.0  // VERY STRONG BOOST for fee-related queries
-               ELSE 0.0
-             END as fee_match_bonus,
-             // NEW: BOOST for Status match
-             CASE
-               WHEN size($query_statuses) > 0 AND
-                    ANY(qs IN $query_statuses WHERE qs IN faq_statuses)
-               THEN 1.5  // STRONG BOOST for status match
-               ELSE 0.0
-             END as status_match_bonus,
-             // NEW: BOOST for Limit match
-             CASE
-               WHEN size($query_limits) > 0 AND size(faq_limits) > 0
-               THEN 1.5  // STRONG BOOST for limit-related queries
-               ELSE 0.0
-             END as limit_match_bonus,
-             // NEW: BOOST for Feature match (CRITICAL FIX!)
-             CASE
-               WHEN size($query_features) > 0 AND
-                    ANY(qf IN $query_features WHERE
-                        ANY(ff IN faq_features WHERE
-                            toLower(ff) CONTAINS toLower(qf) OR
-                            toLower(qf) CONTAINS toLower(ff)))
-               THEN 2.5  // VERY STRONG BOOST for feature match (e.g., "liên kết ngân hàng")
-               WHEN size($query_features) > 0 AND size(faq_features) > 0
-               THEN -0.5  // Small penalty if FAQ has different feature
-               ELSE 0.0
-             END as feature_match_bonus,
-             // NEW: BOOST for Topic match (CRITICAL FIX!)
-             CASE
-               WHEN size($query_topics) > 0 AND
-                    ANY(qt IN $query_topics WHERE
-                        ANY(ft IN faq_topics WHERE
-                            toLower(ft) CONTAINS toLower(qt) OR
-                            toLower(qt) CONTAINS toLower(ft)))
-               THEN 2.0  // STRONG BOOST for topic match
-               ELSE 0.0
-             END as topic_match_bonus
-
-        // Calculate graph-based score with entity-specific boosting (EXPANDED!)
-        WITH f,
-             entity_matches,
-             rel_types,
-             entity_types,
-             matched_entities,
-             exact_matches,
-             service_match_bonus,
-             bank_match_bonus,
-             error_match_bonus,
-             action_match_bonus,
-             fee_match_bonus,
-             status_match_bonus,
-             limit_match_bonus,
-             feature_match_bonus,
-             topic_match_bonus,
-             // Bonus for specific relationship types (REDUCED ERROR BOOST)
-             CASE
-               WHEN 'DESCRIBES_ERROR' IN rel_types THEN 1.5  // REDUCED from 3.0 (let error_match_bonus handle it)
-               WHEN 'ABOUT' IN rel_types THEN 1.5
-               WHEN 'MENTIONS_BANK' IN rel_types THEN 1.5
-               WHEN 'MENTIONS_SERVICE' IN rel_types THEN 1.5
-               WHEN 'SUGGESTS_ACTION' IN rel_types THEN 1.2
-               WHEN 'USES_FEATURE' IN rel_types THEN 1.3  // NEW: Boost for feature relationships
-               ELSE 1.0
-             END as rel_weight,
-             // Exact match bonus
-             exact_matches * 0.5 as exact_match_bonus
-
-        RETURN f.id as id,
-               (entity_matches * rel_weight + exact_match_bonus + service_match_bonus + bank_match_bonus +
-                error_match_bonus + action_match_bonus + fee_match_bonus + status_match_bonus + limit_match_bonus +
-                feature_match_bonus + topic_match_bonus) as graph_score,
-               entity_matches,
-               rel_types,
-               entity_types,
-               matched_entities,
-               service_match_bonus,
-               bank_match_bonus,
-               error_match_bonus,
-               action_match_bonus,
-               fee_match_bonus,
-               status_match_bonus,
-               limit_match_bonus,
-               feature_match_bonus,
-               topic_match_bonus
-        ORDER BY graph_score DESC
-        LIMIT $top_k
-        """
-
-        results = self.connector.execute_query(
-            cypher,
-            {
-                "entity_names": all_entities,
-                "query_services": services,
-                "query_banks": banks,
-                "query_errors": errors,
-                "query_actions": actions,
-                "query_fees": fees,
-                "query_statuses": statuses,
-                "query_limits": limits,
-                "query_features": features,
-                "query_topics": topics,
-                "top_k": top_k
-            }
-        )
+        # Resolve entities to node ids in-process, so traversal starts from the
+        # matched entity nodes instead of scanning every FAQ → entity edge
+        entity_ids = None
+        if getattr(config, 'USE_ENTITY_ALIAS_TABLE', True):
+            try:
+                entity_ids = self.entity_aliases.resolve(all_entities)
+            except Exception as e:
+                logger.warning(f"⚠️ Entity alias table unavailable, scanning entity names in Cypher: {e}")
+
+        if entity_ids is None:
+            results = self.queries.run("entity_graph_search", params)
+        elif entity_ids:
+            results = self.queries.run("entity_graph_search_by_ids", {**params, "entity_ids": entity_ids})
+        else:
+            results = []
 
         if not results:
             logger.warning(f"No graph results found for entities: {all_entities}")
@@ -976,53 +1065,20 @@ class Neo4jGraphRAGEngine:
 
         logger.info("🎯 Recalculating entity bonuses with hybrid matcher")
 
-        # For each FAQ result, get its entities and recalculate bonuses
+        # Get every result FAQ's entities (ALL 15 types!) in one query
+        entities_by_faq = {
+            row.pop("faq_id"): row
+            for row in self.queries.run("faq_entity_names", {"faq_ids": [r.get("id") for r in results]})
+        }
+
+        # For each FAQ result, recalculate bonuses
         for r in results:
             faq_id = r.get("id")
+            faq_entities = entities_by_faq.get(faq_id)
 
-            # Query Neo4j to get FAQ's entities (ALL 15 types!)
-            cypher = """
-            MATCH (f:FAQ {id: $faq_id})
-            OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service)
-            OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank)
-            OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(err:Error)
-            OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action)
-            OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature)
-            OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee)
-            OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status)
-            OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit)
-            OPTIONAL MATCH (f)-[:ABOUT]->(topic:Topic)
-            OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement)
-            OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame)
-            OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document)
-            OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType)
-            OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement)
-            OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel)
-            RETURN
-                collect(DISTINCT s.name) as faq_services,
-                collect(DISTINCT b.name) as faq_banks,
-                collect(DISTINCT err.name) as faq_errors,
-                collect(DISTINCT act.name) as faq_actions,
-                collect(DISTINCT feat.name) as faq_features,
-                collect(DISTINCT fee.name) as faq_fees,
-                collect(DISTINCT stat.name) as faq_statuses,
-                collect(DISTINCT lim.name) as faq_limits,
-                collect(DISTINCT topic.name) as faq_topics,
-                collect(DISTINCT req.name) as faq_requirements,
-                collect(DISTINCT tf.name) as faq_timeframes,
-                collect(DISTINCT doc.name) as faq_documents,
-                collect(DISTINCT acc.name) as faq_account_types,
-                collect(DISTINCT ui.name) as faq_ui_elements,
-                collect(DISTINCT contact.name) as faq_contact_channels
-            """
-
-            faq_entities_result = self.connector.execute_query(cypher, {"faq_id": faq_id})
-
-            if not faq_entities_result:
+            if not faq_entities:
                 continue
 
-            faq_entities = faq_entities_result[0]
-
             # Calculate hybrid bonuses
             service_bonus = self.hybrid_matcher.get_entity_bonus(
                 query_entities=services,
@@ -1206,71 +1262,73 @@ class Neo4jGraphRAGEngine:
 
     def _semantic_search(self, query: str, top_k: int) -> List[Dict]:
         """Search using semantic similarity (cosine similarity with embeddings)"""
+        # Started concurrently with entity extraction (see _start_independent_stages)
+        prefetched = get_query_context(query).take_prefetched(("semantic", query), top_k)
+        if prefetched is not None:
+            return prefetched
+        return self._semantic_search_uncached(query, top_k)
+
+    def _semantic_search_uncached(self, query: str, top_k: int) -> List[Dict]:
+        """Semantic search without the request-scoped prefetch"""
         if not self.embeddings_model:
             return []
 
-        # Encode query
-        query_embedding = self.embeddings_model.encode(query).tolist()
-
-        # Get all FAQ nodes with embeddings
-        cypher = """
-        MATCH (f:FAQ)
-        WHERE f.embedding IS NOT NULL
-        RETURN f.id as id, f.question as text, f.embedding as embedding
-        """
-
-        questions = self.connector.execute_query(cypher)
-
-        # Compute similarities
-        results = []
-        for q in questions:
-            emb = np.array(q["embedding"])
-            query_emb = np.array(query_embedding)
+        # Encode query (reuses the out-of-scope gate's encoding)
+        query_embedding = self._encode_query(query)
 
-            # Cosine similarity
-            similarity = np.dot(emb, query_emb) / (np.linalg.norm(emb) * np.linalg.norm(query_emb))
+        # Native vector index: top-k computed inside Neo4j
+        if getattr(config, 'SEMANTIC_SEARCH_BACKEND', 'matrix') == "vector_index":
+            try:
+                results = self.queries.run(
+                    "vector_search",
+                    {
+                        "index_name": config.FAQ_VECTOR_INDEX,
+                        "top_k": top_k,
+                        "embedding": query_embedding.tolist()
+                    }
+                )
+                return [
+                    {
+                        "node_id": r["id"],
+                        # Index reports (1 + cosine) / 2; convert back to cosine
+                        "score": float(r["score"]) * 2 - 1,
+                        "method": "semantic"
+                    }
+                    for r in results
+                ]
+            except Exception as e:
+                logger.warning(f"⚠️ Vector index unavailable, using embedding matrix: {e}")
 
-            results.append({
-                "node_id": q["id"],
-                "score": float(similarity),
+        # In-process matrix: one mat-vec product + argpartition
+        return [
+            {
+                "node_id": faq_id,
+                "score": similarity,
                 "method": "semantic"
-            })
-
-        # Sort and return top-k
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+            }
+            for faq_id, similarity in self.embedding_matrix.top_k(query_embedding, top_k)
+        ]
 
 
     def _keyword_search(self, query: str, top_k: int) -> List[Dict]:
         """
         Enhanced keyword search with EXACT MATCH priority
         1. First, check for exact/near-exact question matches
-        2. Then, search by keywords
+        2. Then, search by keywords (BM25 full-text index, CONTAINS scan fallback)
         """
-        import re
-        from difflib import SequenceMatcher
-
-        query_lower = query.lower().strip()
+        normalized = normalize_query(query)
+        query_lower = normalized.stripped
 
         # STEP 1: Check for exact/near-exact matches first (PRIORITY)
-        exact_match_cypher = """
-        MATCH (f:FAQ)
-        RETURN f.id as id, f.question as question
-        """
-        all_faqs = self.connector.execute_query(exact_match_cypher)
-
         exact_matches = []
-        for faq in all_faqs:
-            faq_question = faq["question"].lower().strip()
-            similarity = SequenceMatcher(None, query_lower, faq_question).ratio()
-
-            if similarity > 0.85:  # 85%+ match = exact
-                exact_matches.append({
-                    "node_id": faq["id"],
-                    "score": similarity,
-                    "method": "exact_match"
-                })
-                logger.info(f"🎯 EXACT MATCH ({similarity:.0%}): {faq['question'][:60]}...")
+        for faq_id, question, similarity in self.question_index.find(query_lower, 0.85, strict=True):
+            # 85%+ match = exact
+            exact_matches.append({
+                "node_id": faq_id,
+                "score": similarity,
+                "method": "exact_match"
+            })
+            logger.info(f"🎯 EXACT MATCH ({similarity:.0%}): {question[:60]}...")
 
         if exact_matches:
             # Sort by similarity and return
@@ -1278,71 +1336,93 @@ class Neo4jGraphRAGEngine:
             return exact_matches[:top_k]
 
         # STEP 2: Keyword-based search
-        # Extract meaningful keywords (remove stopwords)
-        stopwords = {'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
-                     'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
-                     'của', 'cho', 'với', 'từ', 'đến', 'trong', 'ngoài', 'trên', 'dưới',
-                     'khi', 'nếu', 'thì', 'mà', 'vì', 'do', 'bởi', 'nhưng', 'còn', 'vẫn',
-                     'đang', 'sẽ', 'đã', 'rồi', 'chưa', 'không', 'có thể', 'phải', 'những'}
-
-        words = re.findall(r'[\w]+', query_lower)
-        keywords = [w for w in words if w not in stopwords and len(w) > 1]
-
-        # Important compound terms
-        important_compounds = [
-            'gói cước', 'data 3g', 'data 4g', '3g/4g', 'mobile money', 'vnpt money',
-            'vnpt pay', 'rút tiền', 'nạp tiền', 'chuyển tiền', 'liên kết', 'ngân hàng',
-            'biểu phí', 'hạn mức', 'thời gian', 'hotline', 'tổng đài', 'nhà mạng'
-        ]
-        compound_terms = [term for term in important_compounds if term in query_lower]
+        # Meaningful keywords (stopwords removed) + important compound terms
+        keywords = normalized.keywords(KEYWORD_STOPWORDS)
+        compound_terms = normalized.compounds_in(KEYWORD_COMPOUNDS)
 
         all_keywords = list(set(keywords + compound_terms))
 
-        if not all_keywords:
-            cypher = """
-            MATCH (f:FAQ)
-            WHERE toLower(f.question) CONTAINS toLower($query)
-               OR toLower(f.answer) CONTAINS toLower($query)
-            RETURN f.id as id, 1 as match_count
-            ORDER BY match_count DESC
-            LIMIT $top_k
-            """
-            results = self.connector.execute_query(cypher, {"query": query, "top_k": top_k})
-        else:
-            keyword_conditions = " OR ".join([
-                f"(toLower(f.question) CONTAINS '{kw}' OR toLower(f.answer) CONTAINS '{kw}')"
-                for kw in all_keywords
-            ])
-
-            cypher = f"""
-            MATCH (f:FAQ)
-            WHERE {keyword_conditions}
-            WITH f,
-                 size([kw IN $keywords WHERE toLower(f.question) CONTAINS kw]) * 2 +
-                 size([kw IN $keywords WHERE toLower(f.answer) CONTAINS kw]) as match_count
-            WHERE match_count > 0
-            RETURN f.id as id, match_count
-            ORDER BY match_count DESC
-            LIMIT $top_k
-            """
-
-            results = self.connector.execute_query(
-                cypher,
-                {"keywords": all_keywords, "top_k": top_k}
-            )
+        # BM25 over the full-text index (whole query as one phrase if no keywords)
+        results = self._fulltext_search(all_keywords or [query_lower], top_k)
 
+        if results is None:
+            # Full-text index unavailable: CONTAINS scan
+            if not all_keywords:
+                results = self.queries.run("keyword_search_phrase", {"query": query, "top_k": top_k})
+            else:
+                results = self.queries.run(
+                    "keyword_search",
+                    {"keywords": all_keywords, "top_k": top_k}
+                )
+            results = [{"id": r["id"], "score": r["match_count"]} for r in results]
+
+        if all_keywords:
             logger.info(f"Keyword search with terms {all_keywords}: found {len(results)} results")
 
-        max_score = max([r["match_count"] for r in results]) if results else 1
+        max_score = max([r["score"] for r in results]) if results else 1
         return [
             {
                 "node_id": r["id"],
-                "score": r["match_count"] / max_score,
+                "score": float(r["score"]) / max_score,
                 "method": "keyword"
             }
             for r in results
         ]
 
+    def _fulltext_search(self, keywords: List[str], top_k: int) -> Optional[List[Dict]]:
+        """
+        BM25 search over the FAQ full-text index
+
+        Each keyword is searched as a phrase in question (boosted) and answer.
+
+        Args:
+            keywords: Keywords / compound terms (lowercase)
+            top_k: Number of results to return
+
+        Returns:
+            List of {id, score}, or None if full-text search is disabled or
+            the query failed (caller falls back to CONTAINS search; a missing
+            index is not queried again until the graph version changes)
+        """
+        if not getattr(config, 'USE_FULLTEXT_SEARCH', False) or not keywords or self._fulltext_unavailable:
+            return None
+
+        boost = getattr(config, 'FULLTEXT_QUESTION_BOOST', 2.0)
+        clauses = []
+        for kw in keywords:
+            # Inside a quoted phrase only backslash and quote need escaping
+            phrase = kw.replace('\\', '\\\\').replace('"', '\\"')
+            clauses.append(f'question:"{phrase}"^{boost}')
+            clauses.append(f'answer:"{phrase}"')
+
+        try:
+            return self.queries.run(
+                "fulltext_search",
+                {
+                    "index_name": config.FAQ_FULLTEXT_INDEX,
+                    "search": " OR ".join(clauses),
+                    "top_k": top_k
+                }
+            )
+        except Exception as e:
+            if self._is_missing_index_error(e, config.FAQ_FULLTEXT_INDEX):
+                self._fulltext_unavailable = True
+                logger.warning(f"⚠️ Full-text index missing, using CONTAINS scan until the graph version changes: {e}")
+            else:
+                logger.warning(f"⚠️ Full-text search failed, using CONTAINS scan for this query: {e}")
+            return None
+
+    @staticmethod
+    def _is_missing_index_error(error: Exception, index_name: str) -> bool:
+        """True if a Cypher error says the index does not exist (not a transient or query error)"""
+        if not isinstance(error, ClientError):
+            return False
+        if getattr(error, "code", None) == "Neo.ClientError.Schema.IndexNotFound":
+            return True
+        # db.index.fulltext.queryNodes reports a missing index as ProcedureCallFailed
+        message = str(error).lower()
+        return index_name.lower() in message and ("no such" in message or "not found" in message)
+
     def _find_exact_match_faq(self, query: str, threshold: float = 0.85) -> List[Dict]:
         """
         Find FAQs that exactly or nearly match the query question.
@@ -1355,33 +1435,21 @@ class Neo4jGraphRAGEngine:
         Returns:
             List of exact match results with high scores
         """
-        from difflib import SequenceMatcher
-
-        query_lower = query.lower().strip()
-
-        # Get all FAQ questions
-        cypher = "MATCH (f:FAQ) RETURN f.id as id, f.question as question"
-        all_faqs = self.connector.execute_query(cypher)
+        ctx = get_query_context(query)
+        query_lower = ctx.query_stripped
 
+        # Indexed fuzzy lookup (already sorted by similarity, highest first)
         exact_matches = []
-        for faq in all_faqs:
-            if not faq.get("question"):
-                continue
-
-            faq_question = faq["question"].lower().strip()
-            similarity = SequenceMatcher(None, query_lower, faq_question).ratio()
-
-            if similarity >= threshold:
-                exact_matches.append({
-                    "node_id": faq["id"],
-                    "score": similarity,
-                    "method": "exact_match",
-                    "similarity": similarity
-                })
-                logger.info(f"🎯 EXACT MATCH FOUND ({similarity:.0%}): {faq['question'][:60]}...")
+        for faq_id, question, similarity in self.question_index.find(query_lower, threshold):
+            ctx.seed_ratio(question.lower().strip(), similarity, query_form=query_lower)
+            exact_matches.append({
+                "node_id": faq_id,
+                "score": similarity,
+                "method": "exact_match",
+                "similarity": similarity
+            })
+            logger.info(f"🎯 EXACT MATCH FOUND ({similarity:.0%}): {question[:60]}...")
 
-        # Sort by similarity (highest first)
-        exact_matches.sort(key=lambda x: x["similarity"], reverse=True)
         return exact_matches
 
     def _intent_keyword_search(self, query: str, intent: str, top_k: int) -> List[Dict]:
@@ -1412,39 +1480,24 @@ class Neo4jGraphRAGEngine:
         if not keywords:
             return []
 
-        # Build Cypher query with OR conditions for all keywords
-        keyword_conditions = " OR ".join([
-            f"(toLower(f.question) CONTAINS '{kw}' OR toLower(f.answer) CONTAINS '{kw}')"
-            for kw in keywords
-        ])
-
-        cypher = f"""
-        MATCH (f:FAQ)
-        WHERE {keyword_conditions}
-        WITH f,
-             // Score based on how many keywords match in question (higher priority)
-             size([kw IN $keywords WHERE toLower(f.question) CONTAINS kw]) * 2 +
-             // Score based on how many keywords match in answer
-             size([kw IN $keywords WHERE toLower(f.answer) CONTAINS kw]) as keyword_score
-        RETURN f.id as id, keyword_score
-        ORDER BY keyword_score DESC
-        LIMIT $top_k
-        """
-
-        results = self.connector.execute_query(
-            cypher,
-            {"keywords": keywords, "top_k": top_k}
-        )
+        results = self._fulltext_search(keywords, top_k)
+
+        if results is None:
+            results = self.queries.run(
+                "intent_keyword_search",
+                {"keywords": keywords, "top_k": top_k}
+            )
+            results = [{"id": r["id"], "score": r["keyword_score"]} for r in results]
 
         if not results:
             return []
 
         # Normalize scores
-        max_score = max([r["keyword_score"] for r in results]) if results else 1
+        max_score = max([r["score"] for r in results]) or 1
         return [
             {
                 "node_id": r["id"],
-                "score": float(r["keyword_score"]) / max_score * 0.8,  # Scale down to not override entity results
+                "score": float(r["score"]) / max_score * 0.8,  # Scale down to not override entity results
                 "method": f"intent_keyword_{intent.lower()}"
             }
             for r in results
@@ -1550,7 +1603,13 @@ class Neo4jGraphRAGEngine:
             List of context items
         """
         context = []
-        query_lower = user_query.lower() if user_query else ""
+        ctx = get_query_context(user_query or "")
+        query_lower = ctx.query_lower
+
+        # Fetch context, cases and alternative actions for ALL candidates at once
+        faq_contexts, faq_cases, faq_alternatives = self._fetch_graph_context_batch(
+            [node["node_id"] for node in relevant_nodes]
+        )
 
         for node in relevant_nodes:
             node_id = node["node_id"]
@@ -1561,70 +1620,13 @@ class Neo4jGraphRAGEngine:
                 logger.debug(f"FAQ {node_id} - Component scores: {node['component_scores']}, "
                            f"Final: {relevance_score:.3f}, Methods: {node.get('methods', [])}")
 
-            # Get FAQ, answer, and related info using Cypher
-            # UPDATED: Retrieve ALL entity types with ENRICHED PROPERTIES for comprehensive context
-            cypher = """
-            MATCH (f:FAQ {id: $node_id})
-            OPTIONAL MATCH (f)-[:MENTIONS_SERVICE]->(s:Service)
-            OPTIONAL MATCH (f)-[:MENTIONS_BANK]->(b:Bank)
-            OPTIONAL MATCH (f)-[:DESCRIBES_ERROR]->(e:Error)
-            OPTIONAL MATCH (f)-[:SUGGESTS_ACTION]->(act:Action)
-            OPTIONAL MATCH (f)-[:USES_FEATURE]->(feat:Feature)
-            OPTIONAL MATCH (f)-[:HAS_FEE]->(fee:Fee)
-            OPTIONAL MATCH (f)-[:HAS_LIMIT]->(lim:Limit)
-            OPTIONAL MATCH (f)-[:HAS_STATUS]->(stat:Status)
-            OPTIONAL MATCH (f)-[:HAS_TIMEFRAME]->(tf:TimeFrame)
-            OPTIONAL MATCH (f)-[:REQUIRES]->(req:Requirement)
-            OPTIONAL MATCH (f)-[:REQUIRES_DOCUMENT]->(doc:Document)
-            OPTIONAL MATCH (f)-[:AFFECTS_ACCOUNT]->(acc:AccountType)
-            OPTIONAL MATCH (f)-[:NAVIGATES_TO]->(ui:UIElement)
-            OPTIONAL MATCH (f)-[:CONTACTS]->(contact:ContactChannel)
-            OPTIONAL MATCH (f)-[:SIMILAR_TO]-(similar:FAQ)
-            OPTIONAL MATCH (f)-[:ABOUT]->(t:Topic)
-            OPTIONAL MATCH (f)-[:HAS_LINK]->(link:UsefulLink)
-            RETURN f,
-                   collect(DISTINCT s.name) as services,
-                   collect(DISTINCT b.name) as banks,
-                   collect(DISTINCT {name: e.name, solution: e.solution}) as errors,
-                   collect(DISTINCT act.name) as actions,
-                   collect(DISTINCT feat.name) as features,
-                   collect(DISTINCT fee.name) as fees,
-                   collect(DISTINCT lim.name) as limits,
-                   collect(DISTINCT stat.name) as statuses,
-                   collect(DISTINCT tf.name) as timeframes,
-                   collect(DISTINCT {name: req.name, description: req.description}) as requirements,
-                   collect(DISTINCT {name: doc.name, description: doc.description}) as documents,
-                   collect(DISTINCT acc.name) as account_types,
-                   collect(DISTINCT ui.name) as ui_elements,
-                   collect(DISTINCT {name: contact.name, phone: contact.phone, description: contact.description}) as contact_channels,
-                   collect(DISTINCT {question: similar.question, id: similar.id}) as related_questions,
-                   collect(DISTINCT t.name) as topics,
-                   collect(DISTINCT {name: link.name, url: link.url, description: link.description}) as useful_links
-            """
-
-            result = self.connector.execute_query(cypher, {"node_id": node_id})
-
-            # Separate query for Case nodes and their Steps
-            case_cypher = """
-            MATCH (f:FAQ {id: $node_id})-[:HAS_CASE]->(case:Case)
-            OPTIONAL MATCH (case)-[:HAS_STEP]->(step:Step)
-            RETURN case.case_id as case_id,
-                   case.name as case_name,
-                   case.description as case_description,
-                   case.case_type as case_type,
-                   case.method as case_method,
-                   case.keywords as keywords,
-                   case.status_values as status_values,
-                   collect({number: step.number, text: step.text}) as steps
-            ORDER BY case.case_id
-            """
-
-            case_results = self.connector.execute_query(case_cypher, {"node_id": node_id})
+            # FAQ, answer, related entities and Case nodes (from the batch fetch)
+            data = faq_contexts.get(node_id)
+            case_results = faq_cases.get(node_id, [])
 
-            if not result:
+            if not data:
                 continue
 
-            data = result[0]
             faq = data.get("f", {})
 
             # EARLY EXACT MATCH BOOST (before final ranking)
@@ -1632,8 +1634,7 @@ class Neo4jGraphRAGEngine:
             question_text = faq.get("question", "")
             exact_match_score = 0.0  # Track exact match for later use
             if query_lower and question_text:
-                from difflib import SequenceMatcher
-                similarity = SequenceMatcher(None, query_lower, question_text.lower()).ratio()
+                similarity = ctx.ratio(question_text.lower())
                 exact_match_score = similarity  # Store for later use
 
                 if similarity > 0.9:  # 90%+ exact match
@@ -1645,7 +1646,7 @@ class Neo4jGraphRAGEngine:
                     logger.info(f"✓ EARLY HIGH SIMILARITY ({similarity:.2%}): {question_text[:80]}...")
 
             # Get alternative actions
-            alternative_actions = self._get_alternative_actions(data.get("actions", []))
+            alternative_actions = faq_alternatives.get(node_id, [])
 
             # NEW: Select appropriate Case based on query
             selected_case = None
@@ -1860,31 +1861,7 @@ class Neo4jGraphRAGEngine:
                 "question": question_text,
                 "answer": case_based_answer,  # Use Case-based answer if available
                 "relevance_score": relevance_score,
-                "related_entities": {
-                    # Core entities
-                    "services": [s for s in data.get("services", []) if s],
-                    "banks": [b for b in data.get("banks", []) if b],
-                    # ENRICHED: Error now includes solution
-                    "errors": [e for e in data.get("errors", []) if e and e.get("name")],
-                    "actions": [a for a in data.get("actions", []) if a],
-                    "features": [f for f in data.get("features", []) if f],
-                    "topics": [t for t in data.get("topics", []) if t],
-                    # NEW: Additional entity types for comprehensive context
-                    "fees": [f for f in data.get("fees", []) if f],
-                    "limits": [l for l in data.get("limits", []) if l],
-                    "statuses": [s for s in data.get("statuses", []) if s],
-                    "timeframes": [t for t in data.get("timeframes", []) if t],
-                    # ENRICHED: Requirement now includes description
-                    "requirements": [r for r in data.get("requirements", []) if r and r.get("name")],
-                    # ENRICHED: Document now includes description
-                    "documents": [d for d in data.get("documents", []) if d and d.get("name")],
-                    "account_types": [a for a in data.get("account_types", []) if a],
-                    "ui_elements": [u for u in data.get("ui_elements", []) if u],
-                    # ENRICHED: ContactChannel now includes phone and description
-                    "contact_channels": [c for c in data.get("contact_channels", []) if c and c.get("name")],
-                    # NEW: UsefulLink with url
-                    "useful_links": [l for l in data.get("useful_links", []) if l and l.get("url")],
-                },
+                "related_entities": self._related_entities(data),
                 "related_questions": [
                     {"question": rq["question"]}
                     for rq in data.get("related_questions", [])
@@ -1902,6 +1879,35 @@ class Neo4jGraphRAGEngine:
 
         return context
 
+    @staticmethod
+    def _related_entities(data: Dict) -> Dict:
+        """Related entity lists of a FAQ context row (empty values dropped)"""
+        return {
+            # Core entities
+            "services": [s for s in data.get("services", []) if s],
+            "banks": [b for b in data.get("banks", []) if b],
+            # ENRICHED: Error now includes solution
+            "errors": [e for e in data.get("errors", []) if e and e.get("name")],
+            "actions": [a for a in data.get("actions", []) if a],
+            "features": [f for f in data.get("features", []) if f],
+            "topics": [t for t in data.get("topics", []) if t],
+            # NEW: Additional entity types for comprehensive context
+            "fees": [f for f in data.get("fees", []) if f],
+            "limits": [l for l in data.get("limits", []) if l],
+            "statuses": [s for s in data.get("statuses", []) if s],
+            "timeframes": [t for t in data.get("timeframes", []) if t],
+            # ENRICHED: Requirement now includes description
+            "requirements": [r for r in data.get("requirements", []) if r and r.get("name")],
+            # ENRICHED: Document now includes description
+            "documents": [d for d in data.get("documents", []) if d and d.get("name")],
+            "account_types": [a for a in data.get("account_types", []) if a],
+            "ui_elements": [u for u in data.get("ui_elements", []) if u],
+            # ENRICHED: ContactChannel now includes phone and description
+            "contact_channels": [c for c in data.get("contact_channels", []) if c and c.get("name")],
+            # NEW: UsefulLink with url
+            "useful_links": [l for l in data.get("useful_links", []) if l and l.get("url")],
+        }
+
     def _extract_matching_case_from_answer(self, answer: str, features: List[str], query: str) -> str:
         """
         Extract the matching case section from a multi-case answer.
@@ -2043,24 +2049,200 @@ class Neo4jGraphRAGEngine:
         # No match - return full answer
         return answer
 
+    def _fetch_graph_context_batch(self, node_ids: List[str]):
+        """
+        Fetch graph context for many FAQs in a fixed number of queries
+
+        Replaces per-candidate context / case / alternative-action queries
+        with one UNWIND query each (3 round trips regardless of candidate count).
+
+        Args:
+            node_ids: FAQ ids (duplicates allowed)
+
+        Returns:
+            ({faq_id: context row}, {faq_id: [case rows]}, {faq_id: [alternative actions]})
+        """
+        node_ids = list(dict.fromkeys(node_ids))
+        if not node_ids:
+            return {}, {}, {}
+
+        # Memory lookup for cached FAQs, Neo4j only for the rest
+        if self._faq_records_ready():
+            contexts, cases, alternatives, missing_ids = self.faq_records.context_batch(node_ids)
+            if missing_ids:
+                for fetched, cached in zip(self._query_graph_context_batch(missing_ids),
+                                           (contexts, cases, alternatives)):
+                    cached.update(fetched)
+            return contexts, cases, alternatives
+
+        return self._query_graph_context_batch(node_ids)
+
+    def _query_graph_context_batch(self, node_ids: List[str]):
+        """Neo4j part of _fetch_graph_context_batch (distinct ids, same return shape)"""
+        # FAQ + ALL entity types with ENRICHED PROPERTIES for comprehensive context
+        contexts = {}
+        for row in self.queries.run("faq_context", {"node_ids": node_ids}):
+            contexts[row.pop("node_id")] = row
+
+        # Case nodes and their Steps (ordered by case_id within each FAQ)
+        cases: Dict[str, List[Dict]] = {}
+        for row in self.queries.run("faq_cases", {"node_ids": node_ids}):
+            cases.setdefault(row.pop("node_id"), []).append(row)
+
+        # Alternative actions for the union of all FAQ actions, split back per FAQ
+        all_actions = list(dict.fromkeys(
+            action for row in contexts.values() for action in row.get("actions", [])
+        ))
+        alternatives: Dict[str, List[Dict]] = {}
+        if all_actions:
+            alt_rows = self.queries.run("alternative_actions", {"actions": all_actions})
+            for faq_id, row in contexts.items():
+                faq_actions = set(row.get("actions", []))
+                alternatives[faq_id] = [
+                    {"action": r["action"], "reason": r.get("reason", "")}
+                    for r in alt_rows if r["source"] in faq_actions
+                ]
+
+        return contexts, cases, alternatives
+
+    def _faq_records_ready(self) -> bool:
+        """True if FAQ records can be read from the in-process cache"""
+        return getattr(config, 'USE_FAQ_RECORD_CACHE', True) and self.faq_records.ensure_fresh()
+
+    def _run_step_query(self, name: str, params: Dict) -> List[Dict]:
+        """Run a process-step query from the FAQ record cache, or Neo4j if not cached"""
+        if self._faq_records_ready():
+            rows = self.faq_records.run_step_query(name, params)
+            if rows is not None:
+                return rows
+        return self.queries.run(name, params)
+
     def _get_alternative_actions(self, actions: List[str]) -> List[Dict]:
         """Get alternative actions for given actions"""
         if not actions:
             return []
 
-        cypher = """
-        MATCH (a:Action)-[r:ALTERNATIVE_TO]->(alt:Action)
-        WHERE a.name IN $actions
-        RETURN alt.name as action, r.reason as reason
-        """
-
-        results = self.connector.execute_query(cypher, {"actions": actions})
+        results = self.queries.run("alternative_actions", {"actions": actions})
 
         return [
             {"action": r["action"], "reason": r.get("reason", "")}
             for r in results
         ]
 
+    def _ranking_scores(self, context: List[Dict], similarities: List[float], query_lower: str,
+                        intent: str, query_entities: Dict) -> Dict[str, List[float]]:
+        """Boosts and final score of each context item (see ranking_features.score_candidates)"""
+        if getattr(config, 'USE_FAQ_RECORD_CACHE', True):
+            self.ranking_features.ensure_fresh()
+        features = [
+            self.ranking_features.get(
+                result.get("question", ""),
+                result.get("answer", ""),
+                result.get("related_entities", {}).get("topics", [])
+            )
+            for result in context
+        ]
+        base_scores = [result.get("relevance_score", 0.5) for result in context]
+        return score_candidates(
+            features, base_scores, similarities, intent, ranking_query(query_lower, query_entities)
+        )
+
+    def _prune_candidates(self, relevant_nodes: List[Dict], query_entities: Dict, user_query: str,
+                          intent: str, keep_rank: int):
+        """
+        Drop candidates that cannot reach the top keep_rank results, before
+        their graph context is fetched
+
+        Retrieval score, question similarity and topics are known before
+        expansion, so each candidate's final ranking score is bounded (see
+        ranking_features.candidate_bounds). A candidate is pruned only when at
+        least keep_rank others are guaranteed to outscore it, so the ranked
+        top keep_rank is the same as without pruning.
+
+        Args:
+            relevant_nodes: Candidates ({node_id, score})
+            query_entities: Entities from query
+            user_query: User query
+            intent: Query intent
+            keep_rank: Number of top results that must not change
+
+        Returns:
+            (kept nodes, pruned nodes); nothing is pruned unless every
+            candidate is in the FAQ record cache
+        """
+        if not self._faq_records_ready():
+            return relevant_nodes, []
+        question_topics, missing = self.faq_records.question_topics([n["node_id"] for n in relevant_nodes])
+        if missing:
+            return relevant_nodes, []
+        self.ranking_features.ensure_fresh()
+
+        ctx = get_query_context(user_query)
+        similarities, features = [], []
+        for node in relevant_nodes:
+            question, topics = question_topics[node["node_id"]]
+            similarities.append(ctx.ratio(question.lower()))
+            features.append(self.ranking_features.get(question, "", topics))
+
+        base_scores = early_boosted_scores([n["score"] for n in relevant_nodes], similarities)
+        lower, upper = candidate_bounds(
+            features, base_scores, similarities, intent, ranking_query(ctx.query_lower, query_entities or {})
+        )
+        keep = prune_mask(lower, upper, keep_rank)
+
+        kept = [node for node, k in zip(relevant_nodes, keep) if k]
+        pruned = [node for node, k in zip(relevant_nodes, keep) if not k]
+
+        with self._pruning_lock:
+            self._pruning_stats["queries"] += 1
+            self._pruning_stats["candidates"] += len(relevant_nodes)
+            self._pruning_stats["pruned"] += len(pruned)
+
+        if pruned:
+            logger.info(f"✂️ Adaptive pruning: kept {len(kept)}/{len(relevant_nodes)} candidates "
+                       f"(top-{keep_rank} floor {np.sort(lower)[-keep_rank]:.3f}, "
+                       f"best pruned ceiling {upper[~keep].max():.3f})")
+        return kept, pruned
+
+    def _verify_pruning(self, pruned_nodes: List[Dict], ranked_context: List[Dict], keep_rank: int,
+                        query_entities: Dict, user_query: str, intent: str):
+        """
+        Expand and score the pruned candidates too (ADAPTIVE_PRUNING_VERIFY),
+        and count any that would have reached the top keep_rank results
+
+        Args:
+            pruned_nodes: Candidates dropped by _prune_candidates
+            ranked_context: Context items after _rank_results (sorted, final scores)
+            keep_rank: Number of top results pruning must not change
+            query_entities: Entities from query
+            user_query: User query
+            intent: Query intent
+        """
+        pruned_context = self._get_graph_context(pruned_nodes, query_entities, user_query, intent)
+        if not pruned_context:
+            return
+
+        ctx = get_query_context(user_query)
+        similarities = [ctx.ratio(result.get("question", "").lower()) for result in pruned_context]
+        finals = self._ranking_scores(pruned_context, similarities, ctx.query_lower, intent, query_entities or {})["final"]
+
+        cutoff = ranked_context[keep_rank - 1]["relevance_score"] if len(ranked_context) >= keep_rank else float("-inf")
+        mismatches = [
+            (result["question_id"], final)
+            for result, final in zip(pruned_context, finals) if final >= cutoff
+        ]
+
+        with self._pruning_lock:
+            self._pruning_stats["verified"] += len(pruned_context)
+            self._pruning_stats["mismatches"] += len(mismatches)
+
+        if mismatches:
+            logger.warning(f"⚠️ Adaptive pruning dropped {len(mismatches)} candidate(s) scoring above the "
+                          f"top-{keep_rank} cutoff {cutoff:.3f}: {mismatches}")
+        else:
+            logger.info(f"✅ Adaptive pruning verified: {len(pruned_context)} pruned candidates all below "
+                       f"top-{keep_rank} cutoff {cutoff:.3f}")
+
     def _rank_results(self, context: List[Dict], query: str, intent: str = "GENERAL", query_entities: Dict = None) -> Dict:
         """
         Rank and format results with INTENT-AWARE and ERROR-AWARE scoring
@@ -2075,257 +2257,40 @@ class Neo4jGraphRAGEngine:
             query_entities = {}
 
         # STEP 1: Apply intent-based, topic-based, and error-based boosting
-        query_lower = query.lower()
-        has_errors = bool(query_entities.get("Error", []))
-        query_topics = query_entities.get("Topic", [])
+        # FAQ-side features come from the feature store (precomputed per graph
+        # version); only query-side features are computed here
+        ctx = get_query_context(query)
+        query_lower = ctx.query_lower
 
+        similarities = []
         for result in context:
-            answer_lower = result.get("answer", "").lower()
-            question_lower = result.get("question", "").lower()
-            faq_topics = result.get("related_entities", {}).get("topics", [])
-
-            # Base score
-            base_score = result.get("relevance_score", 0.5)
+            similarity = ctx.ratio(result.get("question", "").lower())
+            similarities.append(similarity)
 
             # BOOST 0: EXACT QUESTION MATCHING (Highest priority)
-            from difflib import SequenceMatcher
-            exact_match_boost = 0.0
-            similarity = SequenceMatcher(None, query_lower, question_lower).ratio()
-
             if similarity > 0.95:  # 95%+ similarity - NEAR PERFECT MATCH
-                exact_match_boost = 5.0  # DOMINANT boost - this FAQ is almost certainly correct
                 logger.info(f"🎯 NEAR-PERFECT match ({similarity:.2%}): {result.get('question', '')[:80]}")
             elif similarity > 0.9:  # 90%+ similarity
-                exact_match_boost = 2.0  # STRONG boost for exact match
                 logger.info(f"Exact match found ({similarity:.2%}): {result.get('question', '')[:80]}")
             elif similarity > 0.75:  # 75-90% similarity
-                exact_match_boost = 0.5  # MODERATE boost for very similar
                 logger.info(f"High similarity ({similarity:.2%}): {result.get('question', '')[:80]}")
 
-            # CRITICAL PENALTY: Check for missing CRITICAL keywords that change meaning
-            # e.g., "hủy liên kết" vs "liên kết" are semantically opposite!
-            critical_action_keywords = [
-                ("hủy", ["hủy", "gỡ bỏ", "xóa"]),  # query_keyword -> possible FAQ matches
-                ("gỡ bỏ", ["hủy", "gỡ bỏ", "xóa"]),
-                ("thêm", ["thêm", "tạo", "đăng ký"]),
-                ("tạo", ["thêm", "tạo", "đăng ký"]),
-                ("đổi", ["đổi", "thay đổi", "cập nhật"]),
-                ("mở khóa", ["mở khóa", "unlock"]),
-                ("khóa", ["khóa", "lock"]),
-            ]
-
-            for query_kw, faq_matches in critical_action_keywords:
-                if query_kw in query_lower:
-                    # Query has this critical keyword - check if FAQ has it
-                    if not any(faq_match in question_lower for faq_match in faq_matches):
-                        # FAQ is MISSING the critical keyword - heavy penalty
-                        # This prevents "hủy liên kết" matching "liên kết"
-                        exact_match_boost -= 3.0  # Significant penalty
-                        logger.info(f"⚠️ CRITICAL KEYWORD MISSING: Query has '{query_kw}' but FAQ doesn't - penalty applied")
-                        break
-
-            # BOOST 0.5: TOPIC MATCHING (NEW - prevents wrong topic results)
-            topic_boost = 0.0
-            if query_topics:
-                for q_topic in query_topics:
-                    q_topic_lower = q_topic.lower()
-                    # Exact topic match
-                    if any(q_topic_lower == faq_topic.lower() for faq_topic in faq_topics):
-                        topic_boost += 0.5  # STRONG boost for exact topic match
-                        logger.info(f"✓ TOPIC boost: Exact match '{q_topic}' in FAQ")
-                        break
-                    # Check if topic keyword appears in question
-                    elif q_topic_lower in question_lower:
-                        topic_boost += 0.3  # MODERATE boost if topic in question
-                        logger.info(f"✓ TOPIC boost: Found '{q_topic}' in question text")
-                        break
-
-                # PENALTY if query has specific topic but FAQ has DIFFERENT topic
-                if faq_topics and topic_boost == 0.0:
-                    # Check if FAQ topic is contradictory (e.g., "Mở khóa" vs "Hủy")
-                    contradictory_topics = {
-                        "mở khóa": ["hủy", "khóa tài khoản", "đổi mật khẩu"],
-                        "khóa": ["mở khóa", "đổi mật khẩu"],
-                        "hủy": ["mở khóa", "tạo", "đăng ký", "đổi mật khẩu"],
-                        "tạo": ["hủy", "xóa"],
-                        "đăng ký": ["hủy", "xóa"],
-                        "đổi mật khẩu": ["mở khóa", "khóa", "hủy", "quên mật khẩu"],
-                        "quên mật khẩu": ["đổi mật khẩu"]
-                    }
-                    for q_topic in query_topics:
-                        q_topic_lower = q_topic.lower()
-                        for q_key, contradictory_list in contradictory_topics.items():
-                            if q_key in q_topic_lower:
-                                for faq_topic in faq_topics:
-                                    if any(contra in faq_topic.lower() for contra in contradictory_list):
-                                        topic_boost -= 0.8  # HEAVY PENALTY for contradictory topic
-                                        logger.info(f"⚠️ TOPIC penalty: FAQ about '{faq_topic}' contradicts query topic '{q_topic}'")
-                                        break
-
-            # BOOST 1: Intent-specific boosting
-            intent_boost = 0.0
-
-            if intent == "TROUBLESHOOT":
-                # Boost answers containing troubleshooting keywords
-                troubleshoot_keywords = [
-                    "kiểm tra trạng thái", "trạng thái giao dịch",
-                    "chưa nhận được", "phải làm", "hãy làm theo",
-                    "sao kê", "liên hệ", "hỗ trợ", "khắc phục"
-                ]
-                for keyword in troubleshoot_keywords:
-                    if keyword in answer_lower or keyword in question_lower:
-                        intent_boost += 0.15
-
-                # MAJOR BOOST if question mentions problem
-                if "chưa" in question_lower or "không" in question_lower or "lỗi" in question_lower:
-                    intent_boost += 0.3
-
-            elif intent == "FEE":
-                # BOOST for FAQs about fees/costs
-                fee_keywords = [
-                    "phí", "miễn phí", "chi phí", "mất phí", "có phí", "không phí",
-                    "biểu phí", "bảng phí", "phí dịch vụ", "chính sách phí"
-                ]
-                for keyword in fee_keywords:
-                    if keyword in question_lower:
-                        intent_boost += 0.5  # STRONG boost for fee in question
-                        logger.info(f"✓ FEE boost: Found '{keyword}' in question")
-                        break
-                    elif keyword in answer_lower:
-                        intent_boost += 0.25  # Moderate boost for fee in answer
-                        logger.info(f"✓ FEE boost: Found '{keyword}' in answer")
-                        break
-
-            elif intent == "LIMIT":
-                # BOOST for FAQs about limits
-                limit_keywords = [
-                    "hạn mức", "tối đa", "tối thiểu", "giới hạn", "limit",
-                    "số tiền tối đa", "số lượng tối đa", "vượt quá", "quá hạn mức"
-                ]
-                for keyword in limit_keywords:
-                    if keyword in question_lower:
-                        intent_boost += 0.5  # STRONG boost for limit in question
-                        logger.info(f"✓ LIMIT boost: Found '{keyword}' in question")
-                        break
-                    elif keyword in answer_lower:
-                        intent_boost += 0.25  # Moderate boost for limit in answer
-                        logger.info(f"✓ LIMIT boost: Found '{keyword}' in answer")
-                        break
-
-            elif intent == "TIME":
-                # BOOST for FAQs about time/duration
-                time_keywords = [
-                    "bao lâu", "thời gian", "ngay lập tức", "real-time",
-                    "ngày làm việc", "trong vòng", "sau khi", "mấy ngày",
-                    "khi nào", "hoàn tiền", "hoàn trả"
-                ]
-                for keyword in time_keywords:
-                    if keyword in question_lower:
-                        intent_boost += 0.5  # STRONG boost for time in question
-                        logger.info(f"✓ TIME boost: Found '{keyword}' in question")
-                        break
-                    elif keyword in answer_lower:
-                        intent_boost += 0.25  # Moderate boost for time in answer
-                        logger.info(f"✓ TIME boost: Found '{keyword}' in answer")
-                        break
-
-            elif intent == "HOW_TO":
-                # CRITICAL: Check for troubleshooting signals FIRST (in QUESTION - highest priority)
-                import re
-                troubleshoot_signals_question = [
-                    "bị lỗi", "báo lỗi", "gặp lỗi", "lỗi", "thất bại", "không thành công",
-                    "chưa nhận được", "bị trừ", "tại sao", "sao lại", "giao dịch thất bại",
-                    "không được", "không thể", "bị từ chối"
-                ]
-                # Also check for "báo" + error message patterns
-                error_message_patterns = [
-                    r'báo\s+"[^"]*(?:lỗi|không\s+hợp\s+lệ|thất\s+bại)',  # "báo "lỗi..." or "báo "không hợp lệ..."
-                    r'báo\s+lỗi',  # "báo lỗi"
-                    r'báo\s+không',  # "báo không..."
-                ]
-
-                is_troubleshoot_faq = False
-                # Check text signals
-                for signal in troubleshoot_signals_question:
-                    if signal in question_lower:
-                        is_troubleshoot_faq = True
-                        logger.info(f"⚠️ HOW_TO STRONG penalty: Question contains troubleshooting signal '{signal}'")
-                        break
-
-                # Check regex patterns for error messages
-                if not is_troubleshoot_faq:
-                    for pattern in error_message_patterns:
-                        if re.search(pattern, question_lower):
-                            is_troubleshoot_faq = True
-                            logger.info(f"⚠️ HOW_TO STRONG penalty: Question contains error message pattern")
-                            break
-
-                # If question is about troubleshooting, apply HEAVY penalty immediately
-                if is_troubleshoot_faq:
-                    intent_boost -= 1.5  # VERY HEAVY penalty for troubleshooting FAQs in HOW_TO queries (increased from 1.2)
-                else:
-                    # Only then check for instructional content
-
-                    # CRITICAL: Detect procedural content with numbered steps (HIGHEST priority)
-                    # Look for patterns like "Bước 1:", "Step 1:", "1.", "2)", etc.
-                    step_patterns = [
-                        r'bước\s+\d+[:\.\)]',  # "Bước 1:", "Bước 2."
-                        r'step\s+\d+[:\.\)]',   # "Step 1:", "Step 2)"
-                        r'^\d+[\.\)]',          # "1.", "2)" at start of line
-                    ]
-                    has_steps = False
-                    for pattern in step_patterns:
-                        if re.search(pattern, answer_lower, re.MULTILINE | re.IGNORECASE):
-                            has_steps = True
-                            break
-
-                    if has_steps:
-                        intent_boost += 2.5  # EXTREME boost for step-by-step instructions to overcome aggregation filtering
-                        logger.info(f"✓ HOW_TO PROCEDURAL boost: FAQ contains numbered steps")
-
-                    # STRONG BOOST for instructional signals (but lower priority than procedural)
-                    how_to_signals = [
-                        "làm thế nào", "như thế nào", "cách", "hướng dẫn",
-                        "bước", "step", "để thực hiện", "quy trình", "thủ tục"
-                    ]
-                    for signal in how_to_signals:
-                        if signal in question_lower or signal in answer_lower:
-                            intent_boost += 0.3  # Moderate boost for how-to keywords
-                            logger.info(f"✓ HOW_TO boost: Found '{signal}' in instructional FAQ")
-                            break
-
-            # BOOST 2: Error-specific boosting
-            error_boost = 0.0
-            if has_errors:
-                detected_errors = query_entities.get("Error", [])
-                for error in detected_errors:
-                    error_lower = error.lower()
-                    # Check if answer addresses this specific error
-                    if error_lower in answer_lower or error_lower in question_lower:
-                        error_boost += 0.25
-
-            # BOOST 3: Keyword overlap with query (for better matching)
-            keyword_boost = 0.0
-            query_keywords = set(query_lower.split())
-            answer_keywords = set(answer_lower.split())
-            overlap = len(query_keywords & answer_keywords)
-            keyword_boost = min(overlap * 0.02, 0.2)  # Cap at 0.2
-
-            # Calculate final score (EXACT MATCH gets highest priority)
-            # RE-ENABLED intent_boost for FEE, LIMIT, TIME intents
-            final_score = base_score + exact_match_boost + topic_boost + intent_boost + error_boost + keyword_boost
-
-            # Update result
-            result["relevance_score"] = final_score
-            result["score_breakdown"] = {
-                "base": base_score,
-                "exact_match_boost": exact_match_boost,
-                "topic_boost": topic_boost,
-                "intent_boost": intent_boost,
-                "error_boost": error_boost,
-                "keyword_boost": keyword_boost,
-                "final": final_score
-            }
+        if context:
+            base_scores = [result.get("relevance_score", 0.5) for result in context]
+            scores = self._ranking_scores(context, similarities, query_lower, intent, query_entities)
+
+            for i, result in enumerate(context):
+                # Update result
+                result["relevance_score"] = scores["final"][i]
+                result["score_breakdown"] = {
+                    "base": base_scores[i],
+                    "exact_match_boost": scores["exact_match_boost"][i],
+                    "topic_boost": scores["topic_boost"][i],
+                    "intent_boost": scores["intent_boost"][i],
+                    "error_boost": scores["error_boost"][i],
+                    "keyword_boost": scores["keyword_boost"][i],
+                    "final": scores["final"][i]
+                }
 
         # Sort by final relevance score
         context.sort(key=lambda x: x["relevance_score"], reverse=True)
@@ -2411,14 +2376,16 @@ class Neo4jGraphRAGEngine:
                             merged_entities[key] = value
 
                 # Use 3-Layer Focused Extractor (Entity → Case → LLM)
-                focused_result = self.focused_extractor.extract_focused_answer(
-                    user_query=query,
-                    faq_answer=final_answer,
-                    faq_question=top_result["question"],
-                    intent=intent,
-                    entities=merged_entities,
-                    graph_entities=graph_entities
-                )
+                with tracing.span("focused_extraction", intent=intent) as span:
+                    focused_result = self.focused_extractor.extract_focused_answer(
+                        user_query=query,
+                        faq_answer=final_answer,
+                        faq_question=top_result["question"],
+                        intent=intent,
+                        entities=merged_entities,
+                        graph_entities=graph_entities
+                    )
+                    span.set(source=focused_result.source.value, confidence=round(focused_result.confidence, 3))
 
                 # Check if extraction improved the answer
                 if focused_result.confidence >= 0.6:
@@ -2531,7 +2498,8 @@ class Neo4jGraphRAGEngine:
                 "fallback_message": str  # Message to show user
             }
         """
-        query_lower = query.lower()
+        normalized = normalize_query(query)
+        query_lower = normalized.lower
         faq_question_lower = faq_question.lower()
         faq_answer_lower = faq_answer.lower()
         combined_faq = faq_question_lower + " " + faq_answer_lower
@@ -2644,16 +2612,12 @@ class Neo4jGraphRAGEngine:
         # =====================================================
         # CHECK 3: Very low similarity between query and FAQ question
         # =====================================================
-        from difflib import SequenceMatcher
-        similarity = SequenceMatcher(None, query_lower, faq_question_lower).ratio()
+        similarity = get_query_context(query).ratio(faq_question_lower, query_form=query_lower)
 
         # If similarity is extremely low AND FAQ doesn't contain key query terms
         if similarity < 0.25:
             # Extract key terms from query (excluding stopwords)
-            stopwords = {'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
-                        'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
-                        'của', 'cho', 'với', 'từ', 'đến', 'trong', 'bao', 'nhiêu', 'ở', 'đâu'}
-            query_terms = [w for w in query_lower.split() if w not in stopwords and len(w) > 2]
+            query_terms = [w for w in normalized.tokens if w not in RELEVANCE_STOPWORDS and len(w) > 2]
 
             # Check how many query terms appear in FAQ
             terms_found = sum(1 for term in query_terms if term in combined_faq)
@@ -2701,81 +2665,27 @@ class Neo4jGraphRAGEngine:
             } or None
         """
         try:
-            # Build WHERE clause based on only_next_step
             if only_next_step:
-                where_clause = "WHERE s.number = $from_step"
                 logger.info(f"   Query mode: SINGLE STEP (step {from_step})")
             else:
-                where_clause = "WHERE s.number >= $from_step"
                 logger.info(f"   Query mode: ALL REMAINING STEPS (from step {from_step})")
 
-            # CRITICAL: Query BOTH the requested steps AND the total count
-            # CRITICAL FIX: Use faq_id (not question_id) to match Neo4j schema
-            cypher = f"""
-            MATCH (faq:FAQ {{id: $faq_id}})-[:DESCRIBES_PROCESS]->(p:Process)
-            MATCH (p)-[:HAS_STEP]->(all_s:Step)
-            WITH faq, p, count(all_s) as total_count
-            MATCH (p)-[:HAS_STEP]->(s:Step)
-            {where_clause}
-            RETURN faq.question as faq_question,
-                   faq.answer as faq_answer,
-                   p.name as process_name,
-                   p.id as process_id,
-                   s.number as step_num,
-                   s.text as step_text,
-                   total_count as total_steps_in_process
-            ORDER BY s.number
-            """
-            params = {"faq_id": faq_id, "from_step": from_step}
-
-            results = self.connector.execute_query(cypher, params)
-
-            if not results:
-                logger.warning(f"No steps found for FAQ ID: {faq_id}")
-
-                # FALLBACK 1: Try to get total count for this FAQ_ID
-                # CRITICAL FIX: Use faq_id (not question_id) to match Neo4j schema
-                count_cypher = """
-                MATCH (faq:FAQ {id: $faq_id})-[:DESCRIBES_PROCESS]->(p:Process)
-                MATCH (p)-[:HAS_STEP]->(s:Step)
-                RETURN count(s) as total_count
-                """
-                count_result = self.connector.execute_query(count_cypher, {"faq_id": faq_id})
-                if count_result and count_result[0]['total_count'] > 0:
-                    # Process exists but requested step doesn't exist (beyond last step)
-                    logger.info(f"✅ Process has {count_result[0]['total_count']} steps total, step {from_step} not found (user completed all)")
-                    return {
-                        "steps": [],
-                        "total_steps": 0,  # No more steps to show
-                        "total_steps_in_process": count_result[0]['total_count']  # But process has this many total
-                    }
+            # Ordered step arrays of the FAQ's processes (memory, else one Neo4j read)
+            process_steps = self._get_process_steps(faq_id)
+            result = process_steps.result(from_step, only_next_step) if process_steps is not None else None
 
-                # FALLBACK 2: FAQ_ID not in graph (question_id is None)
+            if result is None:
+                # FAQ_ID not in graph or no process steps (question_id is None)
                 # Try to infer process from FAQ_ID pattern or topic
-                logger.warning(f"FAQ_ID '{faq_id}' not found in graph, trying pattern-based fallback")
+                logger.warning(f"No steps found for FAQ ID '{faq_id}', trying pattern-based fallback")
                 return self._query_steps_by_faq_id_fallback(faq_id, from_step, only_next_step, topic)
 
-            # Build result
-            first_row = results[0]
-            total_steps_in_process = first_row['total_steps_in_process']
-
-            result = {
-                "faq_question": first_row['faq_question'],
-                "faq_answer": first_row['faq_answer'],
-                "process_name": first_row['process_name'],
-                "process_id": first_row['process_id'],
-                "steps": [],
-                "direction_score": 10,  # Perfect match since we're using exact FAQ ID
-                "total_steps_in_process": total_steps_in_process  # CRITICAL: Total steps in the whole process
-            }
-
-            for row in results:
-                result["steps"].append({
-                    "number": row['step_num'],
-                    "text": row['step_text']
-                })
+            if not result["steps"]:
+                # Process exists but requested step doesn't exist (beyond last step)
+                logger.info(f"✅ Process has {result['total_steps_in_process']} steps total, step {from_step} not found (user completed all)")
+                return result
 
-            result["total_steps"] = len(result["steps"])  # Number of steps returned in this query
+            result["direction_score"] = 10  # Perfect match since we're using exact FAQ ID
 
             logger.info(f"📊 Query by FAQ ID SUCCESS: Found {result['total_steps']} steps")
             logger.info(f"   FAQ: {result['faq_question'][:60]}...")
@@ -2786,6 +2696,19 @@ class Neo4jGraphRAGEngine:
             logger.error(f"Failed to query steps by FAQ ID: {e}")
             return None
 
+    def _get_process_steps(self, faq_id: str) -> Optional[ProcessSteps]:
+        """
+        Ordered step arrays of an FAQ's processes
+
+        Read from the FAQ record cache when loaded, otherwise from the arrays
+        materialized on the Process nodes (one query, no step traversal).
+        """
+        if self._faq_records_ready():
+            process_steps = self.faq_records.process_steps(faq_id)
+            if process_steps is not None:
+                return process_steps
+        return ProcessSteps.from_rows(self.queries.run("process_steps_by_faq_id", {"faq_id": faq_id}))
+
     def _query_steps_by_faq_id_fallback(
         self,
         faq_id: str,
@@ -2885,75 +2808,28 @@ class Neo4jGraphRAGEngine:
 
             logger.info(f"🔍 Fallback: Inferred process '{process_name}' from FAQ_ID '{faq_id}'")
 
-            # Build WHERE clause with REQUIRED keywords (ALL must match)
-            # and OPTIONAL keywords (at least one should match for better ranking)
-            required_conditions = " AND ".join([f"toLower(faq.question) CONTAINS '{kw}'" for kw in required_keywords])
-
-            # For optional keywords, we'll use them in ORDER BY for ranking
-            # FAQs with more optional keywords will be ranked higher
-
-            # Build WHERE clause for steps
-            if only_next_step:
-                step_where = "WHERE s.number = $from_step"
-            else:
-                step_where = "WHERE s.number >= $from_step"
-
-            # Build optional keyword scoring for ranking
-            # FAQs matching more optional keywords rank higher
-            if optional_keywords:
-                optional_score_expr = " + ".join([
-                    f"CASE WHEN toLower(faq.question) CONTAINS '{kw}' THEN 1 ELSE 0 END"
-                    for kw in optional_keywords
-                ])
-                order_by = f"ORDER BY ({optional_score_expr}) DESC, total_count DESC"
-            else:
-                # If no optional keywords, just prioritize more steps
-                order_by = "ORDER BY total_count DESC"
-
-            # Query by process name + REQUIRED keywords
-            # IMPORTANT: Prioritize FAQs with more optional keywords, then more steps
-            cypher = f"""
-            MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process {{name: $process_name}})
-            WHERE {required_conditions}
-            MATCH (p)-[:HAS_STEP]->(all_s:Step)
-            WITH faq, p, count(all_s) as total_count
-            {order_by}
-            LIMIT 1
-            MATCH (p)-[:HAS_STEP]->(s:Step)
-            {step_where}
-            RETURN faq.question as faq_question,
-                   faq.answer as faq_answer,
-                   p.name as process_name,
-                   p.id as process_id,
-                   s.number as step_num,
-                   s.text as step_text,
-                   total_count as total_steps_in_process
-            ORDER BY s.number
-            """
-
+            # REQUIRED keywords must ALL match the FAQ question; FAQs matching more
+            # OPTIONAL keywords rank higher, then FAQs with more steps
             params = {
                 "process_name": process_name,
-                "from_step": from_step
+                "required_keywords": required_keywords,
+                "optional_keywords": optional_keywords,
+                "from_step": from_step,
+                "only_next_step": only_next_step
             }
 
-            results = self.connector.execute_query(cypher, params)
+            results = self._run_step_query("steps_by_process_name", params)
 
             if not results:
                 logger.warning(f"Fallback query found no results for process '{process_name}'")
 
                 # Try to get total count even if step not found
                 # IMPORTANT: Prioritize FAQs with more optional keywords, then more steps
-                count_cypher = f"""
-                MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process {{name: $process_name}})
-                WHERE {required_conditions}
-                MATCH (p)-[:HAS_STEP]->(s:Step)
-                WITH p, count(s) as step_count
-                {order_by.replace("total_count", "step_count")}
-                LIMIT 1
-                RETURN step_count as total_count
-                """
-
-                count_result = self.connector.execute_query(count_cypher, {"process_name": process_name})
+                count_result = self._run_step_query("step_count_by_process_name", {
+                    "process_name": process_name,
+                    "required_keywords": required_keywords,
+                    "optional_keywords": optional_keywords
+                })
                 if count_result and count_result[0]['total_count'] > 0:
                     logger.info(f"✅ Fallback: Process has {count_result[0]['total_count']} steps total, step {from_step} not found")
                     return {
@@ -3042,7 +2918,7 @@ class Neo4jGraphRAGEngine:
 
             if main_phrase:
                 # Use EXACT phrase matching for better accuracy
-                keyword_conditions = f"toLower(faq.question) CONTAINS '{main_phrase}'"
+                keywords = [main_phrase]
                 logger.info(f"   Using phrase match: '{main_phrase}'")
             else:
                 # Fallback: use individual keywords
@@ -3050,7 +2926,6 @@ class Neo4jGraphRAGEngine:
                 if not keywords:
                     logger.warning("No valid keywords in base query")
                     return None
-                keyword_conditions = " OR ".join([f"toLower(faq.question) CONTAINS '{kw}'" for kw in keywords])
                 logger.info(f"   Using keyword match: {keywords}")
 
             # Detect direction from query
@@ -3061,32 +2936,14 @@ class Neo4jGraphRAGEngine:
 
             logger.info(f"   Direction detection: from_wallet={from_wallet}, to_bank={to_bank}, from_bank={from_bank}, to_wallet={to_wallet}")
 
-            # Build step filter based on only_next_step
             if only_next_step:
-                step_filter = "WHERE s.number = $from_step"
                 logger.info(f"   Query mode: SINGLE STEP (step {from_step})")
             else:
-                step_filter = "WHERE s.number >= $from_step"
                 logger.info(f"   Query mode: ALL REMAINING STEPS (from step {from_step})")
 
-            cypher = f"""
-            MATCH (faq:FAQ)-[:DESCRIBES_PROCESS]->(p:Process)
-            WHERE {keyword_conditions}
-            MATCH (p)-[:HAS_STEP]->(s:Step)
-            {step_filter}
-            RETURN faq.question as faq_question,
-                   faq.answer as faq_answer,
-                   p.name as process_name,
-                   p.id as process_id,
-                   s.number as step_num,
-                   s.text as step_text,
-                   toLower(faq.question) as faq_lower
-            ORDER BY p.id, s.number
-            LIMIT 50
-            """
-            params = {"from_step": from_step}
-
-            results = self.connector.execute_query(cypher, params)
+            params = {"keywords": keywords, "from_step": from_step, "only_next_step": only_next_step}
+
+            results = self._run_step_query("steps_by_question_keywords", params)
 
             if not results:
                 logger.warning(f"No steps found in graph")
@@ -3290,20 +3147,9 @@ class Neo4jGraphRAGEngine:
         """
         try:
             # Query the FAQ and its cases
-            cypher = """
-            MATCH (f:FAQ {id: $faq_id})
-            OPTIONAL MATCH (f)-[:HAS_CASE]->(c:Case)
-            OPTIONAL MATCH (c)-[:HAS_STEP]->(s:Step)
-            RETURN f,
-                   collect(DISTINCT {
-                       case_id: c.id,
-                       description: c.description,
-                       condition: c.condition,
-                       steps: collect(DISTINCT {step_num: s.step_number, content: s.content})
-                   }) as cases
-            """
-
-            result = self.connector.query(cypher, {"faq_id": faq_id})
+            result = self.faq_records.faq_with_cases(faq_id) if self._faq_records_ready() else None
+            if result is None:
+                result = self.queries.run("faq_with_cases", {"faq_id": faq_id})
 
             if not result:
                 return None
@@ -3741,13 +3587,37 @@ Nếu bạn vẫn gặp vấn đề hoặc cần hỗ trợ thêm, vui lòng li
 
         return response
 
+    def get_query_stats(self) -> List[Dict]:
+        """Get per-query Cypher statistics (calls, latency percentiles, rows)"""
+        return self.queries.get_stats()
+
+    def get_cache_stats(self) -> Dict:
+        """Get result cache counters (hits, misses, evictions, size), plus the disk tier"""
+        stats = self.result_cache.stats()
+        disk_cache = get_disk_cache()
+        if disk_cache is not None:
+            stats["disk"] = disk_cache.stats()
+        return stats
+
+    def get_pruning_stats(self) -> Dict:
+        """Get adaptive pruning counters (queries, candidates, pruned, verified, mismatches)"""
+        with self._pruning_lock:
+            stats = dict(self._pruning_stats)
+        stats["pruned_ratio"] = stats["pruned"] / stats["candidates"] if stats["candidates"] else 0.0
+        return stats
+
     def clear_cache(self):
         """Clear query cache"""
-        self.cache = {}
+        self.result_cache.clear()
+        disk_cache = get_disk_cache()
+        if disk_cache is not None:
+            disk_cache.clear("engine_result")
         logger.info("Cache cleared")
 
     def close(self):
         """Close Neo4j connection"""
+        if self._stage_executor is not None:
+            self._stage_executor.shutdown(wait=False)
         self.connector.close()
 
 
@@ -0,0 +1,244 @@
+"""
+Query Normalization
+One normalization pass per user turn, shared by the intent classifier, entity
+extractor, retrieval stages, follow-up detector and chitchat check
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Union
+
+# =====================================================
+# Vietnamese No-Diacritics to Diacritics Mapping
+# For handling queries without Vietnamese accents
+# =====================================================
+VIETNAMESE_NO_DIACRITICS_MAP = {
+    # Common words in VNPT Money domain
+    'nap': 'nạp', 'tien': 'tiền', 'vi': 'ví', 'vao': 'vào',
+    'rut': 'rút', 've': 'về', 'chuyen': 'chuyển', 'den': 'đến',
+    'phi': 'phí', 'bao': 'bao', 'nhieu': 'nhiêu', 'lau': 'lâu',
+    'ngan': 'ngân', 'hang': 'hàng', 'lien': 'liên', 'ket': 'kết',
+    'tai': 'tài', 'khoan': 'khoản', 'mat': 'mật', 'khau': 'khẩu',
+    'dang': 'đăng', 'ky': 'ký', 'doi': 'đổi', 'quen': 'quên',
+    'han': 'hạn', 'muc': 'mức', 'thoi': 'thời', 'gian': 'gian',
+    'giao': 'giao', 'dich': 'dịch', 'that': 'thất', 'bai': 'bại',
+    'loi': 'lỗi', 'thanh': 'thanh', 'toan': 'toán', 'hoa': 'hóa',
+    'don': 'đơn', 'dien': 'điện', 'nuoc': 'nước', 'internet': 'internet',
+    'dinh': 'định', 'danh': 'danh', 'xac': 'xác', 'thuc': 'thực',
+    'cccd': 'cccd', 'cmnd': 'cmnd', 'otp': 'otp',
+    'huong': 'hướng', 'dan': 'dẫn', 'cach': 'cách', 'lam': 'làm',
+    'sao': 'sao', 'the': 'thế', 'nao': 'nào', 'gi': 'gì',
+    've': 'vé', 'may': 'máy', 'bay': 'bay', 'tau': 'tàu',
+    'mua': 'mua', 'dat': 'đặt', 'dang': 'đăng',
+    'so': 'số', 'du': 'dư', 'toi': 'tối', 'da': 'đa', 'thieu': 'thiểu',
+    'hotline': 'hotline', 'tong': 'tổng', 'dai': 'đài',
+    'khoa': 'khóa', 'mo': 'mở', 'huy': 'hủy',
+    'voucher': 'voucher', 'ma': 'mã', 'giam': 'giảm', 'gia': 'giá',
+    'khuyen': 'khuyến', 'mai': 'mãi', 'tich': 'tích', 'diem': 'điểm',
+    'bao': 'bảo', 'mat': 'mật', 'an': 'an', 'toan': 'toàn',
+    'van': 'vân', 'tay': 'tay', 'khuon': 'khuôn', 'mat': 'mặt',
+    'sinh': 'sinh', 'trac': 'trắc', 'hoc': 'học',
+    'tra': 'tra', 'cuu': 'cứu', 'lich': 'lịch', 'su': 'sử',
+    'vnpt': 'vnpt', 'money': 'money', 'app': 'app', 'ung': 'ứng', 'dung': 'dụng',
+    'tru': 'trừ', 'cong': 'cộng', 'hoan': 'hoàn',
+    'dieu': 'điều', 'kien': 'kiện', 'yeu': 'yêu', 'cau': 'cầu',
+    'thu': 'thụ', 'huong': 'hưởng', 'nguoi': 'người', 'nhan': 'nhận',
+    'gui': 'gửi', 'nham': 'nhầm', 'hoi': 'hỏi', 'dap': 'đáp',
+    'tro': 'trợ', 'giup': 'giúp', 'ho': 'hỗ',
+}
+
+# =====================================================
+# Stopword sets (one per consumer, kept as before)
+# =====================================================
+
+# Entity result verification (query vs FAQ question term overlap)
+VERIFY_STOPWORDS = frozenset({
+    'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
+    'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
+    'của', 'cho', 'với', 'từ', 'đến', 'trong', 'bao', 'nhiêu', 'ở', 'đâu',
+    'mà', 'khi', 'nếu', 'thì', 'vì', 'do', 'bởi', 'nhưng', 'còn', 'vẫn'
+})
+
+# Keyword search terms
+KEYWORD_STOPWORDS = frozenset({
+    'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
+    'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
+    'của', 'cho', 'với', 'từ', 'đến', 'trong', 'ngoài', 'trên', 'dưới',
+    'khi', 'nếu', 'thì', 'mà', 'vì', 'do', 'bởi', 'nhưng', 'còn', 'vẫn',
+    'đang', 'sẽ', 'đã', 'rồi', 'chưa', 'không', 'có thể', 'phải', 'những'
+})
+
+# Specific-entity relevance check (query term coverage in the FAQ)
+RELEVANCE_STOPWORDS = frozenset({
+    'tôi', 'bạn', 'là', 'có', 'thể', 'được', 'để', 'và', 'hoặc', 'hay',
+    'này', 'đó', 'như', 'thế', 'nào', 'gì', 'sao', 'làm', 'muốn', 'cần',
+    'của', 'cho', 'với', 'từ', 'đến', 'trong', 'bao', 'nhiêu', 'ở', 'đâu'
+})
+
+# =====================================================
+# Domain compound terms
+# =====================================================
+
+# Compounds used by keyword search
+KEYWORD_COMPOUNDS = (
+    'gói cước', 'data 3g', 'data 4g', '3g/4g', 'mobile money', 'vnpt money',
+    'vnpt pay', 'rút tiền', 'nạp tiền', 'chuyển tiền', 'liên kết', 'ngân hàng',
+    'biểu phí', 'hạn mức', 'thời gian', 'hotline', 'tổng đài', 'nhà mạng'
+)
+
+# Multi-word patterns used by entity result verification (specific, to avoid false positives)
+VERIFY_COMPOUNDS = (
+    'liên kết ngân hàng', 'liên kết tài khoản', 'liên kết bank',
+    'nạp tiền vào ví', 'nạp tiền từ',
+    'rút tiền về', 'rút tiền từ ví',
+    'chuyển tiền đến', 'chuyển tiền cho', 'chuyển tiền qua',
+    'đăng ký tài khoản', 'đăng ký ví', 'tạo tài khoản',
+    'đổi mật khẩu', 'thay đổi mật khẩu', 'quên mật khẩu', 'lấy lại mật khẩu',
+    'vé máy bay', 'mua vé', 'đặt vé',
+    'thanh toán hóa đơn', 'thanh toán tiền điện', 'thanh toán tiền nước',
+    'định danh tài khoản', 'xác thực định danh',
+    'khóa tài khoản', 'mở khóa tài khoản'
+)
+
+DOMAIN_COMPOUNDS = tuple(dict.fromkeys(KEYWORD_COMPOUNDS + VERIFY_COMPOUNDS))
+
+_VIETNAMESE_CHARS = 'àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ'
+
+
+def convert_no_diacritics_to_vietnamese(text: str) -> str:
+    """
+    Convert Vietnamese text without diacritics to text with diacritics.
+    Uses word-by-word mapping for common VNPT Money domain terms.
+
+    Example: "cach nap tien vao vi" -> "cách nạp tiền vào ví"
+    """
+    if not text:
+        return text
+
+    # Check if text likely has no diacritics (no Vietnamese characters)
+    has_vietnamese = any(c in text.lower() for c in _VIETNAMESE_CHARS)
+
+    if has_vietnamese:
+        # Already has Vietnamese diacritics, return as is
+        return text
+
+    # Convert word by word
+    words = text.lower().split()
+    converted_words = []
+
+    for word in words:
+        # Clean word (remove punctuation at end)
+        clean_word = re.sub(r'[?.!,;:]$', '', word)
+        suffix = word[len(clean_word):]  # Keep punctuation
+
+        # Look up in mapping
+        if clean_word in VIETNAMESE_NO_DIACRITICS_MAP:
+            converted_words.append(VIETNAMESE_NO_DIACRITICS_MAP[clean_word] + suffix)
+        else:
+            converted_words.append(word)
+
+    return ' '.join(converted_words)
+
+
+def strip_accents(text: str) -> str:
+    """Remove Vietnamese diacritics ("đ" → "d")"""
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+@dataclass(frozen=True)
+class NormalizedQuery:
+    """
+    Every normalized form of one user message
+
+    Built once per turn by normalize_query(); instances are immutable and
+    can be shared across threads and pipeline stages.
+
+    Attributes:
+        raw: Message as typed
+        text: NFC, diacritics restored (convert_no_diacritics_to_vietnamese)
+        lower: text lowercased
+        stripped: lower without surrounding whitespace
+        folded: stripped without diacritics
+        tokens: Whitespace tokens of lower
+        words: Word-character runs of stripped (punctuation dropped)
+        compounds: DOMAIN_COMPOUNDS contained in lower
+    """
+    raw: str
+    text: str
+    lower: str
+    stripped: str
+    folded: str
+    tokens: Tuple[str, ...]
+    words: Tuple[str, ...]
+    compounds: FrozenSet[str]
+    _term_sets: Dict = field(default_factory=dict, compare=False, repr=False)
+
+    def terms(self, stopwords: FrozenSet[str], min_len: int = 1) -> FrozenSet[str]:
+        """
+        Whitespace tokens that are not stopwords and longer than min_len (memoized)
+
+        Args:
+            stopwords: Stopword set (module-level constant, memoized by identity)
+            min_len: Keep tokens with len(token) > min_len
+        """
+        key = (id(stopwords), min_len)
+        value = self._term_sets.get(key)
+        if value is None:
+            value = frozenset(t for t in self.tokens if t not in stopwords and len(t) > min_len)
+            self._term_sets[key] = value
+        return value
+
+    def keywords(self, stopwords: FrozenSet[str], min_len: int = 1) -> List[str]:
+        """Words (punctuation dropped) that are not stopwords and longer than min_len, in query order"""
+        return [w for w in self.words if w not in stopwords and len(w) > min_len]
+
+    def compounds_in(self, vocabulary: Iterable[str]) -> List[str]:
+        """Terms of a DOMAIN_COMPOUNDS subset that occur in the query, in vocabulary order"""
+        return [term for term in vocabulary if term in self.compounds]
+
+
+@lru_cache(maxsize=1024)
+def _normalize(raw: str) -> NormalizedQuery:
+    text = convert_no_diacritics_to_vietnamese(unicodedata.normalize('NFC', raw))
+    lower = text.lower()
+    stripped = lower.strip()
+    return NormalizedQuery(
+        raw=raw,
+        text=text,
+        lower=lower,
+        stripped=stripped,
+        folded=strip_accents(stripped),
+        tokens=tuple(lower.split()),
+        words=tuple(re.findall(r'[\w]+', stripped)),
+        compounds=frozenset(term for term in DOMAIN_COMPOUNDS if term in lower),
+    )
+
+
+def normalize_query(query: Union[str, NormalizedQuery]) -> NormalizedQuery:
+    """
+    Normalize a user message (no-op for an already normalized query)
+
+    Results are memoized per message, so components that still receive
+    the plain string share the same instance.
+    """
+    if isinstance(query, NormalizedQuery):
+        return query
+    return _normalize(query or "")
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    for message in ["Cach nap tien vao vi?", "Làm sao để liên kết ngân hàng Vietcombank?", "  Phí rút tiền về ngân hàng  "]:
+        nq = normalize_query(message)
+        print(f"\n{message!r}")
+        print(f"  text:      {nq.text!r}")
+        print(f"  folded:    {nq.folded!r}")
+        print(f"  words:     {nq.words}")
+        print(f"  compounds: {sorted(nq.compounds)}")
+        print(f"  keywords:  {nq.keywords(KEYWORD_STOPWORDS)}")
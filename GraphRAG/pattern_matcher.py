@@ -0,0 +1,458 @@
+"""
+Compiled Pattern Matcher
+Labelled regex lists compiled at load time into one Aho-Corasick automaton, so a
+query is matched against every list in a single scan
+"""
+
+import logging
+import re
+from collections import deque
+from itertools import product
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Whitespace runs are matched on a copy of the text where each run is one space
+_WHITESPACE_RUN = re.compile(r"\s+")
+
+# Patterns expanding to more literal variants than this stay regexes
+MAX_VARIANTS = 64
+
+# Shortest required literal worth gating a regex on
+MIN_ANCHOR_LENGTH = 2
+
+# Expansion tokens besides plain characters
+_WS_PLUS = "\\s+"
+_WS_STAR = "\\s*"
+_BOUNDARY = "\\b"
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton: all occurrences of a fixed keyword set in one pass"""
+
+    def __init__(self, keywords: Sequence[str]):
+        """
+        Build the automaton
+
+        Args:
+            keywords: Keywords (non-empty); find() reports indexes into this list
+        """
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (index,)
+
+        # Failure links (breadth-first), outputs merged along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (start, keyword index) for every occurrence, overlapping ones included
+        """
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                yield end - len(keywords[index]), index
+
+
+def _is_word(ch: str) -> bool:
+    """Same test as the regex \\w class (Unicode)"""
+    return ch.isalnum() or ch == "_"
+
+
+def _at_boundary(text: str, pos: int) -> bool:
+    """Regex \\b at position pos"""
+    before = pos > 0 and _is_word(text[pos - 1])
+    after = pos < len(text) and _is_word(text[pos])
+    return before != after
+
+
+def _is_whitespace_class(items) -> bool:
+    return len(items) == 1 and str(items[0][0]) == "IN" and \
+        [(str(op), str(av)) for op, av in items[0][1]] == [("CATEGORY", "CATEGORY_SPACE")]
+
+
+def _expand_sequence(items) -> Optional[List[Tuple[str, ...]]]:
+    """All token sequences a parsed (sub)pattern can match, or None if not finite/simple"""
+    sequences: List[Tuple[str, ...]] = [()]
+    for op, av in items:
+        options = _expand_item(str(op), av)
+        if options is None:
+            return None
+        sequences = [seq + option for seq, option in product(sequences, options)]
+        if len(sequences) > MAX_VARIANTS:
+            return None
+    return sequences
+
+
+def _expand_item(op: str, av) -> Optional[List[Tuple[str, ...]]]:
+    if op == "LITERAL":
+        return [(chr(av),)]
+
+    if op == "IN":
+        chars = []
+        for member_op, member in av:
+            member_op = str(member_op)
+            if member_op == "LITERAL":
+                chars.append(chr(member))
+            elif member_op == "RANGE" and member[1] - member[0] < 16:
+                chars.extend(chr(c) for c in range(member[0], member[1] + 1))
+            else:
+                return None
+        return [(ch,) for ch in chars]
+
+    if op == "SUBPATTERN":
+        _, add_flags, del_flags, sub = av
+        if add_flags or del_flags:
+            return None
+        return _expand_sequence(sub)
+
+    if op == "BRANCH":
+        options = []
+        for branch in av[1]:
+            expanded = _expand_sequence(branch)
+            if expanded is None:
+                return None
+            options.extend(expanded)
+        return options
+
+    if op in ("MAX_REPEAT", "MIN_REPEAT"):
+        low, high, sub = av
+        if _is_whitespace_class(sub) and str(high) == "MAXREPEAT" and low in (0, 1):
+            return [(_WS_PLUS if low == 1 else _WS_STAR,)]
+        if (low, high) == (0, 1):
+            expanded = _expand_sequence(sub)
+            return None if expanded is None else [()] + expanded
+        return None
+
+    if op == "AT" and str(av) == "AT_BOUNDARY":
+        return [(_BOUNDARY,)]
+
+    return None
+
+
+def expand_pattern(pattern: str) -> Optional[List[Tuple[str, bool, bool]]]:
+    """
+    Literal variants of a regex, in whitespace-collapsed form
+
+    A pattern qualifies when it only uses literals, fixed alternations, optional
+    groups, small character sets, \\s+ / \\s* and \\b at either end. A variant
+    occurs in the collapsed text (whitespace runs → one space) exactly where
+    the pattern matches the original text.
+
+    Returns:
+        List of (literal, boundary before, boundary after), or None if the
+        pattern has to stay a regex
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    sequences = _expand_sequence(list(parsed))
+    if sequences is None:
+        return None
+
+    variants = set()
+    for seq in sequences:
+        seq = list(seq)
+        boundary_before = bool(seq) and seq[0] == _BOUNDARY
+        boundary_after = len(seq) > 1 and seq[-1] == _BOUNDARY
+        if boundary_before:
+            seq = seq[1:]
+        if boundary_after:
+            seq = seq[:-1]
+        if _BOUNDARY in seq:
+            return None
+
+        # Merge adjacent whitespace tokens (\s*\s+ == \s+)
+        merged: List[str] = []
+        for token in seq:
+            if token in (_WS_PLUS, _WS_STAR) and merged and merged[-1] in (_WS_PLUS, _WS_STAR):
+                merged[-1] = _WS_PLUS if _WS_PLUS in (token, merged[-1]) else _WS_STAR
+            else:
+                merged.append(token)
+
+        # \s* → with and without the space
+        choices = [("", " ") if token == _WS_STAR else (" " if token == _WS_PLUS else token,)
+                   for token in merged]
+        for parts in product(*choices):
+            literal = "".join(parts)
+            # Other whitespace, or spaces next to a whitespace run, has no collapsed form
+            if not literal or "  " in literal or any(ch.isspace() and ch != " " for ch in literal):
+                return None
+            variants.add((literal, boundary_before, boundary_after))
+
+    if len(variants) > MAX_VARIANTS:
+        return None
+    return sorted(variants)
+
+
+def _literal_runs(items) -> List[str]:
+    """Maximal runs of consecutive non-whitespace literal characters in a parsed sequence"""
+    runs, current = [], []
+    for op, av in items:
+        if str(op) == "LITERAL" and not chr(av).isspace():
+            current.append(chr(av))
+            continue
+        if current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def _required_in_sequence(items) -> Optional[FrozenSet[str]]:
+    """Best literal set one of which every match of the sequence must contain"""
+    candidates = [frozenset([run]) for run in _literal_runs(items)]
+    for op, av in items:
+        required = _required_in_item(str(op), av)
+        if required:
+            candidates.append(required)
+    if not candidates:
+        return None
+    # Longest shortest member first, then fewer alternatives
+    return max(candidates, key=lambda c: (min(len(x) for x in c), -len(c)))
+
+
+def _required_in_item(op: str, av) -> Optional[FrozenSet[str]]:
+    if op == "SUBPATTERN":
+        return _required_in_sequence(av[3])
+    if op == "BRANCH":
+        literals = set()
+        for branch in av[1]:
+            required = _required_in_sequence(branch)
+            if not required:
+                return None
+            literals |= required
+        return frozenset(literals)
+    if op in ("MAX_REPEAT", "MIN_REPEAT") and av[0] >= 1:
+        return _required_in_sequence(av[2])
+    if op == "ASSERT" and av[0] == 1:
+        # Positive lookahead: the text must contain it too
+        return _required_in_sequence(av[1])
+    return None
+
+
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Literals one of which occurs in any text the pattern matches
+
+    Used to skip a regex unless the automaton saw one of its literals.
+    Literals never contain whitespace, so they can be looked up in the
+    whitespace-collapsed text.
+
+    Returns:
+        Set of literals, or None if no useful set exists (regex always runs)
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    required = _required_in_sequence(list(parsed))
+    if not required or min(len(x) for x in required) < MIN_ANCHOR_LENGTH:
+        return None
+    return required
+
+
+# Automaton entry kinds
+_MATCH, _ANCHOR, _KEYWORD = 0, 1, 2
+
+
+class CompiledPatternSet:
+    """
+    Several labelled pattern lists (e.g. one per entity type) matched in one scan
+
+    At load time each pattern is either expanded into its literal variants
+    (fixed alternations, optional groups, \\s+ / \\s*, \\b at the ends) or, if it
+    needs the regex engine (.*, lookaheads, \\d, ...), reduced to the literals
+    one of which it requires. Both go into one Aho-Corasick automaton, which
+    also holds the extra keywords. A scan is one automaton pass over the
+    whitespace-collapsed text, then a compiled regex search only for the
+    regex patterns whose literals occurred.
+
+    Results are identical to calling re.search for each pattern in order
+    (reference_scan).
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[Tuple[str, str]]], keywords: Iterable[str] = ()):
+        """
+        Compile the pattern lists
+
+        Args:
+            groups: Group name (e.g. entity type) → list of (pattern, label), in priority order
+            keywords: Extra literals to report by plain substring test (e.g. rule keywords)
+        """
+        self.groups = {name: list(patterns) for name, patterns in groups.items()}
+        self.keywords = list(dict.fromkeys(keywords))
+
+        # Flat pattern table: id → label, group → ids in priority order
+        self._labels: List[str] = []
+        self._group_ids: Dict[str, List[int]] = {}
+
+        # (literal, kind, owner id, \b before, \b after)
+        entries: List[Tuple[str, int, int, bool, bool]] = []
+        # Regex patterns: gated by their literals, or always searched
+        self._regexes: Dict[int, re.Pattern] = {}
+        self._ungated: List[int] = []
+        # Expanded patterns with a literal space only match as variants on text
+        # without irregular whitespace; their regex is used otherwise
+        self._spaced: Dict[int, re.Pattern] = {}
+
+        for name, patterns in self.groups.items():
+            ids = []
+            for pattern, label in patterns:
+                pattern_id = len(self._labels)
+                self._labels.append(label)
+                ids.append(pattern_id)
+
+                variants = expand_pattern(pattern)
+                if variants is not None:
+                    if " " in pattern:
+                        self._spaced[pattern_id] = re.compile(pattern)
+                    entries.extend((literal, _MATCH, pattern_id, before, after)
+                                   for literal, before, after in variants)
+                    continue
+
+                self._regexes[pattern_id] = re.compile(pattern)
+                anchors = required_literals(pattern)
+                if anchors is None:
+                    self._ungated.append(pattern_id)
+                else:
+                    entries.extend((literal, _ANCHOR, pattern_id, False, False) for literal in anchors)
+            self._group_ids[name] = ids
+
+        entries.extend((keyword, _KEYWORD, index, False, False) for index, keyword in enumerate(self.keywords))
+
+        self._entries = entries
+        self._automaton = AhoCorasick([entry[0] for entry in entries])
+
+        expanded = len(self._labels) - len(self._regexes)
+        logger.info(f"✅ Compiled {len(self._labels)} patterns into {len(entries)} automaton literals "
+                    f"({expanded} expanded, {len(self._regexes) - len(self._ungated)} regex gated, "
+                    f"{len(self._ungated)} regex always run)")
+
+    def _scan_automaton(self, text: str, matched: set, candidates: set, keywords: set,
+                        patterns: bool = True, keyword_hits: bool = True):
+        entries = self._entries
+        for start, entry_index in self._automaton.find(text):
+            literal, kind, owner, before, after = entries[entry_index]
+            if kind == _KEYWORD:
+                if keyword_hits:
+                    keywords.add(self.keywords[owner])
+            elif not patterns:
+                continue
+            elif kind == _ANCHOR:
+                candidates.add(owner)
+            elif owner not in matched:
+                if before and not _at_boundary(text, start):
+                    continue
+                if after and not _at_boundary(text, start + len(literal)):
+                    continue
+                matched.add(owner)
+
+    def scan(self, text: str) -> Tuple[Dict[str, List[str]], FrozenSet[str]]:
+        """
+        Match every pattern list against text
+
+        Args:
+            text: Text to scan (patterns are matched as written, no case folding)
+
+        Returns:
+            (group → labels of matching patterns in pattern order without duplicates,
+             extra keywords contained in text)
+        """
+        matched: set = set()
+        candidates: set = set(self._ungated)
+        keywords: set = set()
+
+        collapsed = _WHITESPACE_RUN.sub(" ", text)
+        if collapsed == text:
+            self._scan_automaton(text, matched, candidates, keywords)
+        else:
+            # Irregular whitespace: patterns on the collapsed text, keywords on the original
+            self._scan_automaton(collapsed, matched, candidates, keywords, keyword_hits=False)
+            if self.keywords:
+                self._scan_automaton(text, matched, candidates, keywords, patterns=False)
+            for pattern_id, compiled in self._spaced.items():
+                matched.discard(pattern_id)
+                if compiled.search(text):
+                    matched.add(pattern_id)
+
+        for pattern_id in candidates:
+            if self._regexes[pattern_id].search(text):
+                matched.add(pattern_id)
+
+        labels = {}
+        for name, ids in self._group_ids.items():
+            found = []
+            for pattern_id in ids:
+                if pattern_id in matched and self._labels[pattern_id] not in found:
+                    found.append(self._labels[pattern_id])
+            labels[name] = found
+        return labels, frozenset(keywords)
+
+    def reference_scan(self, text: str) -> Tuple[Dict[str, List[str]], FrozenSet[str]]:
+        """Same result as scan(), one re.search per pattern (for regression checks)"""
+        labels = {}
+        for name, patterns in self.groups.items():
+            found = []
+            for pattern, label in patterns:
+                if re.search(pattern, text) and label not in found:
+                    found.append(label)
+            labels[name] = found
+        return labels, frozenset(k for k in self.keywords if k in text)
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    patterns = {
+        "Topic": [(r"chuyển\s+tiền", "Chuyển tiền"), (r"thanh\s*toán\s+hóa\s*đơn", "Thanh toán hóa đơn")],
+        "Feature": [(r"\bqr\b", "QR"), (r"(nạp|chuyển)\s+(tiền\s+)?(bằng\s+|qua\s+)?qr", "QR code")],
+        "Error": [(r"(đã|bị)\s+trừ\s+tiền.*(chưa|không)\s+(có|nhận)", "tài khoản thụ hưởng chưa nhận được tiền")],
+    }
+    for group in patterns.values():
+        for pattern, _ in group:
+            print(f"{pattern!r}: variants={expand_pattern(pattern)}, required={required_literals(pattern)}")
+
+    matcher = CompiledPatternSet(patterns, keywords=["chuyển tiền", "chưa"])
+    for text in ["chuyển  tiền bằng qr", "thanh toánhóa đơn", "đã bị trừ tiền nhưng chưa nhận", "qrcode"]:
+        result = matcher.scan(text)
+        assert result == matcher.reference_scan(text)
+        print(f"{text!r}: {result}")
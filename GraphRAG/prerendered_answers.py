@@ -0,0 +1,137 @@
+"""
+Pre-rendered FAQ Answers
+Per-FAQ answer table (formatted answer, steps, related questions) built once per graph
+version, served on exact question matches without any LLM or Neo4j call
+"""
+
+import copy
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def format_answer_for_readability(answer: str) -> str:
+    """
+    Post-process answer to enforce better formatting:
+    - Break long lines with comma-separated actions
+    - Add spacing between steps
+    """
+    lines = answer.split('\n')
+    formatted_lines = []
+
+    for line in lines:
+        # Check if this is a step line (Bước X: ...)
+        step_match = re.match(r'(Bước\s+\d+:\s*)(.+)', line)
+
+        if step_match:
+            step_label = step_match.group(1)  # "Bước 1: "
+            step_content = step_match.group(2)  # The actual content
+
+            # If content has multiple comma-separated clauses and is long (>80 chars)
+            # OR has 3+ commas (lots of actions)
+            comma_count = step_content.count(',')
+
+            if comma_count >= 2 or (comma_count >= 1 and len(step_content) > 80):
+                # Split by comma
+                parts = [p.strip() for p in step_content.split(',')]
+
+                # First part goes on same line as "Bước X:"
+                formatted_lines.append(f"{step_label}{parts[0]}")
+
+                # Rest go on separate lines
+                for part in parts[1:]:
+                    if part:  # Skip empty parts
+                        # Capitalize if starts with lowercase
+                        formatted_part = part[0].upper() + part[1:] if part and part[0].islower() else part
+                        formatted_lines.append(formatted_part)
+
+                # Add blank line after step for spacing
+                formatted_lines.append('')
+            else:
+                # Step is short enough, keep as is
+                formatted_lines.append(line)
+                # Add blank line after step for spacing
+                if len(step_content) > 0:
+                    formatted_lines.append('')
+        else:
+            # Not a step line, keep as is
+            formatted_lines.append(line)
+
+    # Remove trailing blank lines
+    while formatted_lines and not formatted_lines[-1].strip():
+        formatted_lines.pop()
+
+    return '\n'.join(formatted_lines)
+
+
+class PreRenderedAnswerTable:
+    """
+    FAQ id → ready-to-serve query result, rebuilt when the FAQ record cache reloads
+
+    The engine supplies the render function (FAQ context row + alternative
+    actions → result dict), so the entries have exactly the shape of a normal
+    "success" result. Lookups return deep copies.
+    """
+
+    def __init__(self, faq_records, render: Callable[[str, Dict, List[Dict]], Dict]):
+        """
+        Initialize PreRenderedAnswerTable
+
+        Args:
+            faq_records: FAQRecordCache the table is built from
+            render: render(faq_id, context row, alternative actions) -> result dict
+        """
+        self.faq_records = faq_records
+        self.render = render
+        # (answers, version) swapped as one tuple
+        self._state: tuple = ({}, None)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> bool:
+        """
+        Rebuild the table if the FAQ records were reloaded
+
+        Returns:
+            True if the table is available (False if the FAQ records are not)
+        """
+        if not self.faq_records.ensure_fresh():
+            return False
+
+        version = self.faq_records.version
+        if self._loaded and version == self._state[1]:
+            return True
+
+        with self._lock:
+            if not (self._loaded and version == self._state[1]):
+                self._build(version)
+                self._loaded = True
+
+        return True
+
+    def _build(self, version: Optional[str]):
+        contexts, _, alternatives, _ = self.faq_records.context_batch(self.faq_records.faq_ids())
+
+        answers = {}
+        for faq_id, data in contexts.items():
+            try:
+                answers[faq_id] = self.render(faq_id, data, alternatives.get(faq_id, []))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not pre-render FAQ {faq_id}: {e}")
+
+        self._state = (answers, version)
+        logger.info(f"✅ Pre-rendered {len(answers)} FAQ answers (graph version {version})")
+
+    def get(self, faq_id: str) -> Optional[Dict]:
+        """Copy of the pre-rendered result for one FAQ, or None"""
+        entry = self._state[0].get(faq_id)
+        return copy.deepcopy(entry) if entry is not None else None
+
+    @property
+    def size(self) -> int:
+        """Number of pre-rendered FAQs"""
+        return len(self._state[0])
@@ -0,0 +1,156 @@
+"""
+Process Step Arrays
+Ordered step arrays per FAQ, so step continuations are served by slicing
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+class ProcessSteps:
+    """
+    Steps of every process one FAQ describes, ordered by step number
+
+    Built once per graph version (FAQ record cache load, or the step arrays
+    materialized on Process nodes) and kept as parallel tuples:
+
+        numbers: step numbers, ascending
+        texts:   step texts
+        owners:  index into processes for each step
+
+    A "bước tiếp theo" lookup is a bisect on numbers plus a slice, and
+    returns the same result as the STEPS_BY_FAQ_ID query + count query:
+    steps of all processes merged by step number, process info and total
+    from the process of the first step returned.
+    """
+
+    __slots__ = ("faq_question", "faq_answer", "numbers", "texts", "owners", "processes", "total_count")
+
+    def __init__(self, faq_question: Optional[str], faq_answer: Optional[str], processes: List[Dict]):
+        """
+        Initialize ProcessSteps
+
+        Args:
+            faq_question: FAQ question
+            faq_answer: FAQ answer
+            processes: [{process_name, process_id, steps: [{number, text}]}],
+                optionally with step_count when steps without a number were dropped
+        """
+        self.faq_question = faq_question
+        self.faq_answer = faq_answer
+
+        entries = []
+        process_info = []
+        for process in processes:
+            if not process["steps"]:
+                continue
+            owner = len(process_info)
+            process_info.append((
+                process["process_name"],
+                process["process_id"],
+                process.get("step_count") or len(process["steps"])
+            ))
+            entries.extend(
+                (step["number"], step.get("text"), owner)
+                for step in process["steps"] if step.get("number") is not None
+            )
+        # Stable sort: steps with the same number keep process order
+        entries.sort(key=lambda e: e[0])
+
+        self.numbers: Tuple = tuple(e[0] for e in entries)
+        self.texts: Tuple = tuple(e[1] for e in entries)
+        self.owners: Tuple[int, ...] = tuple(e[2] for e in entries)
+        self.processes: Tuple[Tuple[str, str, int], ...] = tuple(process_info)
+        self.total_count = sum(total for _, _, total in process_info)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> Optional["ProcessSteps"]:
+        """
+        Build from PROCESS_STEPS_BY_FAQ_ID rows (one per process)
+
+        Uses the step_numbers / step_texts arrays materialized on the Process
+        node, or the traversed steps for processes that have none yet.
+
+        Returns:
+            ProcessSteps, or None if there are no rows
+        """
+        if not rows:
+            return None
+
+        processes = []
+        for row in rows:
+            if row.get("step_numbers") is not None:
+                steps = [{"number": n, "text": t} for n, t in zip(row["step_numbers"], row["step_texts"])]
+            else:
+                steps = row.get("steps") or []
+            processes.append({
+                "process_name": row["process_name"],
+                "process_id": row["process_id"],
+                "steps": steps,
+                "step_count": row.get("step_count"),
+            })
+
+        return cls(rows[0]["faq_question"], rows[0]["faq_answer"], processes)
+
+    def span(self, from_step: int, only_next_step: bool = True) -> Tuple[int, int]:
+        """Index range of step from_step (only_next_step) or of all steps from it"""
+        lo = bisect_left(self.numbers, from_step)
+        hi = bisect_right(self.numbers, from_step, lo) if only_next_step else len(self.numbers)
+        return lo, hi
+
+    def result(self, from_step: int, only_next_step: bool = True) -> Optional[Dict]:
+        """
+        Steps from from_step, in the engine's step query result format
+
+        Returns:
+            {faq_question, faq_answer, process_name, process_id, steps,
+             total_steps, total_steps_in_process}, or
+            {steps: [], total_steps: 0, total_steps_in_process} when from_step
+            is past the last step, or None if the FAQ has no process steps
+        """
+        if not self.total_count:
+            return None
+
+        lo, hi = self.span(from_step, only_next_step)
+        if lo == hi:
+            return {
+                "steps": [],
+                "total_steps": 0,
+                "total_steps_in_process": self.total_count
+            }
+
+        process_name, process_id, total = self.processes[self.owners[lo]]
+        steps = [
+            {"number": number, "text": text}
+            for number, text in zip(self.numbers[lo:hi], self.texts[lo:hi])
+        ]
+        return {
+            "faq_question": self.faq_question,
+            "faq_answer": self.faq_answer,
+            "process_name": process_name,
+            "process_id": process_id,
+            "steps": steps,
+            "total_steps": len(steps),
+            "total_steps_in_process": total
+        }
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    steps = ProcessSteps("Cách rút tiền từ ví về ngân hàng?", "...", [
+        {"process_name": "withdrawal", "process_id": "P1", "steps": [
+            {"number": 3, "text": "Nhập số tiền"},
+            {"number": 1, "text": "Chọn Rút tiền"},
+            {"number": 2, "text": "Chọn ngân hàng"},
+            {"number": 4, "text": "Xác nhận OTP"},
+        ]},
+    ])
+
+    for from_step, only_next in [(1, True), (2, False), (4, True), (5, True)]:
+        print(f"from_step={from_step} only_next_step={only_next}: {steps.result(from_step, only_next)}")
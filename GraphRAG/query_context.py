@@ -0,0 +1,153 @@
+"""
+Request-scoped Query Context
+Normalized query forms and memoized query ↔ FAQ similarity shared across pipeline stages
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from difflib import SequenceMatcher
+from concurrent.futures import Future
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple, Union
+
+from normalized_query import NormalizedQuery, normalize_query
+
+
+class QueryContext:
+    """
+    Per-request cache for one user query
+
+    Exact match lookup, entity result verification, graph context boosting and
+    ranking all compare the same query against the same FAQ questions. The
+    context computes each (query form, FAQ text) SequenceMatcher ratio and
+    each stopword-filtered term set once per request.
+
+    Memo keys are the exact strings compared, so results are identical to
+    calling SequenceMatcher directly.
+    """
+
+    def __init__(self, query: Union[str, NormalizedQuery]):
+        """
+        Initialize QueryContext
+
+        Args:
+            query: User query or its NormalizedQuery
+        """
+        self.normalized = normalize_query(query)
+        self.query = self.normalized.text
+        self.query_lower = self.normalized.lower
+        self.query_stripped = self.normalized.stripped
+
+        self._ratios: Dict[Tuple[str, str], float] = {}
+        self._terms: Dict[Tuple[str, int, int], FrozenSet[str]] = {}
+        self._prefetched: Dict[Hashable, Tuple[int, Future]] = {}
+        self.embeddings: Dict[str, Any] = {}  # Query text → embedding (encoded once per request)
+        self.ratio_hits = 0
+        self.ratio_misses = 0
+
+    def ratio(self, text_lower: str, query_form: Optional[str] = None) -> float:
+        """
+        SequenceMatcher(None, query_form, text_lower).ratio(), memoized
+
+        Args:
+            text_lower: Lowercased FAQ text
+            query_form: Query string to compare (default: query_lower)
+
+        Returns:
+            Similarity ratio
+        """
+        if query_form is None:
+            query_form = self.query_lower
+
+        key = (query_form, text_lower)
+        value = self._ratios.get(key)
+        if value is None:
+            value = SequenceMatcher(None, query_form, text_lower).ratio()
+            self._ratios[key] = value
+            self.ratio_misses += 1
+        else:
+            self.ratio_hits += 1
+        return value
+
+    def seed_ratio(self, text_lower: str, value: float, query_form: Optional[str] = None):
+        """Record a ratio computed elsewhere (e.g. by the question index)"""
+        if query_form is None:
+            query_form = self.query_lower
+        self._ratios[(query_form, text_lower)] = value
+
+    def terms(self, text_lower: str, stopwords: FrozenSet[str], min_len: int = 1) -> FrozenSet[str]:
+        """
+        Whitespace tokens of text_lower that are not stopwords and longer than min_len
+
+        Args:
+            text_lower: Lowercased text
+            stopwords: Stopword set (module-level constant, memoized by identity)
+            min_len: Keep tokens with len(token) > min_len
+
+        Returns:
+            Set of terms
+        """
+        key = (text_lower, id(stopwords), min_len)
+        value = self._terms.get(key)
+        if value is None:
+            value = frozenset(w for w in text_lower.split() if w not in stopwords and len(w) > min_len)
+            self._terms[key] = value
+        return value
+
+    def prefetch(self, key: Hashable, top_k: int, future: Future):
+        """
+        Register a stage started ahead of time (e.g. semantic search run
+        concurrently with entity extraction)
+
+        Args:
+            key: Stage key, e.g. ("semantic", query)
+            top_k: Number of results the stage was started with
+            future: Future resolving to a ranked list of result dicts
+        """
+        self._prefetched[key] = (top_k, future)
+
+    def take_prefetched(self, key: Hashable, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        First top_k results of a prefetched stage (waits for it to finish)
+
+        Returns:
+            Copies of the result dicts, or None if no prefetched stage with
+            at least top_k results is registered
+        """
+        entry = self._prefetched.get(key)
+        if entry is None or entry[0] < top_k:
+            return None
+        return [dict(r) for r in entry[1].result()[:top_k]]
+
+    def cancel_prefetched(self):
+        """Cancel prefetched stages that have not started yet and drop all entries"""
+        for _, future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+
+
+_current_context: ContextVar[Optional[QueryContext]] = ContextVar("query_context", default=None)
+
+
+def get_query_context(query: Union[str, NormalizedQuery]) -> QueryContext:
+    """
+    Get the active context for this query
+
+    Returns the request's context when one is active for the same query,
+    otherwise a fresh (unshared) context, so stages also work when called
+    outside Neo4jGraphRAGEngine.query().
+    """
+    ctx = _current_context.get()
+    if ctx is not None and (ctx.normalized is query or ctx.query == query):
+        return ctx
+    return QueryContext(query)
+
+
+@contextmanager
+def query_context(query: Union[str, NormalizedQuery]):
+    """Activate a QueryContext for the duration of one request"""
+    ctx = QueryContext(query)
+    token = _current_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_context.reset(token)
@@ -0,0 +1,260 @@
+"""
+Prepared Cypher Query Registry
+Runs named, parameterized queries through Neo4jConnector and keeps per-query stats
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Iterator, Union, Tuple
+
+import numpy as np
+
+import config
+import tracing
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Execution statistics for one named query"""
+    name: str
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    latencies_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    last_profile: Optional[Dict] = None
+
+    def to_dict(self) -> Dict:
+        """Summary with latency percentiles"""
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "avg_rows": self.rows / self.calls if self.calls else 0.0,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "last_profile_db_hits": (self.last_profile or {}).get("db_hits"),
+        }
+
+
+class QueryRegistry:
+    """
+    Registry of named Cypher statements
+
+    Every statement is fixed text with $parameters only, so each name maps to
+    exactly one cached plan in Neo4j. Calls go through run/stream/fetch_columns,
+    which record call count, latency and row counts per name. A fraction of read
+    calls (config.QUERY_PROFILE_SAMPLE_RATE) is additionally executed with
+    PROFILE so slow statements can be inspected in production.
+    """
+
+    def __init__(self, connector, queries: Dict[str, str] = None, profile_sample_rate: float = None):
+        """
+        Initialize QueryRegistry
+
+        Args:
+            connector: Neo4jConnector instance
+            queries: Initial {name: cypher} mapping
+            profile_sample_rate: Fraction of calls to PROFILE (default from config)
+        """
+        self.connector = connector
+        self.queries: Dict[str, str] = {}
+        self.stats: Dict[str, QueryStats] = {}
+        self.profile_sample_rate = (
+            profile_sample_rate if profile_sample_rate is not None
+            else getattr(config, 'QUERY_PROFILE_SAMPLE_RATE', 0.0)
+        )
+        self._lock = threading.Lock()
+
+        for name, cypher in (queries or {}).items():
+            self.register(name, cypher)
+
+    def register(self, name: str, cypher: str):
+        """Register (or replace) a named query"""
+        self.queries[name] = cypher
+        with self._lock:
+            self.stats.setdefault(name, QueryStats(name=name))
+
+    def get(self, name: str) -> str:
+        """Get Cypher text of a named query"""
+        if name not in self.queries:
+            raise KeyError(f"Unknown query: {name}")
+        return self.queries[name]
+
+    def run(self, name: str, parameters: Dict = None, write: bool = False) -> List[Dict]:
+        """
+        Execute a named query and return all rows
+
+        Args:
+            name: Registered query name
+            parameters: Query parameters
+            write: True for write transactions
+
+        Returns:
+            List of result records
+        """
+        cypher = self.get(name)
+        start = time.perf_counter()
+        try:
+            results = self.connector.execute_query(cypher, parameters, write=write)
+        except Exception:
+            self._record_error(name)
+            raise
+
+        self._record(name, (time.perf_counter() - start) * 1000, len(results))
+        if not write:
+            self._maybe_profile(name, parameters)
+        return results
+
+    def stream(
+        self,
+        name: str,
+        parameters: Dict = None,
+        as_tuples: bool = False
+    ) -> Iterator[Union[Dict, Tuple]]:
+        """
+        Execute a named read query and yield rows lazily
+
+        Latency is recorded when the stream is exhausted or closed.
+        """
+        cypher = self.get(name)
+        start = time.perf_counter()
+        rows = 0
+        try:
+            for row in self.connector.stream_query(cypher, parameters, as_tuples=as_tuples):
+                rows += 1
+                yield row
+        except Exception:
+            self._record_error(name)
+            raise
+        finally:
+            self._record(name, (time.perf_counter() - start) * 1000, rows)
+
+        self._maybe_profile(name, parameters)
+
+    def fetch_columns(
+        self,
+        name: str,
+        parameters: Dict = None,
+        vector_columns: List[str] = None
+    ) -> Dict[str, Union[List, np.ndarray]]:
+        """Execute a named read query column-wise (see Neo4jConnector.fetch_columns)"""
+        cypher = self.get(name)
+        start = time.perf_counter()
+        try:
+            columns = self.connector.fetch_columns(cypher, parameters, vector_columns=vector_columns)
+        except Exception:
+            self._record_error(name)
+            raise
+
+        rows = len(next(iter(columns.values()))) if columns else 0
+        self._record(name, (time.perf_counter() - start) * 1000, rows)
+        self._maybe_profile(name, parameters)
+        return columns
+
+    def profile(self, name: str, parameters: Dict = None, write: bool = False) -> Dict:
+        """
+        Run a named query once with PROFILE and return its plan summary
+
+        Args:
+            name: Registered query name
+            parameters: Query parameters
+            write: True for write queries
+
+        Returns:
+            {"name", "db_hits", "rows", "plan"}
+        """
+        profile = self.connector.profile_query(self.get(name), parameters, write=write)
+        summary = {
+            "name": name,
+            "db_hits": profile.get("db_hits", 0),
+            "rows": profile.get("rows", 0),
+            "plan": profile.get("plan"),
+        }
+        with self._lock:
+            self.stats[name].last_profile = summary
+        logger.info(f"📊 PROFILE {name}: {summary['db_hits']} db hits, {summary['rows']} rows")
+        return summary
+
+    def get_stats(self, sort_by: str = "total_ms") -> List[Dict]:
+        """
+        Get per-query statistics
+
+        Args:
+            sort_by: Summary key to sort by (descending)
+
+        Returns:
+            List of stats dicts, slowest first
+        """
+        with self._lock:
+            summaries = [s.to_dict() for s in self.stats.values() if s.calls]
+        summaries.sort(key=lambda s: s.get(sort_by) or 0, reverse=True)
+        return summaries
+
+    def reset_stats(self):
+        """Clear all collected statistics"""
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = QueryStats(name=name)
+
+    def _record(self, name: str, elapsed_ms: float, rows: int):
+        # Round trips of the current request (if it is traced)
+        tracing.count("cypher_calls")
+        tracing.count("cypher_ms", elapsed_ms)
+        with self._lock:
+            stats = self.stats[name]
+            stats.calls += 1
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+            stats.latencies_ms.append(elapsed_ms)
+
+    def _record_error(self, name: str):
+        with self._lock:
+            self.stats[name].errors += 1
+
+    def _maybe_profile(self, name: str, parameters: Dict):
+        # Reads only: PROFILE executes the statement again, which would repeat a write
+        if self.profile_sample_rate <= 0 or random.random() >= self.profile_sample_rate:
+            return
+        try:
+            self.profile(name, parameters)
+        except Exception as e:
+            logger.warning(f"⚠️ PROFILE sampling failed for {name}: {e}")
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    from neo4j_connector import Neo4jConnector
+    from cypher_queries import ENGINE_QUERIES
+
+    connector = Neo4jConnector()
+    registry = QueryRegistry(connector, ENGINE_QUERIES)
+
+    registry.run("all_faq_questions")
+    registry.run("keyword_search", {"keywords": ["rút tiền", "ngân hàng"], "top_k": 5})
+    registry.run("intent_keyword_search", {"keywords": ["phí", "biểu phí"], "top_k": 5})
+    registry.profile("keyword_search", {"keywords": ["rút tiền", "ngân hàng"], "top_k": 5})
+
+    print("\n" + "=" * 60)
+    print("QUERY STATS")
+    print("=" * 60)
+    for s in registry.get_stats():
+        print(f"{s['name']:<30} calls={s['calls']:<4} rows={s['rows']:<5} "
+              f"p50={s['p50_ms']:.1f}ms p95={s['p95_ms']:.1f}ms db_hits={s['last_profile_db_hits']}")
+
+    connector.close()
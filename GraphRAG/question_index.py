@@ -0,0 +1,265 @@
+"""
+Fuzzy Question Index for exact / near-exact FAQ matching
+Replaces per-query SequenceMatcher scans over every FAQ question
+"""
+
+import logging
+import threading
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Optional: C implementation of the Indel (LCS-based) ratio
+try:
+    from rapidfuzz.distance import Indel
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+    logger.info("rapidfuzz not installed - question index uses character-count pruning only")
+
+# Float slack so pruning never drops a candidate sitting exactly on the threshold
+_EPS = 1e-9
+
+
+class FuzzyQuestionIndex:
+    """
+    In-memory index of lowercased FAQ questions, built once per graph version
+
+    find() returns exactly the FAQs whose
+    SequenceMatcher(None, query, question).ratio() passes the threshold,
+    but only runs SequenceMatcher on candidates that can still pass:
+
+    1. Character-count bound: the matching characters of any alignment are at
+       most the multiset intersection of the two strings' characters, so
+       2 * intersection / (len(q) + len(f)) bounds the ratio from above.
+       Evaluated for all questions at once with NumPy.
+    2. Indel ratio (rapidfuzz, if installed): 2 * LCS / (len(q) + len(f))
+       is also an upper bound of SequenceMatcher.ratio().
+    3. SequenceMatcher.ratio() on the survivors for the exact score.
+    """
+
+    def __init__(self, queries=None, version_tracker=None):
+        """
+        Initialize FuzzyQuestionIndex
+
+        Args:
+            queries: QueryRegistry with the "all_faq_questions" query
+                     (optional when the index is filled with build())
+            version_tracker: GraphVersionTracker (optional)
+        """
+        self.queries = queries
+        self.version_tracker = version_tracker
+        self._version: Optional[str] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self._ids: List[str] = []
+        self._questions: List[str] = []
+        self._normalized: List[str] = []
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._vocab: Dict[str, int] = {}
+        self._counts = np.zeros((0, 0), dtype=np.uint16)
+
+    def ensure_fresh(self):
+        """Rebuild the index from Neo4j if the graph version changed"""
+        if self.queries is None:
+            return
+
+        version = self.version_tracker.current() if self.version_tracker else None
+        if self._loaded and version == self._version:
+            return
+
+        with self._lock:
+            if self._loaded and version == self._version:
+                return
+            entries = [
+                (faq_id, question)
+                for faq_id, question in self.queries.stream("all_faq_questions", as_tuples=True)
+            ]
+            self.build(entries)
+            self._version = version
+            self._loaded = True
+            logger.info(f"✅ Built fuzzy question index: {len(self._ids)} FAQs (graph version {version})")
+
+    def build(self, entries: List[Tuple[str, str]]):
+        """
+        Build the index from (faq_id, question) pairs
+
+        Args:
+            entries: FAQ ids and questions in graph order
+        """
+        ids, questions, normalized = [], [], []
+        for faq_id, question in entries:
+            if not question:
+                continue
+            ids.append(faq_id)
+            questions.append(question)
+            normalized.append(question.lower().strip())
+
+        vocab: Dict[str, int] = {}
+        for text in normalized:
+            for ch in text:
+                if ch not in vocab:
+                    vocab[ch] = len(vocab)
+
+        counts = np.zeros((len(normalized), len(vocab)), dtype=np.uint16)
+        for row, text in enumerate(normalized):
+            for ch in text:
+                counts[row, vocab[ch]] += 1
+
+        # Swap everything in together
+        (self._ids, self._questions, self._normalized,
+         self._lengths, self._vocab, self._counts) = (
+            ids, questions, normalized,
+            np.array([len(t) for t in normalized], dtype=np.int32), vocab, counts
+        )
+
+    def find(
+        self,
+        query: str,
+        threshold: float = 0.85,
+        strict: bool = False
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Find questions whose SequenceMatcher ratio against the query passes the threshold
+
+        Args:
+            query: User query (lowercased and stripped here)
+            threshold: Minimum ratio
+            strict: Use ratio > threshold instead of ratio >= threshold
+
+        Returns:
+            List of (faq_id, original question, ratio), highest ratio first
+            (ties keep graph order)
+        """
+        self.ensure_fresh()
+
+        query = query.lower().strip()
+        ids, questions, normalized = self._ids, self._questions, self._normalized
+        lengths, vocab, counts = self._lengths, self._vocab, self._counts
+        if not ids or not query:
+            return []
+
+        # Bound 1: character multiset intersection (vectorized over all FAQs)
+        query_chars: Dict[int, int] = {}
+        for ch in query:
+            col = vocab.get(ch)
+            if col is not None:
+                query_chars[col] = query_chars.get(col, 0) + 1
+
+        if not query_chars:
+            return []
+
+        cols = np.fromiter(query_chars.keys(), dtype=np.int64)
+        query_counts = np.fromiter(query_chars.values(), dtype=np.uint16)
+        intersection = np.minimum(counts[:, cols], query_counts).sum(axis=1)
+        upper_bound = 2.0 * intersection / (len(query) + lengths)
+        candidates = np.nonzero(upper_bound >= threshold - _EPS)[0]
+
+        matches = []
+        for idx in candidates:
+            text = normalized[idx]
+
+            # Bound 2: Indel ratio (LCS) >= SequenceMatcher ratio
+            if RAPIDFUZZ_AVAILABLE and Indel.normalized_similarity(query, text) < threshold - _EPS:
+                continue
+
+            similarity = SequenceMatcher(None, query, text).ratio()
+            if similarity > threshold or (not strict and similarity >= threshold):
+                matches.append((ids[idx], questions[idx], similarity))
+
+        matches.sort(key=lambda m: m[2], reverse=True)
+        return matches
+
+    @property
+    def size(self) -> int:
+        """Number of indexed questions"""
+        return len(self._ids)
+
+
+# ============================================
+# TESTING / BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    random.seed(42)
+
+    # Base questions: real FAQs from Neo4j if reachable, otherwise synthetic
+    base_questions = []
+    try:
+        from neo4j_connector import Neo4jConnector
+        connector = Neo4jConnector()
+        base_questions = [
+            r["question"] for r in
+            connector.execute_query("MATCH (f:FAQ) RETURN f.question as question")
+            if r["question"]
+        ]
+        connector.close()
+    except Exception as e:
+        print(f"Neo4j unavailable ({e}), using synthetic questions")
+
+    if not base_questions:
+        actions = ["nạp tiền", "rút tiền", "chuyển tiền", "liên kết ngân hàng", "thanh toán hóa đơn",
+                   "mua vé máy bay", "nạp tiền điện thoại", "hủy liên kết", "định danh tài khoản",
+                   "đổi mật khẩu", "mở khóa tài khoản", "mua data 4G"]
+        banks = ["Vietcombank", "BIDV", "Agribank", "Techcombank", "MB Bank", "VietinBank", "TPBank"]
+        templates = ["Làm thế nào để {a} qua {b}?", "Phí {a} qua {b} là bao nhiêu?",
+                     "Hạn mức {a} từ {b} là bao nhiêu?", "Tôi {a} qua {b} nhưng bị lỗi thì phải làm sao?",
+                     "Bao lâu thì {a} qua {b} thành công?", "Tại sao tôi không {a} được qua {b}?"]
+        base_questions = [t.format(a=a, b=b) for t in templates for a in actions for b in banks][:400]
+
+    # 10x today's FAQ count: perturbed copies of every question
+    scale = 10
+    corpus = []
+    for i in range(scale):
+        for j, q in enumerate(base_questions):
+            text = q if i == 0 else f"{q[:-1]} ({i})?" if q.endswith("?") else f"{q} ({i})"
+            corpus.append((f"FAQ_{i}_{j}", text))
+
+    queries = []
+    for q in random.sample(base_questions, min(50, len(base_questions))):
+        queries.append(q)
+        queries.append(q.lower().replace("?", ""))
+        queries.append(" ".join(q.split()[:-2]))
+    queries += ["xin chào", "thời tiết hôm nay thế nào", "giá vàng hôm nay"]
+
+    def naive(query, threshold=0.85):
+        query = query.lower().strip()
+        out = []
+        for faq_id, question in corpus:
+            similarity = SequenceMatcher(None, query, question.lower().strip()).ratio()
+            if similarity >= threshold:
+                out.append((faq_id, question, similarity))
+        out.sort(key=lambda m: m[2], reverse=True)
+        return out
+
+    index = FuzzyQuestionIndex()
+    start = time.perf_counter()
+    index.build(corpus)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = [naive(q) for q in queries]
+    naive_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    actual = [index.find(q) for q in queries]
+    index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    mismatches = sum(1 for e, a in zip(expected, actual) if e != a)
+
+    print("=" * 60)
+    print(f"FAQs: {len(corpus)} ({scale}x {len(base_questions)}), queries: {len(queries)}")
+    print(f"rapidfuzz: {RAPIDFUZZ_AVAILABLE}")
+    print(f"Index build:        {build_ms:.1f} ms")
+    print(f"SequenceMatcher scan: {naive_ms:.2f} ms/query")
+    print(f"FuzzyQuestionIndex:   {index_ms:.2f} ms/query ({naive_ms / max(index_ms, 1e-9):.1f}x)")
+    print(f"Result mismatches:  {mismatches}")
+    print("=" * 60)
@@ -0,0 +1,645 @@
+"""
+Ranking Feature Store
+FAQ-side features for _rank_results, computed once per graph version, and
+scoring of all candidates of a query over the precomputed features
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================
+# KEYWORD LISTS (ranking rules)
+# ============================================
+
+# Query keyword -> FAQ question terms; a query keyword the FAQ question lacks
+# changes the meaning ("hủy liên kết" vs "liên kết")
+CRITICAL_ACTION_KEYWORDS = [
+    ("hủy", ["hủy", "gỡ bỏ", "xóa"]),
+    ("gỡ bỏ", ["hủy", "gỡ bỏ", "xóa"]),
+    ("thêm", ["thêm", "tạo", "đăng ký"]),
+    ("tạo", ["thêm", "tạo", "đăng ký"]),
+    ("đổi", ["đổi", "thay đổi", "cập nhật"]),
+    ("mở khóa", ["mở khóa", "unlock"]),
+    ("khóa", ["khóa", "lock"]),
+]
+
+# Query topic key -> FAQ topics that contradict it (e.g., "Mở khóa" vs "Hủy")
+CONTRADICTORY_TOPICS = {
+    "mở khóa": ["hủy", "khóa tài khoản", "đổi mật khẩu"],
+    "khóa": ["mở khóa", "đổi mật khẩu"],
+    "hủy": ["mở khóa", "tạo", "đăng ký", "đổi mật khẩu"],
+    "tạo": ["hủy", "xóa"],
+    "đăng ký": ["hủy", "xóa"],
+    "đổi mật khẩu": ["mở khóa", "khóa", "hủy", "quên mật khẩu"],
+    "quên mật khẩu": ["đổi mật khẩu"]
+}
+
+TROUBLESHOOT_KEYWORDS = [
+    "kiểm tra trạng thái", "trạng thái giao dịch",
+    "chưa nhận được", "phải làm", "hãy làm theo",
+    "sao kê", "liên hệ", "hỗ trợ", "khắc phục"
+]
+PROBLEM_WORDS = ["chưa", "không", "lỗi"]
+
+FEE_KEYWORDS = [
+    "phí", "miễn phí", "chi phí", "mất phí", "có phí", "không phí",
+    "biểu phí", "bảng phí", "phí dịch vụ", "chính sách phí"
+]
+LIMIT_KEYWORDS = [
+    "hạn mức", "tối đa", "tối thiểu", "giới hạn", "limit",
+    "số tiền tối đa", "số lượng tối đa", "vượt quá", "quá hạn mức"
+]
+TIME_KEYWORDS = [
+    "bao lâu", "thời gian", "ngay lập tức", "real-time",
+    "ngày làm việc", "trong vòng", "sau khi", "mấy ngày",
+    "khi nào", "hoàn tiền", "hoàn trả"
+]
+
+# HOW_TO: troubleshooting FAQs are penalized, procedural FAQs boosted
+HOW_TO_TROUBLESHOOT_SIGNALS = [
+    "bị lỗi", "báo lỗi", "gặp lỗi", "lỗi", "thất bại", "không thành công",
+    "chưa nhận được", "bị trừ", "tại sao", "sao lại", "giao dịch thất bại",
+    "không được", "không thể", "bị từ chối"
+]
+ERROR_MESSAGE_PATTERNS = [re.compile(p) for p in [
+    r'báo\s+"[^"]*(?:lỗi|không\s+hợp\s+lệ|thất\s+bại)',  # "báo "lỗi..." or "báo "không hợp lệ..."
+    r'báo\s+lỗi',  # "báo lỗi"
+    r'báo\s+không',  # "báo không..."
+]]
+STEP_PATTERNS = [re.compile(p, re.MULTILINE | re.IGNORECASE) for p in [
+    r'bước\s+\d+[:\.\)]',  # "Bước 1:", "Bước 2."
+    r'step\s+\d+[:\.\)]',   # "Step 1:", "Step 2)"
+    r'^\d+[\.\)]',          # "1.", "2)" at start of line
+]]
+HOW_TO_SIGNALS = [
+    "làm thế nào", "như thế nào", "cách", "hướng dẫn",
+    "bước", "step", "để thực hiện", "quy trình", "thủ tục"
+]
+
+# Intents with an FAQ-side boost (column order of FAQFeatures.numeric[3:])
+RANKED_INTENTS = ("TROUBLESHOOT", "FEE", "LIMIT", "TIME", "HOW_TO")
+
+_CONTRADICTION_KEYS = list(CONTRADICTORY_TOPICS)
+
+# Similarity above each threshold -> exact match boost
+_EXACT_MATCH_THRESHOLDS = (0.75, 0.9, 0.95)
+_EXACT_MATCH_TIERS = (0.0, 0.5, 2.0, 5.0)
+
+
+# ============================================
+# FEATURES
+# ============================================
+
+class FAQFeatures(NamedTuple):
+    """Query-independent ranking features of one candidate (question, answer, topics)"""
+    question_lower: str
+    answer_lower: str
+    answer_tokens: FrozenSet[str]
+    topics_lower: FrozenSet[str]
+    # [critical_bits, contradiction_bits, has_topics, *intent boosts per RANKED_INTENTS]
+    #   critical_bits:      bit k set if the question has a term of CRITICAL_ACTION_KEYWORDS[k]
+    #   contradiction_bits: bit k set if a topic contradicts CONTRADICTORY_TOPICS key k
+    numeric: Tuple[float, ...]
+
+
+class RankingQuery(NamedTuple):
+    """Query-side ranking features"""
+    tokens: FrozenSet[str]
+    critical_bits: int
+    topics: Tuple[str, ...]
+    contradiction_keys: Tuple[int, ...]  # one entry per (query topic, contradicted key) pair
+    errors: Tuple[str, ...]
+
+
+def _first_keyword_boost(keywords: List[str], question_lower: str, answer_lower: str) -> float:
+    """0.5 if the first listed keyword found is in the question, 0.25 if only in the answer"""
+    for keyword in keywords:
+        if keyword in question_lower:
+            return 0.5
+        elif keyword in answer_lower:
+            return 0.25
+    return 0.0
+
+
+def _intent_boosts(question_lower: str, answer_lower: str) -> Tuple[float, ...]:
+    """FAQ-side intent boost for each of RANKED_INTENTS"""
+    # TROUBLESHOOT: troubleshooting keywords, plus problem words in the question
+    troubleshoot = 0.0
+    for keyword in TROUBLESHOOT_KEYWORDS:
+        if keyword in answer_lower or keyword in question_lower:
+            troubleshoot += 0.15
+    if any(word in question_lower for word in PROBLEM_WORDS):
+        troubleshoot += 0.3
+
+    # HOW_TO: heavy penalty for troubleshooting FAQs, else procedural / instructional boosts
+    how_to = 0.0
+    is_troubleshoot_faq = (
+        any(signal in question_lower for signal in HOW_TO_TROUBLESHOOT_SIGNALS) or
+        any(pattern.search(question_lower) for pattern in ERROR_MESSAGE_PATTERNS)
+    )
+    if is_troubleshoot_faq:
+        how_to -= 1.5
+    else:
+        if any(pattern.search(answer_lower) for pattern in STEP_PATTERNS):
+            how_to += 2.5
+        if any(signal in question_lower or signal in answer_lower for signal in HOW_TO_SIGNALS):
+            how_to += 0.3
+
+    return (
+        troubleshoot,
+        _first_keyword_boost(FEE_KEYWORDS, question_lower, answer_lower),
+        _first_keyword_boost(LIMIT_KEYWORDS, question_lower, answer_lower),
+        _first_keyword_boost(TIME_KEYWORDS, question_lower, answer_lower),
+        how_to,
+    )
+
+
+def compute_features(question: str, answer: str, topics: Sequence[str]) -> FAQFeatures:
+    """Ranking features of one candidate"""
+    question_lower = question.lower()
+    answer_lower = answer.lower()
+    topics_lower = [t.lower() for t in topics]
+
+    critical_bits = 0
+    for k, (_, faq_matches) in enumerate(CRITICAL_ACTION_KEYWORDS):
+        if any(match in question_lower for match in faq_matches):
+            critical_bits |= 1 << k
+
+    contradiction_bits = 0
+    for k, key in enumerate(_CONTRADICTION_KEYS):
+        if any(contra in topic for topic in topics_lower for contra in CONTRADICTORY_TOPICS[key]):
+            contradiction_bits |= 1 << k
+
+    return FAQFeatures(
+        question_lower=question_lower,
+        answer_lower=answer_lower,
+        answer_tokens=frozenset(answer_lower.split()),
+        topics_lower=frozenset(topics_lower),
+        numeric=(critical_bits, contradiction_bits, float(bool(topics))) + _intent_boosts(question_lower, answer_lower),
+    )
+
+
+def ranking_query(query_lower: str, query_entities: Dict) -> RankingQuery:
+    """Query-side features for one query"""
+    critical_bits = 0
+    for k, (query_kw, _) in enumerate(CRITICAL_ACTION_KEYWORDS):
+        if query_kw in query_lower:
+            critical_bits |= 1 << k
+
+    topics = tuple(t.lower() for t in query_entities.get("Topic", []))
+    contradiction_keys = tuple(
+        k for topic in topics for k, key in enumerate(_CONTRADICTION_KEYS) if key in topic
+    )
+
+    errors = query_entities.get("Error", [])
+    return RankingQuery(
+        tokens=frozenset(query_lower.split()),
+        critical_bits=critical_bits,
+        topics=topics,
+        contradiction_keys=contradiction_keys,
+        errors=tuple(e.lower() for e in errors) if errors else (),
+    )
+
+
+def score_candidates(
+    features: Sequence[FAQFeatures],
+    base_scores: Sequence[float],
+    similarities: Sequence[float],
+    intent: str,
+    query: RankingQuery
+) -> Dict[str, List[float]]:
+    """
+    Score all candidates of one query
+
+    Same boosts, in the same order of addition, as the per-candidate loop
+    _rank_results used before (see reference_score). A query has at most a
+    few dozen candidates, so a plain loop over the precomputed features is
+    faster than building arrays for them.
+
+    Returns:
+        {exact_match_boost, topic_boost, intent_boost, error_boost,
+         keyword_boost, final} lists
+    """
+    intent_column = 3 + RANKED_INTENTS.index(intent) if intent in RANKED_INTENTS else None
+    scores = {name: [] for name in
+              ("exact_match_boost", "topic_boost", "intent_boost", "error_boost", "keyword_boost", "final")}
+
+    for f, base, similarity in zip(features, base_scores, similarities):
+        critical_bits, contradiction_bits, has_topics = f.numeric[:3]
+
+        # Exact question match tiers (> 0.75, > 0.9, > 0.95), minus 3.0 when a
+        # critical query keyword is missing from the question
+        exact = _EXACT_MATCH_TIERS[bisect_left(_EXACT_MATCH_THRESHOLDS, similarity)]
+        if query.critical_bits & ~int(critical_bits):
+            exact -= 3.0
+
+        # Topic: first query topic found as an FAQ topic (0.5) or in the question (0.3),
+        # else 0.8 penalty per contradicting (query topic, topic key) pair
+        topic = 0.0
+        for q_topic in query.topics:
+            if q_topic in f.topics_lower:
+                topic += 0.5
+                break
+            elif q_topic in f.question_lower:
+                topic += 0.3
+                break
+        if query.topics and has_topics and topic == 0.0:
+            for k in query.contradiction_keys:
+                if (int(contradiction_bits) >> k) & 1:
+                    topic -= 0.8
+
+        # Intent: precomputed FAQ-side boost for the query's intent
+        intent_boost = f.numeric[intent_column] if intent_column is not None else 0.0
+
+        # Error: 0.25 per detected error mentioned in the question or answer
+        error = 0.0
+        for error_lower in query.errors:
+            if error_lower in f.answer_lower or error_lower in f.question_lower:
+                error += 0.25
+
+        # Keyword overlap with the answer (capped at 0.2)
+        keyword = min(len(query.tokens & f.answer_tokens) * 0.02, 0.2)
+
+        scores["exact_match_boost"].append(exact)
+        scores["topic_boost"].append(topic)
+        scores["intent_boost"].append(intent_boost)
+        scores["error_boost"].append(error)
+        scores["keyword_boost"].append(keyword)
+        scores["final"].append(base + exact + topic + intent_boost + error + keyword)
+
+    return scores
+
+
+# ============================================
+# CANDIDATE PRUNING (before graph context expansion)
+# ============================================
+
+# Float slack when comparing bounds with scores summed in a different order
+_BOUND_EPSILON = 1e-9
+
+
+def early_boosted_scores(scores: Sequence[float], similarities: Sequence[float]) -> np.ndarray:
+    """Retrieval scores after the early exact match boost of _get_graph_context"""
+    scores = np.asarray(scores, dtype=np.float64)
+    similarities = np.asarray(similarities, dtype=np.float64)
+    return np.where(similarities > 0.9, np.minimum(scores * 2.5, 1.0),
+                    np.where(similarities > 0.75, np.minimum(scores * 1.5, 1.0), scores))
+
+
+def candidate_bounds(
+    question_features: Sequence[FAQFeatures],
+    base_scores: Sequence[float],
+    similarities: Sequence[float],
+    intent: str,
+    query: RankingQuery
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bounds of each candidate's final ranking score before its graph context
+    (and so the answer, possibly rewritten for the query) is fetched
+
+    Base score, exact match and topic boosts depend only on the question and
+    topics and are exact; intent, error and keyword boosts read the answer
+    and are bounded.
+
+    Args:
+        question_features: compute_features(question, "", topics) per candidate
+        base_scores: early_boosted_scores of the candidates
+        similarities: Query ↔ question similarity
+        intent: Query intent
+        query: ranking_query() of the query
+
+    Returns:
+        (lower, upper) arrays
+    """
+    known = {name: np.asarray(values, dtype=np.float64) for name, values in
+             score_candidates(question_features, base_scores, similarities, intent, query).items()}
+    n = len(question_features)
+    lower = known["final"]
+    intent_boost = known["intent_boost"]
+
+    if intent == "TROUBLESHOOT":
+        intent_upper = np.full(n, 0.15 * len(TROUBLESHOOT_KEYWORDS) + 0.3)
+    elif intent in ("FEE", "LIMIT", "TIME"):
+        # An earlier listed keyword may be in the answer only (0.25 instead of 0.5)
+        lower = lower - np.where(intent_boost == 0.5, 0.25, 0.0)
+        intent_upper = np.full(n, 0.5)
+    elif intent == "HOW_TO":
+        # The troubleshooting penalty depends on the question alone
+        intent_upper = np.where(intent_boost < 0, intent_boost, 2.8)
+    else:
+        intent_upper = np.zeros(n)
+
+    upper = (np.asarray(base_scores, dtype=np.float64) + known["exact_match_boost"] + known["topic_boost"]
+             + intent_upper + 0.25 * len(query.errors) + 0.2)
+
+    return lower - _BOUND_EPSILON, upper + _BOUND_EPSILON
+
+
+def prune_mask(lower: np.ndarray, upper: np.ndarray, keep_rank: int) -> np.ndarray:
+    """
+    Candidates that can still finish in the top keep_rank
+
+    A candidate whose upper bound is below the keep_rank-th largest lower
+    bound is outscored by at least keep_rank others whatever its answer is.
+
+    Returns:
+        Boolean keep mask
+    """
+    n = len(lower)
+    if n <= keep_rank:
+        return np.ones(n, dtype=bool)
+    threshold = np.partition(lower, n - keep_rank)[n - keep_rank]
+    return upper >= threshold
+
+
+class RankingFeatureStore:
+    """
+    (question, answer, topics) → FAQFeatures, prebuilt for every FAQ when the
+    FAQ record cache loads a graph version, together with the question-only
+    features candidate pruning bounds scores with
+
+    Candidates whose answer was rewritten for the query (Case steps, an
+    extracted case section) are computed on first use and memoized in a
+    bounded overflow table.
+    """
+
+    def __init__(self, faq_records=None, max_overflow: int = 4096):
+        """
+        Initialize RankingFeatureStore
+
+        Args:
+            faq_records: FAQRecordCache the table is built from (None = memoize only)
+            max_overflow: Entries kept for candidates not in the prebuilt table
+        """
+        self.faq_records = faq_records
+        self.max_overflow = max_overflow
+        # (table, version) swapped as one tuple
+        self._state: Tuple[Dict[Tuple, FAQFeatures], Optional[str]] = ({}, None)
+        self._overflow: Dict[Tuple, FAQFeatures] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> bool:
+        """
+        Rebuild the table if the FAQ records were reloaded
+
+        Returns:
+            True if the prebuilt table is available
+        """
+        if self.faq_records is None or not self.faq_records.ensure_fresh():
+            return False
+
+        version = self.faq_records.version
+        if self._loaded and version == self._state[1]:
+            return True
+
+        with self._lock:
+            if not (self._loaded and version == self._state[1]):
+                self._build(version)
+                self._loaded = True
+
+        return True
+
+    def _build(self, version: Optional[str]):
+        table = {}
+        for question, answer, topics in self.faq_records.ranking_texts():
+            for key in ((question, answer, topics), (question, "", topics)):
+                if key not in table:
+                    table[key] = compute_features(*key)
+
+        self._state = (table, version)
+        self._overflow = {}
+        logger.info(f"✅ Built ranking features ({len(table)} entries, graph version {version})")
+
+    def get(self, question: str, answer: str, topics: Sequence[str]) -> FAQFeatures:
+        """Features of one candidate"""
+        key = (question, answer, tuple(topics))
+        features = self._state[0].get(key)
+        if features is None:
+            features = self._overflow.get(key)
+            if features is None:
+                if len(self._overflow) >= self.max_overflow:
+                    self._overflow = {}
+                features = compute_features(question, answer, topics)
+                self._overflow[key] = features
+        return features
+
+    @property
+    def size(self) -> int:
+        """Number of prebuilt entries"""
+        return len(self._state[0])
+
+
+# ============================================
+# REFERENCE (previous per-candidate loop, for regression checks)
+# ============================================
+
+def reference_score(result: Dict, query_lower: str, similarity: float, intent: str, query_entities: Dict) -> Dict:
+    """Score breakdown of one candidate computed the way _rank_results did before the feature store"""
+    answer_lower = result.get("answer", "").lower()
+    question_lower = result.get("question", "").lower()
+    faq_topics = result.get("related_entities", {}).get("topics", [])
+    query_topics = query_entities.get("Topic", [])
+    base_score = result.get("relevance_score", 0.5)
+
+    exact_match_boost = 0.0
+    if similarity > 0.95:
+        exact_match_boost = 5.0
+    elif similarity > 0.9:
+        exact_match_boost = 2.0
+    elif similarity > 0.75:
+        exact_match_boost = 0.5
+    for query_kw, faq_matches in CRITICAL_ACTION_KEYWORDS:
+        if query_kw in query_lower:
+            if not any(faq_match in question_lower for faq_match in faq_matches):
+                exact_match_boost -= 3.0
+                break
+
+    topic_boost = 0.0
+    if query_topics:
+        for q_topic in query_topics:
+            q_topic_lower = q_topic.lower()
+            if any(q_topic_lower == faq_topic.lower() for faq_topic in faq_topics):
+                topic_boost += 0.5
+                break
+            elif q_topic_lower in question_lower:
+                topic_boost += 0.3
+                break
+        if faq_topics and topic_boost == 0.0:
+            for q_topic in query_topics:
+                q_topic_lower = q_topic.lower()
+                for q_key, contradictory_list in CONTRADICTORY_TOPICS.items():
+                    if q_key in q_topic_lower:
+                        for faq_topic in faq_topics:
+                            if any(contra in faq_topic.lower() for contra in contradictory_list):
+                                topic_boost -= 0.8
+                                break
+
+    intent_boost = 0.0
+    if intent == "TROUBLESHOOT":
+        for keyword in TROUBLESHOOT_KEYWORDS:
+            if keyword in answer_lower or keyword in question_lower:
+                intent_boost += 0.15
+        if "chưa" in question_lower or "không" in question_lower or "lỗi" in question_lower:
+            intent_boost += 0.3
+    elif intent in ("FEE", "LIMIT", "TIME"):
+        keywords = {"FEE": FEE_KEYWORDS, "LIMIT": LIMIT_KEYWORDS, "TIME": TIME_KEYWORDS}[intent]
+        for keyword in keywords:
+            if keyword in question_lower:
+                intent_boost += 0.5
+                break
+            elif keyword in answer_lower:
+                intent_boost += 0.25
+                break
+    elif intent == "HOW_TO":
+        is_troubleshoot_faq = False
+        for signal in HOW_TO_TROUBLESHOOT_SIGNALS:
+            if signal in question_lower:
+                is_troubleshoot_faq = True
+                break
+        if not is_troubleshoot_faq:
+            for pattern in ERROR_MESSAGE_PATTERNS:
+                if pattern.search(question_lower):
+                    is_troubleshoot_faq = True
+                    break
+        if is_troubleshoot_faq:
+            intent_boost -= 1.5
+        else:
+            if any(pattern.search(answer_lower) for pattern in STEP_PATTERNS):
+                intent_boost += 2.5
+            for signal in HOW_TO_SIGNALS:
+                if signal in question_lower or signal in answer_lower:
+                    intent_boost += 0.3
+                    break
+
+    error_boost = 0.0
+    if query_entities.get("Error", []):
+        for error in query_entities.get("Error", []):
+            error_lower = error.lower()
+            if error_lower in answer_lower or error_lower in question_lower:
+                error_boost += 0.25
+
+    overlap = len(set(query_lower.split()) & set(answer_lower.split()))
+    keyword_boost = min(overlap * 0.02, 0.2)
+
+    final_score = base_score + exact_match_boost + topic_boost + intent_boost + error_boost + keyword_boost
+    return {
+        "base": base_score,
+        "exact_match_boost": exact_match_boost,
+        "topic_boost": topic_boost,
+        "intent_boost": intent_boost,
+        "error_boost": error_boost,
+        "keyword_boost": keyword_boost,
+        "final": final_score
+    }
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    # Usage:
+    #   python ranking_features.py [cases.jsonl]
+    # Each case: {"query": ..., "intent": ..., "entities": {...},
+    #             "candidates": [{"question", "answer", "relevance_score", "related_entities": {"topics"}}]}
+    # Without a file, random cases are generated from the sample texts below.
+    # Exit code 1 if any ordering or score differs from reference_score.
+    import json
+    import random
+    import sys
+    import time
+    from difflib import SequenceMatcher
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            cases = [json.loads(line) for line in f if line.strip()]
+    else:
+        rng = random.Random(0)
+        questions = [
+            "Làm thế nào để hủy liên kết ngân hàng?", "Cách liên kết ngân hàng Vietcombank",
+            "Phí rút tiền về ngân hàng là bao nhiêu?", "Hạn mức chuyển tiền tối đa một ngày",
+            "Nạp tiền bị lỗi nhưng tài khoản đã bị trừ tiền", "Bao lâu thì tiền về tài khoản?",
+            "Tại sao giao dịch thất bại?", "Cách đổi mật khẩu ví", "Mở khóa tài khoản như thế nào?",
+            "Đăng ký tài khoản VNPT Money", "Quên mật khẩu phải làm sao?", "Thanh toán hóa đơn điện",
+        ]
+        answers = [
+            "Bước 1: Chọn Ngân hàng liên kết\nBước 2: Chọn Hủy liên kết\nBước 3: Xác nhận OTP",
+            "Miễn phí rút tiền. Biểu phí xem tại ứng dụng.", "Hạn mức tối đa 100 triệu/ngày.",
+            "Vui lòng kiểm tra trạng thái giao dịch hoặc liên hệ hotline 1900 8198 để được hỗ trợ.",
+            "Tiền về ngay lập tức, chậm nhất trong vòng 1 ngày làm việc.",
+            "1. Mở ứng dụng\n2) Chọn Cá nhân\n3. Đổi mật khẩu", "Giao dịch sẽ được hoàn tiền sau khi đối soát.",
+        ]
+        topics = ["Liên kết ngân hàng", "Hủy liên kết", "Mở khóa", "Đổi mật khẩu", "Rút tiền", "Nạp tiền",
+                  "Khóa tài khoản", "Đăng ký", "Quên mật khẩu", "Tạo tài khoản"]
+        errors = ["lỗi", "thất bại", "bị trừ tiền", "không hợp lệ"]
+        faqs = [
+            (rng.choice(questions), rng.choice(answers), rng.sample(topics, rng.randint(0, 2)))
+            for _ in range(300)
+        ]
+        cases = []
+        for _ in range(2000):
+            cases.append({
+                "query": rng.choice(questions + ["hủy liên kết ngân hàng", "khóa ví", "thêm thẻ", "phí bao nhiêu"]),
+                "intent": rng.choice(list(RANKED_INTENTS) + ["INFO_REQUEST", "WHY"]),
+                "entities": {
+                    "Topic": rng.sample(topics, rng.randint(0, 2)),
+                    "Error": rng.sample(errors, rng.randint(0, 1)),
+                },
+                "candidates": [
+                    {
+                        "question": question,
+                        "answer": answer,
+                        "relevance_score": round(rng.random(), 3),
+                        "related_entities": {"topics": faq_topics},
+                    }
+                    for question, answer, faq_topics in rng.sample(faqs, rng.randint(1, 15))
+                ],
+            })
+
+    # Prebuild the features of every candidate, as the FAQ record cache load does,
+    # so only per-query scoring is timed
+    store = RankingFeatureStore()
+    for case in cases:
+        for c in case["candidates"]:
+            store.get(c["question"], c["answer"], c.get("related_entities", {}).get("topics", []))
+
+    mismatches = 0
+    reference_time = store_time = 0.0
+    for case in cases:
+        query_lower = case["query"].lower()
+        intent = case.get("intent", "GENERAL")
+        entities = case.get("entities", {})
+        candidates = case["candidates"]
+        similarities = [SequenceMatcher(None, query_lower, c["question"].lower()).ratio() for c in candidates]
+
+        start = time.perf_counter()
+        expected = [reference_score(c, query_lower, s, intent, entities) for c, s in zip(candidates, similarities)]
+        reference_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        features = [store.get(c["question"], c["answer"], c.get("related_entities", {}).get("topics", []))
+                    for c in candidates]
+        scores = score_candidates(features, [c.get("relevance_score", 0.5) for c in candidates],
+                                  similarities, intent, ranking_query(query_lower, entities))
+        store_time += time.perf_counter() - start
+
+        expected_order = sorted(range(len(candidates)), key=lambda i: expected[i]["final"], reverse=True)
+        final = scores["final"]
+        order = sorted(range(len(candidates)), key=lambda i: final[i], reverse=True)
+        if order != expected_order or final != [e["final"] for e in expected]:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ {case['query']!r} ({intent}): {order} != {expected_order}")
+
+    print(f"{len(cases)} cases, {sum(len(c['candidates']) for c in cases)} candidates, {mismatches} mismatches")
+    print(f"reference loop: {reference_time * 1000:.1f} ms, prebuilt feature store: {store_time * 1000:.1f} ms")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,287 @@
+"""
+Out-of-Scope Gate
+Cheap pre-LLM check: query embedding vs FAQ centroids + VNPT keyword list
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# VNPT Money related keywords; a query containing none of them is likely out of scope
+VNPT_KEYWORDS = [
+    'vnpt', 'ví', 'tiền', 'chuyển', 'nạp', 'rút', 'thanh toán', 'liên kết',
+    'ngân hàng', 'giao dịch', 'tài khoản', 'định danh', 'mật khẩu', 'otp',
+    'mobile money', 'phí', 'hạn mức', 'lỗi', 'thất bại', 'hotline', 'hỗ trợ',
+    'đăng ký', 'hủy', 'khóa', 'mở khóa', 'ứng dụng', 'app', 'pay', 'money',
+    'điện thoại', 'số dư', 'biểu phí', 'khuyến mãi', 'voucher', 'mã giảm giá'
+]
+
+
+def has_vnpt_keyword(query_lower: str) -> bool:
+    """True if the (lowercased) query mentions any VNPT Money keyword"""
+    return any(kw in query_lower for kw in VNPT_KEYWORDS)
+
+
+class ScopeDecision(NamedTuple):
+    """Gate verdict for one query"""
+    out_of_scope: bool
+    similarity: Optional[float]  # Max cosine to the FAQ centroids (None = no embedding)
+    has_keyword: bool
+    reason: str
+
+
+def decide(similarity: Optional[float], has_keyword: bool,
+           min_similarity: float, min_similarity_with_keyword: float) -> Tuple[bool, str]:
+    """
+    Gate rule
+
+    Rejects only when the embedding is available and far from every FAQ
+    centroid: below min_similarity without a VNPT keyword, or below the
+    (lower) min_similarity_with_keyword even with one.
+
+    Returns:
+        (out_of_scope, reason)
+    """
+    if similarity is None:
+        return False, "no_embedding"
+    if similarity < min_similarity_with_keyword:
+        return True, "far_from_faqs"
+    if not has_keyword and similarity < min_similarity:
+        return True, "no_keyword_far_from_faqs"
+    return False, "in_scope"
+
+
+def spherical_kmeans(vectors: np.ndarray, n_centroids: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm centroids of L2-normalized rows (cosine k-means)
+
+    Args:
+        vectors: (n, dim) normalized float32 matrix
+        n_centroids: Number of centroids (all rows are kept if n <= n_centroids)
+        iterations: Assignment / update rounds
+        seed: Initialization seed
+
+    Returns:
+        (k, dim) normalized float32 matrix
+    """
+    n = len(vectors)
+    if n <= n_centroids:
+        return vectors.copy()
+
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(n, n_centroids, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.where(norms == 0, 1.0, norms), centroids).astype(np.float32)
+
+    return np.ascontiguousarray(centroids, dtype=np.float32)
+
+
+class OutOfScopeGate:
+    """
+    Rejects clearly unrelated queries before entity extraction (LLM)
+
+    The FAQ embedding matrix is reduced to a few centroids per graph version,
+    so the check is one small mat-vec product plus a keyword scan. The query
+    embedding is the same one semantic search uses.
+    """
+
+    def __init__(self, embedding_matrix, n_centroids: int = 64,
+                 min_similarity: float = 0.45, min_similarity_with_keyword: float = 0.25):
+        """
+        Initialize OutOfScopeGate
+
+        Args:
+            embedding_matrix: FAQEmbeddingMatrix the centroids are built from
+            n_centroids: Number of FAQ centroids
+            min_similarity: Reject below this centroid cosine when the query has no VNPT keyword
+            min_similarity_with_keyword: Reject below this centroid cosine even with a keyword
+        """
+        self.embedding_matrix = embedding_matrix
+        self.n_centroids = n_centroids
+        self.min_similarity = min_similarity
+        self.min_similarity_with_keyword = min_similarity_with_keyword
+        # (centroids, version) swapped as one tuple
+        self._state: Tuple[Optional[np.ndarray], Optional[str]] = (None, None)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> bool:
+        """
+        Rebuild the centroids if the FAQ embedding matrix was reloaded
+
+        Returns:
+            True if centroids are available
+        """
+        if not self.embedding_matrix.ensure_fresh():
+            return False
+
+        version = self.embedding_matrix.version
+        if self._loaded and version == self._state[1]:
+            return self._state[0] is not None
+
+        with self._lock:
+            if not (self._loaded and version == self._state[1]):
+                self._build(version)
+                self._loaded = True
+
+        return self._state[0] is not None
+
+    def _build(self, version: Optional[str]):
+        matrix = self.embedding_matrix.matrix
+        if matrix is None:
+            self._state = (None, version)
+            return
+
+        centroids = spherical_kmeans(matrix, self.n_centroids)
+        self._state = (centroids, version)
+        logger.info(f"✅ Built {len(centroids)} FAQ centroids for the out-of-scope gate (graph version {version})")
+
+    def similarity(self, query_embedding) -> Optional[float]:
+        """Max cosine between the query and the FAQ centroids (None if unavailable)"""
+        if query_embedding is None or not self.ensure_fresh():
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        return float(np.max(self._state[0] @ (query / norm)))
+
+    def check(self, query_lower: str, query_embedding=None) -> ScopeDecision:
+        """
+        Gate verdict for one query
+
+        Args:
+            query_lower: Lowercased query
+            query_embedding: Query vector (None = keyword check only, never rejects)
+
+        Returns:
+            ScopeDecision
+        """
+        similarity = self.similarity(query_embedding)
+        keyword = has_vnpt_keyword(query_lower)
+        out_of_scope, reason = decide(similarity, keyword, self.min_similarity, self.min_similarity_with_keyword)
+        return ScopeDecision(out_of_scope, similarity, keyword, reason)
+
+
+def threshold_report(
+    samples: Sequence[Tuple[Optional[float], bool, bool]],
+    min_similarities: Iterable[float],
+    min_similarities_with_keyword: Iterable[float]
+) -> List[Dict]:
+    """
+    Gate outcome on a labelled set for each threshold pair
+
+    Args:
+        samples: (centroid similarity, has_keyword, in_scope) per labelled query
+        min_similarities: Candidate min_similarity values
+        min_similarities_with_keyword: Candidate min_similarity_with_keyword values
+
+    Returns:
+        [{min_similarity, min_similarity_with_keyword, false_rejections,
+          false_rejection_rate, caught, catch_rate}], pairs with
+        min_similarity_with_keyword > min_similarity skipped
+    """
+    in_scope_total = sum(1 for _, _, in_scope in samples if in_scope)
+    out_scope_total = len(samples) - in_scope_total
+
+    rows = []
+    for min_similarity in min_similarities:
+        for min_with_keyword in min_similarities_with_keyword:
+            if min_with_keyword > min_similarity:
+                continue
+            false_rejections = caught = 0
+            for similarity, keyword, in_scope in samples:
+                rejected, _ = decide(similarity, keyword, min_similarity, min_with_keyword)
+                if rejected and in_scope:
+                    false_rejections += 1
+                elif rejected:
+                    caught += 1
+            rows.append({
+                "min_similarity": min_similarity,
+                "min_similarity_with_keyword": min_with_keyword,
+                "false_rejections": false_rejections,
+                "false_rejection_rate": false_rejections / in_scope_total if in_scope_total else 0.0,
+                "caught": caught,
+                "catch_rate": caught / out_scope_total if out_scope_total else 0.0,
+            })
+    return rows
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    import sys
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    # Usage:
+    #   python scope_gate.py                       - keyword check on the examples below
+    #   python scope_gate.py report labelled.jsonl - thresholds report on a labelled set
+    #                                                ({"query": ..., "in_scope": true/false} per line)
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "report":
+        import json
+        import config
+        from neo4j_rag_engine import Neo4jGraphRAGEngine
+        from normalized_query import normalize_query
+
+        with open(sys.argv[2], encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+        engine = Neo4jGraphRAGEngine()
+        try:
+            if engine.embeddings_model is None or not engine.scope_gate.ensure_fresh():
+                print("❌ Embeddings model or FAQ embeddings unavailable")
+                sys.exit(1)
+
+            texts = [normalize_query(row["query"]).text for row in rows]
+            embeddings = engine.embeddings_model.encode(texts)
+            samples = [
+                (engine.scope_gate.similarity(embedding), has_vnpt_keyword(text.lower()), bool(row["in_scope"]))
+                for text, embedding, row in zip(texts, embeddings, rows)
+            ]
+        finally:
+            engine.close()
+
+        n_in = sum(1 for s in samples if s[2])
+        print(f"{len(samples)} labelled queries ({n_in} in scope, {len(samples) - n_in} out of scope)")
+        print(f"current: min_similarity={config.OUT_OF_SCOPE_MIN_SIMILARITY}, "
+              f"min_similarity_with_keyword={config.OUT_OF_SCOPE_MIN_SIMILARITY_WITH_KEYWORD}\n")
+        print(f"{'min_sim':>8} {'min_kw':>8} {'false rej':>14} {'caught':>14}")
+        grid = [round(0.05 * i, 2) for i in range(2, 15)]
+        for r in threshold_report(samples, grid, grid):
+            print(f"{r['min_similarity']:>8.2f} {r['min_similarity_with_keyword']:>8.2f} "
+                  f"{r['false_rejections']:>5} ({r['false_rejection_rate']:>6.1%}) "
+                  f"{r['caught']:>5} ({r['catch_rate']:>6.1%})")
+
+        # Falsely rejected queries at the current thresholds
+        for row, (similarity, keyword, in_scope) in zip(rows, samples):
+            rejected, reason = decide(similarity, keyword, config.OUT_OF_SCOPE_MIN_SIMILARITY,
+                                      config.OUT_OF_SCOPE_MIN_SIMILARITY_WITH_KEYWORD)
+            if rejected and in_scope:
+                print(f"  ❌ {reason} ({similarity:.3f}): {row['query']}")
+        sys.exit(0)
+
+    examples = [
+        "Làm sao để nạp tiền vào ví VNPT Money?",
+        "Phí chuyển tiền đến ngân hàng là bao nhiêu?",
+        "Thời tiết Hà Nội hôm nay thế nào?",
+        "Công thức nấu phở bò",
+    ]
+    for query in examples:
+        print(f"{'✅' if has_vnpt_keyword(query.lower()) else '⚠️'} keyword={has_vnpt_keyword(query.lower())}: {query}")
@@ -5,11 +5,34 @@ Extracts, tracks, and retrieves specific steps from FAQ answers
 
 import logging
 import re
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# "Bước 1:", "Bước 2:", etc.
+STEP_PATTERN = re.compile(r'Bước\s+(\d+):\s*(.+?)(?=Bước\s+\d+:|$)', re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
+def _parse_steps(answer: str) -> Tuple[Tuple[int, str, str, str], ...]:
+    """(number, full text, title, details) per step; answers repeat across turns, so memoized"""
+    steps = []
+    for match in STEP_PATTERN.finditer(answer):
+        step_full_text = match.group(2).strip()
+
+        # Try to split into title and details
+        # Pattern: "Action - Details" or just "Action"
+        parts = step_full_text.split('\n', 1)
+        steps.append((
+            int(match.group(1)),
+            step_full_text,
+            parts[0].strip(),
+            parts[1].strip() if len(parts) > 1 else ""
+        ))
+    return tuple(steps)
+
 
 class StepTracker:
     """
@@ -38,28 +61,15 @@ class StepTracker:
         Returns:
             List of {step_number, step_text, step_title}
         """
-        steps = []
-
-        # Pattern 1: "Bước 1:", "Bước 2:", etc.
-        step_pattern = r'Bước\s+(\d+):\s*(.+?)(?=Bước\s+\d+:|$)'
-        matches = re.finditer(step_pattern, answer, re.IGNORECASE | re.DOTALL)
-
-        for match in matches:
-            step_num = int(match.group(1))
-            step_full_text = match.group(2).strip()
-
-            # Try to split into title and details
-            # Pattern: "Action - Details" or just "Action"
-            parts = step_full_text.split('\n', 1)
-            step_title = parts[0].strip()
-            step_details = parts[1].strip() if len(parts) > 1 else ""
-
-            steps.append({
+        steps = [
+            {
                 "step_number": step_num,
                 "step_text": step_full_text,
                 "step_title": step_title,
                 "step_details": step_details
-            })
+            }
+            for step_num, step_full_text, step_title, step_details in _parse_steps(answer)
+        ]
 
         if steps:
             logger.info(f"Extracted {len(steps)} steps from answer")
@@ -0,0 +1,285 @@
+"""
+Pipeline Tracing
+Sampled per-request traces with timed stage spans, exported as JSON lines
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed pipeline stage with attributes (counts, cache hits, model, ...)"""
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    def set(self, **attributes):
+        """Add or overwrite span attributes"""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def to_dict(self, trace_start: float) -> Dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start - trace_start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Span handed out when the request is not sampled"""
+
+    trace = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """
+    All spans of one request plus counters (Cypher round trips, LLM calls, ...)
+
+    Spans can be added from the stage worker threads, so additions are locked.
+    """
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable trace, spans ordered by start time"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+            counters = dict(self.counters)
+        root = spans[0] if spans else None
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": root.to_dict(self.start)["duration_ms"] if root else 0.0,
+            "counters": {k: round(v, 3) if isinstance(v, float) else v for k, v in counters.items()},
+            "spans": [s.to_dict(self.start) for s in spans],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+# Set inside an unsampled request so nested trace() calls don't sample again
+_unsampled: ContextVar[bool] = ContextVar("trace_unsampled", default=False)
+_export_lock = threading.Lock()
+
+
+def _sampled() -> bool:
+    if not getattr(config, 'TRACING_ENABLED', False):
+        return False
+    rate = getattr(config, 'TRACE_SAMPLE_RATE', 0.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator:
+    """
+    Start a request trace, or a child span if a trace is already active
+
+    The caller of the outermost trace() can read span.trace.to_dict()
+    after the block; the finished trace is also appended to config.TRACE_FILE.
+
+    Args:
+        name: Root span name (e.g. "engine.query")
+        **attributes: Span attributes
+
+    Yields:
+        Span (NOOP_SPAN if the request is not sampled)
+    """
+    if _current_trace.get() is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+
+    if _unsampled.get():
+        yield NOOP_SPAN
+        return
+
+    if not _sampled():
+        token = _unsampled.set(True)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _unsampled.reset(token)
+        return
+
+    current = Trace(name)
+    root = Span(current, name, None, attributes)
+    current.add(root)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.set(error=repr(e))
+        raise
+    finally:
+        root.finish()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        export(current)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator:
+    """
+    Time one stage of the active trace (no-op without one)
+
+    Args:
+        name: Stage name (e.g. "graph_search")
+        **attributes: Span attributes
+
+    Yields:
+        Span (NOOP_SPAN if no trace is active)
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    child = Span(current, name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set(error=repr(e))
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+        current.add(child)
+
+
+@contextmanager
+def llm_call(purpose: str, model: str, **attributes) -> Iterator:
+    """
+    Span for one LLM request, also counted in the trace's "llm_calls" counter
+
+    Args:
+        purpose: Call site (e.g. "entity_extraction")
+        model: Model name
+        **attributes: Span attributes
+
+    Yields:
+        Span
+    """
+    count("llm_calls")
+    with span(f"llm.{purpose}", model=model, **attributes) as llm_span:
+        yield llm_span
+
+
+def annotate(**attributes):
+    """Set attributes on the innermost active span"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def count(name: str, amount: float = 1):
+    """Add to a counter of the active trace (e.g. "cypher_calls", "llm_calls")"""
+    current = _current_trace.get()
+    if current is not None:
+        current.count(name, amount)
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the current request, if sampled"""
+    return _current_trace.get()
+
+
+def export(finished: Trace, path=None):
+    """
+    Append a trace to the JSON-lines trace file
+
+    Args:
+        finished: Finished trace
+        path: Output file (default: config.TRACE_FILE; None disables export)
+    """
+    path = path or getattr(config, 'TRACE_FILE', None)
+    if not path:
+        return
+    try:
+        line = json.dumps(finished.to_dict(), ensure_ascii=False, default=str)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _export_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"⚠️ Could not export trace {finished.trace_id}: {e}")
+
+
+# ============================================
+# TESTING
+# ============================================
+
+if __name__ == "__main__":
+    import sys
+
+    # Summarize a trace file: per-span p50 / p95 / max duration
+    import numpy as np
+
+    trace_file = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(config.TRACE_FILE)
+    durations: Dict[str, List[float]] = {}
+    traces = 0
+    with open(trace_file, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            traces += 1
+            for s in record["spans"]:
+                durations.setdefault(s["name"], []).append(s["duration_ms"])
+
+    print(f"{traces} traces in {trace_file}\n")
+    print(f"{'span':<35} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, values in sorted(durations.items(), key=lambda kv: -np.percentile(kv[1], 95)):
+        print(f"{name:<35} {len(values):>6} {np.percentile(values, 50):>9.1f} "
+              f"{np.percentile(values, 95):>9.1f} {max(values):>9.1f}")